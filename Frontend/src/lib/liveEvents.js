@@ -0,0 +1,95 @@
+import { useEffect, useRef } from "react";
+import config from "../config";
+
+// One EventSource (GET /events) shared by every page that listens; it is
+// opened with the first listener and closed with the last.
+let source = null;
+const listeners = new Map(); // event type -> Set of handlers
+const connectionListeners = new Set();
+
+// Server-sent event types (see app/services/live_events.py)
+const EVENT_TYPES = ["snapshot", "counters", "run_started", "run_finished", "escalation"];
+
+function dispatch(type, event) {
+  let data = null;
+  try {
+    data = JSON.parse(event.data);
+  } catch {
+    return;
+  }
+  const id = Number(event.lastEventId) || 0;
+  (listeners.get(type) || []).forEach((handler) => handler(data, id));
+}
+
+function notifyConnection(connected) {
+  connectionListeners.forEach((handler) => handler(connected));
+}
+
+function open() {
+  if (source || typeof EventSource === "undefined") return;
+  // The browser reconnects on its own and sends Last-Event-ID, so missed
+  // events are replayed (or a fresh snapshot is sent)
+  source = new EventSource(`${config.API_BASE}/events`);
+  source.onopen = () => notifyConnection(true);
+  source.onerror = () => notifyConnection(false);
+  EVENT_TYPES.forEach((type) => source.addEventListener(type, (e) => dispatch(type, e)));
+}
+
+function closeIfIdle() {
+  const active = [...listeners.values()].some((set) => set.size > 0) || connectionListeners.size > 0;
+  if (!active && source) {
+    source.close();
+    source = null;
+  }
+}
+
+export function isSupported() {
+  return typeof EventSource !== "undefined";
+}
+
+export function subscribe(type, handler) {
+  if (!listeners.has(type)) listeners.set(type, new Set());
+  listeners.get(type).add(handler);
+  open();
+  return () => {
+    listeners.get(type).delete(handler);
+    closeIfIdle();
+  };
+}
+
+export function onConnectionChange(handler) {
+  connectionListeners.add(handler);
+  open();
+  if (source && source.readyState === 1) handler(true);
+  return () => {
+    connectionListeners.delete(handler);
+    closeIfIdle();
+  };
+}
+
+// Subscribe a component to several event types: useLiveEvents({ counters: fn, ... }).
+// Handlers may change between renders without resubscribing.
+export function useLiveEvents(handlers) {
+  const ref = useRef(handlers);
+  ref.current = handlers;
+  const types = Object.keys(handlers).sort().join(",");
+
+  useEffect(() => {
+    const unsubscribers = types
+      .split(",")
+      .filter(Boolean)
+      .map((type) => subscribe(type, (data, id) => ref.current[type]?.(data, id)));
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+  }, [types]);
+}
+
+// Runs fn once, `wait` ms after the last of a burst of calls (refetch on change)
+export function debounce(fn, wait = 1000) {
+  let timer = null;
+  const debounced = (...args) => {
+    clearTimeout(timer);
+    timer = setTimeout(() => fn(...args), wait);
+  };
+  debounced.cancel = () => clearTimeout(timer);
+  return debounced;
+}
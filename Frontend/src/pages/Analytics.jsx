@@ -1,5 +1,6 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useMemo, useRef, useState } from "react";
 import config from "../config";
+import { useLiveEvents } from "../lib/liveEvents";
 import { Card, CardHeader, CardContent } from "../components/ui/Card";
 import { Button } from "../components/ui/Button";
 import { Loading } from "../components/Loading";
@@ -52,6 +53,33 @@ function Analytics() {
     fetchData();
   }, []);
 
+  // Totals are pushed by the backend (GET /events); deltas older than the
+  // last snapshot are already included in it
+  const snapshotId = useRef(0);
+  useLiveEvents({
+    snapshot: (totals, id) => {
+      snapshotId.current = id;
+      setData(totals);
+    },
+    counters: (delta, id) => {
+      if (id <= snapshotId.current) return;
+      setData((prev) => {
+        if (!prev) return prev;
+        const perDay = { ...(prev.processed_per_day || {}) };
+        Object.entries(delta.processed_per_day || {}).forEach(([date, count]) => {
+          perDay[date] = (perDay[date] || 0) + count;
+        });
+        return {
+          ...prev,
+          total: (prev.total || 0) + (delta.total || 0),
+          answered: (prev.answered || 0) + (delta.answered || 0),
+          escalated: (prev.escalated || 0) + (delta.escalated || 0),
+          processed_per_day: Object.fromEntries(Object.entries(perDay).sort()),
+        };
+      });
+    },
+  });
+
   const dailySeries = useMemo(() => {
     if (!data?.processed_per_day) return [];
     return Object.entries(data.processed_per_day).map(([date, count]) => ({
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useEffect, useState, useCallback, useRef } from "react";
 import { Card, CardHeader, CardContent } from "../components/ui/Card";
 import { Button } from "../components/ui/Button";
 import { Loading } from "../components/Loading";
@@ -12,12 +12,19 @@ import {
   IconAlertCircle
 } from "@tabler/icons-react";
 import config from "../config";
+import { isSupported, onConnectionChange, useLiveEvents } from "../lib/liveEvents";
+
+const MAX_ACTIVITY = 20;
 
 function Dashboard() {
   const [status, setStatus] = useState({ status: "loading", metrics: {} });
   const [error, setError] = useState("");
   const [isLoading, setIsLoading] = useState(true);
   const [lastUpdated, setLastUpdated] = useState(null);
+  const [live, setLive] = useState(false);
+  const [activity, setActivity] = useState([]);
+  // Id of the last event included in the current totals; older deltas are skipped
+  const snapshotId = useRef(0);
 
   const fetchStatus = useCallback(async () => {
     try {
@@ -63,11 +70,52 @@ function Dashboard() {
 
   useEffect(() => {
     fetchStatus();
-    
-    const interval = setInterval(fetchStatus, 30000);
-    return () => clearInterval(interval);
+
+    // Browsers without EventSource fall back to polling
+    if (!isSupported()) {
+      const interval = setInterval(fetchStatus, 30000);
+      return () => clearInterval(interval);
+    }
+    return onConnectionChange(setLive);
   }, [fetchStatus]);
 
+  const pushActivity = (item) => {
+    setActivity((items) => [item, ...items].slice(0, MAX_ACTIVITY));
+  };
+
+  // Pushed by the backend (GET /events) instead of polling /status
+  useLiveEvents({
+    snapshot: (totals, id) => {
+      snapshotId.current = id;
+      setStatus({
+        status: "running",
+        metrics: { runs_sent: totals.total || 0, runs_started: totals.pending || 0 }
+      });
+      setError("");
+      setIsLoading(false);
+      setLastUpdated(new Date());
+    },
+    counters: (delta, id) => {
+      if (id <= snapshotId.current) return;
+      setStatus((prev) => ({
+        ...prev,
+        metrics: {
+          runs_sent: (prev.metrics?.runs_sent || 0) + (delta.total || 0),
+          runs_started: (prev.metrics?.runs_started || 0) + (delta.pending || 0)
+        }
+      }));
+      setLastUpdated(new Date());
+    },
+    run_started: (run) => pushActivity({ ...run, status: "started" }),
+    run_finished: (run) => pushActivity(run),
+  });
+
+  const getActivityColor = (status) => {
+    return status === "sent" ? "bg-green-500" :
+      status === "escalated" ? "bg-red-500" :
+      status === "started" ? "bg-blue-500" : "bg-gray-400";
+  };
+
   const handleRetry = () => {
     fetchStatus();
   };
@@ -232,18 +280,45 @@ function Dashboard() {
             <CardHeader>
               <div className="flex items-center justify-between">
                 <h2 className="text-xl font-semibold text-gray-900">Recent Activity</h2>
-                <span className="px-3 py-1 bg-green-100 text-green-800 text-sm font-medium rounded-full flex items-center gap-2">
-                  <div className="w-2 h-2 bg-green-500 rounded-full animate-pulse"></div>
-                  Live
-                </span>
+                {live ? (
+                  <span className="px-3 py-1 bg-green-100 text-green-800 text-sm font-medium rounded-full flex items-center gap-2">
+                    <div className="w-2 h-2 bg-green-500 rounded-full animate-pulse"></div>
+                    Live
+                  </span>
+                ) : (
+                  <span className="px-3 py-1 bg-gray-100 text-gray-600 text-sm font-medium rounded-full flex items-center gap-2">
+                    <div className="w-2 h-2 bg-gray-400 rounded-full"></div>
+                    Reconnecting
+                  </span>
+                )}
               </div>
             </CardHeader>
             <CardContent>
-              <div className="text-center py-12 text-gray-500">
-                <IconTrendingUp className="w-16 h-16 mx-auto mb-4 text-gray-300" />
-                <p className="text-lg font-medium mb-2">Activity feed coming soon</p>
-                <p className="text-sm">Real-time email processing updates will appear here</p>
-              </div>
+              {activity.length === 0 ? (
+                <div className="text-center py-12 text-gray-500">
+                  <IconTrendingUp className="w-16 h-16 mx-auto mb-4 text-gray-300" />
+                  <p className="text-lg font-medium mb-2">No activity yet</p>
+                  <p className="text-sm">Real-time email processing updates will appear here</p>
+                </div>
+              ) : (
+                <ul className="divide-y divide-gray-100">
+                  {activity.map((item, i) => (
+                    <li key={`${item.run_id}-${item.status}-${i}`} className="py-3 flex items-center gap-3">
+                      <div className={`w-2 h-2 rounded-full ${getActivityColor(item.status)}`}></div>
+                      <div className="flex-1 min-w-0">
+                        <p className="text-sm font-medium text-gray-800 truncate">
+                          Run {item.status}
+                          {item.email_id && <span className="text-gray-500 font-normal"> · {item.email_id}</span>}
+                        </p>
+                        {item.reason && <p className="text-xs text-gray-500 truncate">{item.reason}</p>}
+                      </div>
+                      <span className="text-xs text-gray-400">
+                        {item.timestamp ? new Date(item.timestamp * 1000).toLocaleTimeString() : ""}
+                      </span>
+                    </li>
+                  ))}
+                </ul>
+              )}
             </CardContent>
           </Card>
 
@@ -15,6 +15,7 @@ import {
   IconMailOpened
 } from '@tabler/icons-react'
 import config from '../config'
+import { debounce, isSupported, subscribe } from '../lib/liveEvents'
 
 function Escalations() {
   const [items, setItems] = useState([])
@@ -94,10 +95,19 @@ function Escalations() {
     fetchEscalations()
   }, [fetchEscalations])
 
+  // Refetch when escalations change (GET /events) instead of polling
   useEffect(() => {
     if (!autoRefresh) return
-    const id = setInterval(fetchEscalations, 10000)
-    return () => clearInterval(id)
+    if (!isSupported()) {
+      const id = setInterval(fetchEscalations, 10000)
+      return () => clearInterval(id)
+    }
+    const refetch = debounce(fetchEscalations)
+    const unsubscribers = ['counters', 'escalation'].map((type) => subscribe(type, refetch))
+    return () => {
+      unsubscribers.forEach((unsubscribe) => unsubscribe())
+      refetch.cancel()
+    }
   }, [autoRefresh, fetchEscalations])
 
   const onSearch = () => {
@@ -113,14 +123,19 @@ function Escalations() {
     setOffset(0)
   }
 
-  const handleResolve = async (logId) => {
+  const handleResolve = async (item) => {
     try {
-      const res = await fetch(`${config.API_BASE}/resolve-escalation/${logId}`, {
-        method: 'POST'
-      })
-      if (!res.ok) throw new Error(`Failed to resolve #${logId} (HTTP ${res.status})`)
+      // Items without a log row yet (id null) are resolved on the queue directly
+      const res = item.id != null
+        ? await fetch(`${config.API_BASE}/resolve-escalation/${item.id}`, { method: 'POST' })
+        : await fetch(`${config.API_BASE}/escalation-queue/${item.escalation_id}/resolve`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ operator: 'dashboard' })
+          })
+      if (!res.ok) throw new Error(`Failed to resolve #${item.id ?? item.escalation_id} (HTTP ${res.status})`)
       // Optimistic remove from current page
-      setItems(prev => prev.filter(x => x.id !== logId))
+      setItems(prev => prev.filter(x => x.escalation_id !== item.escalation_id))
     } catch (e) {
       alert(e.message || 'Failed to resolve escalation')
     }
@@ -286,7 +301,7 @@ function Escalations() {
             ) : (
               <div className="space-y-4">
                 {items.map((item, index) => (
-                  <div key={item.id || index} className="border border-red-200 rounded-lg p-4 bg-red-50 hover:bg-red-100/50 transition-colors">
+                  <div key={item.escalation_id || index} className="border border-red-200 rounded-lg p-4 bg-red-50 hover:bg-red-100/50 transition-colors">
                     <div className="flex items-center justify-between mb-3">
                       <div className="flex items-center gap-3">
                         <span className="text-sm font-medium text-gray-900">#{item.id || index + 1}</span>
@@ -339,7 +354,7 @@ function Escalations() {
                       <Button
                         variant="success"
                         className="flex items-center gap-2"
-                        onClick={() => handleResolve(item.id)}
+                        onClick={() => handleResolve(item)}
                       >
                         <IconCheck className="w-4 h-4" />
                         Mark Resolved
@@ -15,6 +15,7 @@ import {
   IconMail
 } from '@tabler/icons-react'
 import config from '../config'
+import { debounce, isSupported, subscribe } from '../lib/liveEvents'
 
 function Logs() {
   const [logs, setLogs] = useState([])
@@ -61,12 +62,19 @@ function Logs() {
     fetchLogs()
   }, [fetchLogs])
 
+  // Refetch when the backend pushes new rows (GET /events) instead of polling
   useEffect(() => {
     if (!autoRefresh) return
-    const id = setInterval(() => {
-      fetchLogs()
-    }, 10000)
-    return () => clearInterval(id)
+    if (!isSupported()) {
+      const id = setInterval(fetchLogs, 10000)
+      return () => clearInterval(id)
+    }
+    const refetch = debounce(fetchLogs)
+    const unsubscribe = subscribe('counters', refetch)
+    return () => {
+      unsubscribe()
+      refetch.cancel()
+    }
   }, [autoRefresh, fetchLogs])
 
   const onSearch = () => {
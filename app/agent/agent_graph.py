@@ -1,14 +1,22 @@
 """Agent graph runner (LangGraph-compatible API)
 Simple self-contained runner showing control flow for
-retrieve -> draft -> validate -> (send|escalate|rewrite loop)
+triage -> retrieve -> draft -> validate -> (send|escalate|rewrite loop)
+
+With speculative drafting (AGENT_SPECULATIVE_DRAFTS > 1) the draft/validate/
+rewrite loop is replaced by up to N staggered draft+validate candidates; the
+first valid one is sent and candidates not yet started are never called.
+
+Triage short-circuits spam, prompt-injection and too-short emails to
+escalate/ignore before any retrieval or LLM call.
 
 This module provides two ways to run the agent:
 - run_agent: a simple imperative flow used by tests
 - build_agent_graph/run_with_graph: a LangGraph-style graph API
 """
 
-import time, json, os
-from typing import Callable, Dict, Any, List, Optional
+import time, json, os, hashlib, inspect, threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 try:
     # Soft dependency: only used if user opts into LangGraph
@@ -20,8 +28,14 @@ except Exception:  # pragma: no cover - tests don’t require langgraph
     _HAS_LANGGRAPH = False
 
 from app.models import AgentState
-from app.services import persistence, metrics
+from app.services import email_logs, live_events, persistence, metrics
+from app.services.action_log import log_action
 from app.config import get_config
+from app.agent.pii_guard import customer_pii, quoted_pii
+from app.agent.triage import triage_email
+from app.agent import model_router
+from app.agent.prompt_budget import count_tokens, fit_prompt
+from app.agent.prompt_builder import track_prefix
 
 
 def _now() -> float:
@@ -34,6 +48,44 @@ def _log(state: AgentState, step: str, details: Dict[str, Any]):
     state.setdefault("log", []).append(entry)
 
 
+def _record_tokens(state: AgentState, prompt: str, completion: str) -> Dict[str, int]:
+    """Accumulate per-run token usage on the state and in metrics."""
+    usage = {"prompt": count_tokens(prompt), "completion": count_tokens(completion)}
+    totals = state.setdefault("token_usage", {"prompt": 0, "completion": 0, "calls": 0})
+    totals["prompt"] += usage["prompt"]
+    totals["completion"] += usage["completion"]
+    totals["calls"] += 1
+    metrics.add_prompt_tokens(usage["prompt"])
+    metrics.add_completion_tokens(usage["completion"])
+    return usage
+
+
+def _doc_content(doc: Dict[str, Any]) -> str:
+    return str(doc.get("content") or doc.get("page_content") or doc.get("text") or "")
+
+
+def triage_input(state: AgentState) -> AgentState:
+    """Run cheap input checks and record the routing decision on the state."""
+    result = triage_email(state.get("email_content", ""), state.get("thread_id"))
+    state["triage"] = result
+    if result["decision"] != "proceed":
+        # Surface the reason where escalation/history views look for it
+        state["validation_result"] = {
+            "is_valid": False,
+            "reason": f"triage: {result['reason']}",
+        }
+    _log(
+        state,
+        "triage",
+        {
+            "decision": result["decision"],
+            "reason": result["reason"],
+            "cached": result["cached"],
+        },
+    )
+    return state
+
+
 def retrieve_context(
     state: AgentState,
     rag_retrieve: Callable[[str, int], List[Dict[str, Any]]],
@@ -46,19 +98,124 @@ def retrieve_context(
     return state
 
 
+def _render_draft_prompt(state: AgentState, prompt_template: str) -> Tuple[str, List[Dict[str, Any]], str]:
+    """Fit and render the draft prompt; returns (prompt, kept docs, prefix hash)."""
+    docs = state.get("retrieved_docs", [])
+    fitted = fit_prompt(
+        state["email_content"],
+        [_doc_content(d) for d in docs],
+        budget=get_config().prompt_token_budget,
+        overhead=prompt_template,
+    )
+    kept = set(fitted["kept_indices"])
+    # Docs without text cost no prompt tokens, so trimming never drops them
+    docs = [d for i, d in enumerate(docs) if i in kept or not _doc_content(d).strip()]
+    prompt = prompt_template.format(
+        docs=[d["id"] for d in docs],
+        email=fitted["email"],
+    )
+    prefix = prompt_template.split("{email}", 1)[0].format(docs=[d["id"] for d in docs])
+    prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+    if track_prefix(prefix_hash):
+        metrics.increment_prompt_prefix_reused()
+    return prompt, docs, prefix_hash
+
+
+def _accepts_kwarg(llm_call: Callable, name: str) -> bool:
+    try:
+        params = inspect.signature(llm_call).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == name or p.kind is p.VAR_KEYWORD for p in params)
+
+
+def _route(state: AgentState, llm_call: Callable, rewrite: bool = False) -> Tuple[str, str, Dict[str, Any]]:
+    """Model tier for the next LLM call: (tier, reason, kwargs selecting its model).
+
+    An ``llm_call`` without a ``model`` keyword always runs its own model,
+    recorded as the large tier.
+    """
+    if not _accepts_kwarg(llm_call, "model"):
+        metrics.record_route(model_router.LARGE, "fixed_model")
+        return model_router.LARGE, "fixed_model", {}
+    tier, reason = model_router.route(
+        state.get("email_content", ""),
+        state.get("retrieved_docs", []),
+        state.get("triage"),
+        rewrite=rewrite,
+    )
+    return tier, reason, {"model": model_router.model_for(tier)}
+
+
+def _timed_llm_call(
+    state: AgentState, tier: str, llm_call: Callable, prompt: str, **kwargs: Any
+) -> Tuple[str, Dict[str, int]]:
+    start = time.perf_counter()
+    reply = llm_call(prompt, **kwargs)
+    latency = time.perf_counter() - start
+    usage = _record_tokens(state, prompt, reply)
+    metrics.record_model_call(tier, latency, usage["prompt"], usage["completion"])
+    state["model_tier"] = tier
+    return reply, usage
+
+
 def draft_reply(
     state: AgentState,
     llm_call: Callable[[str], str],
     prompt_template: str,
 ) -> AgentState:
-    """Draft a reply using retrieved docs and LLM prompt template"""
-    prompt = prompt_template.format(
-        docs=[d["id"] for d in state.get("retrieved_docs", [])],
-        email=state["email_content"],
-    )
-    draft = llm_call(prompt)
+    """Draft a reply using retrieved docs and LLM prompt template.
+
+    The email is compressed and docs are trimmed (lowest-ranked first) to fit
+    the configured prompt token budget; docs without text are passed through.
+    Templates should place ``{email}`` last so the rendered prefix is reusable
+    across emails; the hash of everything before the email is logged. The
+    model tier comes from model_router (if ``llm_call`` takes ``model``).
+    """
+    prompt, docs, prefix_hash = _render_draft_prompt(state, prompt_template)
+    tier, route_reason, model_kwargs = _route(state, llm_call)
+    draft, usage = _timed_llm_call(state, tier, llm_call, prompt, **model_kwargs)
     state["draft_reply"] = draft
-    _log(state, "draft_reply", {"prompt_snippet": prompt[:200]})
+    _log(
+        state,
+        "draft_reply",
+        {
+            "prompt_snippet": prompt[:200],
+            "prompt_tokens": usage["prompt"],
+            "completion_tokens": usage["completion"],
+            "prefix_hash": prefix_hash,
+            "dropped_docs": len(state.get("retrieved_docs", [])) - len(docs),
+            "model_tier": tier,
+            "route_reason": route_reason,
+        },
+    )
+    return state
+
+
+def faq_reply(
+    state: AgentState,
+    faq_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]],
+) -> Optional[AgentState]:
+    """Answer with the canonical FAQ entry, without an LLM call; None if the email is not an FAQ.
+
+    The entry is prepended to ``retrieved_docs`` so validation checks the
+    reply against it. Logged as ``draft_reply``, so the run continues with
+    validate in either draft mode.
+    """
+    match = faq_lookup(state.get("email_content", "")) if faq_lookup else None
+    if not match:
+        return None
+    from app.rag.faq_index import as_doc
+
+    doc = as_doc(match)
+    state["draft_reply"] = match["reply"]
+    state["retrieved_docs"] = [doc] + list(state.get("retrieved_docs", []))
+    state["model_tier"] = None
+    if state.get("drafting"):
+        state["drafting"]["mode"] = "faq"
+    metrics.add_llm_calls_saved(1)
+    metrics.add_tokens_saved(count_tokens(state.get("email_content", "")) + get_config().max_completion_tokens)
+    _log(state, "draft_reply", {"faq_match": doc["id"], "faq_score": match.get("score"), "model_tier": None})
     return state
 
 
@@ -69,6 +226,12 @@ def validate_reply(
     """Run validator (factuality, PII, style)."""
     result = validator(state.get("draft_reply", ""), state.get("retrieved_docs", []))
     state["validation_result"] = result
+    tier = state.get("model_tier")
+    if tier:
+        metrics.record_tier_validation(tier, bool(result.get("is_valid")))
+        if tier == model_router.FAST and not result.get("is_valid"):
+            # The rewrite is routed to the large tier
+            metrics.increment_tier_fallbacks(tier)
     _log(state, "validate_reply", {"result": result})
     return state
 
@@ -84,26 +247,187 @@ def rewrite_reply(
     prompt = rewrite_prompt_template.format(
         reason=reason, draft=state.get("draft_reply", "")
     )
-    new = llm_call(prompt)
+    tier, _, model_kwargs = _route(state, llm_call, rewrite=True)
+    new, usage = _timed_llm_call(state, tier, llm_call, prompt, **model_kwargs)
     state["draft_reply"] = new
     _log(
         state,
         "rewrite_reply",
-        {"rewrite_count": state["rewrite_count"], "prompt_snippet": prompt[:200]},
+        {
+            "rewrite_count": state["rewrite_count"],
+            "prompt_snippet": prompt[:200],
+            "prompt_tokens": usage["prompt"],
+            "completion_tokens": usage["completion"],
+            "model_tier": tier,
+        },
     )
 
     metrics.increment_rewrite_attempts()
     return state
 
 
+# Candidate variants for speculative drafting: (temperature, instruction appended
+# after the email so the cached prompt prefix is unchanged)
+SPECULATIVE_VARIANTS: List[Tuple[float, str]] = [
+    (0.3, ""),
+    (0.0, "\n\nAnswer strictly from the policy documents above."),
+    (0.7, "\n\nKeep the reply brief and state only facts found in the policy documents."),
+]
+
+
+def speculative_draft(
+    state: AgentState,
+    llm_call: Callable[[str], str],
+    prompt_template: str,
+    validator: Callable[[str, List[Dict[str, Any]]], Dict[str, Any]],
+    num_candidates: int,
+    variants: Optional[List[Tuple[float, str]]] = None,
+    stagger: Optional[float] = None,
+) -> AgentState:
+    """Draft and validate up to ``num_candidates`` variants as hedged requests; keep the first valid.
+
+    Variants differ in temperature (if ``llm_call`` takes a ``temperature``
+    keyword) and in a short instruction after the email. The first candidate
+    starts at once; each next one starts when the running ones all failed
+    validation or ``stagger`` seconds (AGENT_SPECULATIVE_STAGGER_MS) pass
+    without a valid draft. Candidates not started when one validates are
+    never sent to the LLM; calls already in flight finish in the background
+    and only their token cost is recorded. With ``stagger=0`` every candidate
+    starts immediately. If no candidate validates, the first completed draft
+    is kept with its failed result.
+    """
+    variants = variants or SPECULATIVE_VARIANTS
+    if stagger is None:
+        stagger = get_config().speculative_stagger_ms / 1000
+    prompt, _, prefix_hash = _render_draft_prompt(state, prompt_template)
+    docs = state.get("retrieved_docs", [])
+    with_temperature = _accepts_kwarg(llm_call, "temperature")
+    tier, route_reason, model_kwargs = _route(state, llm_call)
+
+    def attempt(i: int) -> Tuple[int, str, str, Dict[str, Any]]:
+        temperature, suffix = variants[i % len(variants)]
+        candidate_prompt = prompt + suffix
+        start = time.perf_counter()
+        if with_temperature:
+            draft = llm_call(candidate_prompt, temperature=temperature, **model_kwargs)
+        else:
+            draft = llm_call(candidate_prompt, **model_kwargs)
+        metrics.record_model_call(
+            tier, time.perf_counter() - start, count_tokens(candidate_prompt), count_tokens(draft)
+        )
+        return i, candidate_prompt, draft, validator(draft, docs)
+
+    def record_late(future) -> None:
+        # Cost of calls that lost the race but could not be interrupted
+        if future.exception() is not None:
+            return
+        _, late_prompt, late_draft, _ = future.result()
+        prompt_tokens, completion_tokens = count_tokens(late_prompt), count_tokens(late_draft)
+        metrics.add_prompt_tokens(prompt_tokens)
+        metrics.add_completion_tokens(completion_tokens)
+        metrics.add_draft_mode_tokens("speculative", prompt_tokens + completion_tokens)
+
+    pool = ThreadPoolExecutor(max_workers=num_candidates)
+    futures: Dict[Any, int] = {}
+    outcomes: List[Dict[str, Any]] = []
+    chosen = None
+    first_error: Optional[BaseException] = None
+
+    def launch(count: int) -> None:
+        for _ in range(min(count, num_candidates - len(futures))):
+            futures[pool.submit(attempt, len(futures))] = len(futures)
+
+    try:
+        launch(num_candidates if stagger <= 0 else 1)
+        running = set(futures)
+        while running:
+            more = len(futures) < num_candidates
+            done, running = wait(running, timeout=stagger if more else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    i, candidate_prompt, draft, result = future.result()
+                except Exception as e:
+                    first_error = first_error or e
+                    outcomes.append({"candidate": futures[future], "error": str(e)})
+                    continue
+                usage = _record_tokens(state, candidate_prompt, draft)
+                outcomes.append({
+                    "candidate": i,
+                    "is_valid": bool(result.get("is_valid")),
+                    "reason": result.get("reason"),
+                    "completion_tokens": usage["completion"],
+                })
+                if chosen is None or (result.get("is_valid") and not chosen[1].get("is_valid")):
+                    chosen = (draft, result, i)
+                if result.get("is_valid"):
+                    break
+                metrics.increment_validation_failures()
+            if chosen is not None and chosen[1].get("is_valid"):
+                break
+            if more:
+                # No valid draft within the stagger, or a candidate failed: hedge
+                before = len(futures)
+                launch(1)
+                running |= set(list(futures)[before:])
+    finally:
+        seen = {o["candidate"] for o in outcomes}
+        for future, i in futures.items():
+            if i not in seen:
+                future.add_done_callback(record_late)
+        pool.shutdown(wait=False)
+
+    if chosen is None:
+        # Every candidate raised: surface the error like a single draft would
+        raise first_error
+    state["draft_reply"], state["validation_result"], winner = chosen
+    state["model_tier"] = tier
+    metrics.record_tier_validation(tier, bool(chosen[1].get("is_valid")))
+    if tier == model_router.FAST and not chosen[1].get("is_valid"):
+        metrics.increment_tier_fallbacks(tier)
+    _log(
+        state,
+        "speculative_draft",
+        {
+            "candidates": num_candidates,
+            "winner": winner if chosen[1].get("is_valid") else None,
+            "outcomes": outcomes,
+            "started": len(futures),
+            "not_started": num_candidates - len(futures),
+            "abandoned": len(futures) - len(outcomes),
+            "prefix_hash": prefix_hash,
+            "model_tier": tier,
+            "route_reason": route_reason,
+        },
+    )
+    return state
+
+
 def send_email(
     state: AgentState,
     gmail_send: Callable[[str, str], str],
     pii_redactor: Callable[[str], str],
 ) -> AgentState:
-    """Send final reply via Gmail client after PII redaction."""
-    body = pii_redactor(state.get("draft_reply", ""))
+    """Send final reply via Gmail client after PII redaction.
+
+    A redactor that takes ``allow`` keeps contact details quoted verbatim from
+    the retrieved docs, matching what validation accepted. Idempotent per
+    email_id: if a reply was already recorded for this Gmail message (e.g. a
+    crash after sending), the recorded send is reused.
+    """
+    draft = state.get("draft_reply", "")
+    redact_kwargs = {}
+    if _accepts_kwarg(pii_redactor, "allow"):
+        redact_kwargs["allow"] = quoted_pii(draft, state.get("retrieved_docs", []))
+    body = pii_redactor(draft, **redact_kwargs)
+    prior = persistence.get_sent_record(state["email_id"])
+    if prior:
+        state["final_reply"] = prior.get("body", body)
+        state["status"] = "sent"
+        _log(state, "send_email", {"msg_id": prior.get("msg_id"), "deduplicated": True})
+        return state
+
     msg_id = gmail_send(state["email_id"], body)
+    persistence.record_sent(state["email_id"], msg_id, state.get("run_id"), body)
     state["final_reply"] = body
     state["status"] = "sent"
     _log(state, "send_email", {"msg_id": msg_id})
@@ -124,6 +448,162 @@ def escalate(
     return state
 
 
+def _start_drafting(state: AgentState) -> None:
+    """Mark the start of the drafting phase (first draft until a send/escalate decision)."""
+    usage = state.get("token_usage", {})
+    state["drafting"] = {
+        "mode": state.get("draft_mode", "sequential"),
+        "started_at": _now(),
+        "tokens_before": usage.get("prompt", 0) + usage.get("completion", 0),
+    }
+
+
+def _finish_drafting(state: AgentState) -> None:
+    """Record latency and token cost of the drafting phase per mode, once."""
+    drafting = state.get("drafting")
+    if not drafting or "latency" in drafting:
+        return
+    usage = state.get("token_usage", {})
+    drafting["latency"] = _now() - drafting["started_at"]
+    drafting["tokens"] = usage.get("prompt", 0) + usage.get("completion", 0) - drafting["tokens_before"]
+    drafting["is_valid"] = bool(state.get("validation_result", {}).get("is_valid"))
+    metrics.record_drafting(
+        drafting["mode"], drafting["latency"], drafting["tokens"], drafting["is_valid"]
+    )
+
+
+def _policy_blocks_send(state: AgentState, pii_policy: str) -> bool:
+    """Apply pii_policy to a validated draft: True means escalate instead of send.
+
+    ``block_and_escalate`` only blocks drafts that contain customer PII; values
+    quoted from the retrieved policy (support numbers, addresses) do not count,
+    matching validate_draft.
+    """
+    if pii_policy == "redact_and_send":
+        return False
+    if pii_policy == "block_and_escalate":
+        return bool(customer_pii(state.get("draft_reply", ""), state.get("retrieved_docs", [])))
+    raise ValueError(f"Unknown pii_policy: {pii_policy}")
+
+
+_TERMINAL_STATUSES = ("sent", "escalated", "ignored")
+
+
+def _last_node(state: AgentState) -> Optional[str]:
+    """Most recent completed node step in the run log (bookkeeping entries skipped)."""
+    for entry in reversed(state.get("log", [])):
+        if entry.get("Step") in _NODE_STEPS:
+            return entry["Step"]
+    return None
+
+
+def _next_step(state: AgentState, max_rewrites: int, pii_policy: str) -> Optional[str]:
+    """Decide which node runs next from the persisted log; None when the run is done."""
+    if state.get("status") in _TERMINAL_STATUSES:
+        return None
+    last = _last_node(state)
+    if last is None:
+        return "triage"
+    if last == "triage":
+        return {"proceed": "retrieve", "escalate": "escalate", "ignore": "ignore"}[
+            state["triage"]["decision"]
+        ]
+    if last == "retrieve_context":
+        return "draft_speculative" if state.get("draft_mode") == "speculative" else "draft"
+    if last == "speculative_draft":
+        if state.get("validation_result", {}).get("is_valid"):
+            return "escalate" if _policy_blocks_send(state, pii_policy) else "send"
+        return "escalate"
+    if last in ("draft_reply", "rewrite_reply"):
+        return "validate"
+    if last == "validate_reply":
+        if state.get("validation_result", {}).get("is_valid"):
+            return "escalate" if _policy_blocks_send(state, pii_policy) else "send"
+        # attempts so far = rewrites done + the validation that just failed
+        if state.get("rewrite_count", 0) + 1 >= max_rewrites:
+            return "escalate"
+        return "rewrite"
+    return None
+
+
+_NODE_STEPS = (
+    "triage",
+    "retrieve_context",
+    "draft_reply",
+    "speculative_draft",
+    "validate_reply",
+    "rewrite_reply",
+    "send_email",
+    "escalate",
+    "ignore",
+)
+
+
+def _drive(
+    state: AgentState,
+    run_id: str,
+    nodes: Dict[str, Callable[[AgentState], AgentState]],
+    max_rewrites: int,
+    pii_policy: str,
+) -> AgentState:
+    """Execute nodes until the run reaches a terminal status, persisting after each."""
+    while True:
+        step = _next_step(state, max_rewrites, pii_policy)
+        if step is None:
+            log_action(
+                f"run_{state.get('status')}",
+                run_id=run_id,
+                email_id=state.get("email_id"),
+                reason=state.get("validation_result", {}).get("reason"),
+                rewrites=state.get("rewrite_count", 0),
+            )
+            if state.get("status") in _TERMINAL_STATUSES:
+                # Batched into the dashboard's email_logs table
+                email_logs.record_run(state)
+                live_events.publish("run_finished", {
+                    "run_id": run_id,
+                    "email_id": state.get("email_id"),
+                    "status": state.get("status"),
+                    "reason": state.get("validation_result", {}).get("reason"),
+                    "timestamp": time.time(),
+                })
+            return state
+        if step in ("draft", "draft_speculative"):
+            _start_drafting(state)
+        state = nodes[step](state)
+        if step == "validate" and not state["validation_result"].get("is_valid"):
+            metrics.increment_validation_failures()
+        if step in ("validate", "draft_speculative") and _next_step(state, max_rewrites, pii_policy) != "rewrite":
+            _finish_drafting(state)
+        persistence.save_state(run_id, state)
+
+
+def _make_nodes(
+    rag_retrieve: Callable,
+    llm_call: Callable,
+    validator: Callable,
+    gmail_send: Callable,
+    escalate_handler: Callable,
+    pii_redactor: Callable,
+    prompt_template: str,
+    rewrite_prompt_template: str,
+    faq_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+) -> Dict[str, Callable[[AgentState], AgentState]]:
+    return {
+        "triage": triage_input,
+        "retrieve": lambda s: retrieve_context(s, rag_retrieve),
+        "draft": lambda s: faq_reply(s, faq_lookup) or draft_reply(s, llm_call, prompt_template),
+        "draft_speculative": lambda s: faq_reply(s, faq_lookup) or speculative_draft(
+            s, llm_call, prompt_template, validator, s.get("speculative_drafts", 2)
+        ),
+        "validate": lambda s: validate_reply(s, validator),
+        "rewrite": lambda s: rewrite_reply(s, llm_call, rewrite_prompt_template),
+        "send": lambda s: send_email(s, gmail_send, pii_redactor),
+        "escalate": lambda s: escalate(s, escalate_handler),
+        "ignore": ignore,
+    }
+
+
 def run_agent(
     initial_state: AgentState,
     run_id: str,
@@ -136,58 +616,181 @@ def run_agent(
     prompt_template: str,
     rewrite_prompt_template: str,
     max_rewrites: Optional[int] = None,
+    speculative_drafts: Optional[int] = None,
+    faq_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
 ) -> AgentState:
     """
     Execute full agent flow with retries and persistence.
-    Reads max_rewrites and pii_policy from config if not passed explicitly.
+    Reads max_rewrites, pii_policy and speculative_drafts from config if not
+    passed explicitly; speculative_drafts > 1 drafts that many candidates in
+    parallel instead of the sequential rewrite loop. With ``faq_lookup``
+    (e.g. faq_index.match), FAQ emails get the canonical answer without an
+    LLM call.
     """
     cfg = get_config()
     max_rewrites = max_rewrites or cfg.max_rewrites
     pii_policy = cfg.pii_policy
+    if speculative_drafts is None:
+        speculative_drafts = cfg.speculative_drafts
 
     state = dict(initial_state)
     state["run_id"] = run_id
     state["rewrite_count"] = state.get("rewrite_count", 0)
     state["status"] = "pending"
+    if speculative_drafts > 1:
+        state["draft_mode"] = "speculative"
+        state["speculative_drafts"] = speculative_drafts
+    else:
+        state["draft_mode"] = "sequential"
     _log(state, "run_started", {"run_id": run_id})
     persistence.save_state(run_id, state)
 
     metrics.increment_runs_started()
-    # 1. Retrieve
-    state = retrieve_context(state, rag_retrieve)
-    persistence.save_state(run_id, state)
+    live_events.publish("run_started", {
+        "run_id": run_id, "email_id": state.get("email_id"), "timestamp": time.time(),
+    })
+    nodes = _make_nodes(
+        rag_retrieve, llm_call, validator, gmail_send, escalate_handler,
+        pii_redactor, prompt_template, rewrite_prompt_template, faq_lookup,
+    )
+    return _drive(state, run_id, nodes, max_rewrites, pii_policy)
+
 
-    # 2. Draft
-    state = draft_reply(state, llm_call, prompt_template)
+def resume_agent(
+    run_id: str,
+    rag_retrieve: Callable,
+    llm_call: Callable,
+    validator: Callable,
+    gmail_send: Callable,
+    escalate_handler: Callable,
+    pii_redactor: Callable,
+    prompt_template: str,
+    rewrite_prompt_template: str,
+    max_rewrites: Optional[int] = None,
+    faq_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+) -> AgentState:
+    """Continue a persisted run from its last completed node.
+
+    Completed steps (retrieval, drafts) are not repeated, and the send step is
+    idempotent per email_id, so resuming after a crash never double-sends.
+    """
+    cfg = get_config()
+    max_rewrites = max_rewrites or cfg.max_rewrites
+
+    state = persistence.load_state(run_id)
+    if state.get("status") in _TERMINAL_STATUSES:
+        return state
+    _log(state, "run_resumed", {"run_id": run_id, "after": _last_node(state)})
     persistence.save_state(run_id, state)
 
-    # 3. Validate + rewrite loop
-    attempts = 0
-    while True:
-        state = validate_reply(state, validator)
-        persistence.save_state(run_id, state)
+    nodes = _make_nodes(
+        rag_retrieve, llm_call, validator, gmail_send, escalate_handler,
+        pii_redactor, prompt_template, rewrite_prompt_template, faq_lookup,
+    )
+    return _drive(state, run_id, nodes, max_rewrites, cfg.pii_policy)
 
-        if state["validation_result"].get("is_valid"):
-            if pii_policy == "redact_and_send":
-                state = send_email(state, gmail_send, pii_redactor)
-            elif pii_policy == "block_and_escalate":
-                state = escalate(state, escalate_handler)
-            else:
-                raise ValueError(f"Unknown pii_policy: {pii_policy}")
 
-            persistence.save_state(run_id, state)
-            return state
-        else:
-            metrics.increment_validation_failures()
+def resume_pending_runs(stale_after: float = 0.0, **callables: Any) -> List[AgentState]:
+    """Startup sweep: resume every persisted run still marked ``pending``.
 
-        attempts += 1
-        if attempts >= max_rewrites:
-            state = escalate(state, escalate_handler)
-            persistence.save_state(run_id, state)
-            return state
+    ``callables`` are the same keyword arguments run_agent takes (rag_retrieve,
+    llm_call, ..., rewrite_prompt_template). Runs updated within the last
+    ``stale_after`` seconds are skipped as possibly still in flight.
+    """
+    resumed = []
+    for run_id in persistence.list_run_ids(status="pending", older_than=stale_after):
+        try:
+            resumed.append(resume_agent(run_id, **callables))
+        except Exception as e:
+            print(f" Could not resume run {run_id}: {e}")
+    return resumed
+
+
+DEFAULT_PROMPT_TEMPLATE = (
+    "You are a customer support assistant for an airline. Answer the customer's "
+    "email using only the policy documents {docs}. Do not invent amounts, fees or "
+    "time limits.\n\nCustomer email:\n{email}"
+)
+DEFAULT_REWRITE_PROMPT_TEMPLATE = (
+    "Rewrite this draft reply so that it passes validation ({reason}). Keep only "
+    "facts stated in the policy documents.\n\nDraft:\n{draft}"
+)
+
+
+def default_runtime() -> Dict[str, Any]:
+    """Production run_agent callables: FAISS retrieval, Groq, pii_guard, Gmail and the escalation queue."""
+    # Imported lazily: they pull in the vector store, LLM and Gmail clients
+    from app.agent.pii_guard import redact_pii, validate_draft
+    from app.gmail.gmail_utils import reply_to_message
+    from app.models.llm_model import generate_response
+    from app.rag import faq_index
+    from app.rag.rag_pipeline import retrieve_documents
+    from app.services import escalations
+
+    def escalate_handler(state: AgentState) -> str:
+        # Same key as the run's email_logs row, which links to the item when written
+        item = escalations.enqueue(
+            f"run:{state['run_id']}",
+            reason=state.get("validation_result", {}).get("reason", ""),
+            run_id=state["run_id"],
+            email_id=state.get("email_id"),
+        )
+        return f"escalation:{item['id']}"
+
+    return {
+        "rag_retrieve": lambda query, top_k=5: retrieve_documents(query, top_k),
+        "llm_call": lambda prompt, model=None, temperature=0.3: generate_response(
+            prompt, model=model, temperature=temperature
+        ),
+        "validator": validate_draft,
+        "gmail_send": reply_to_message,
+        "escalate_handler": escalate_handler,
+        "pii_redactor": redact_pii,
+        "prompt_template": DEFAULT_PROMPT_TEMPLATE,
+        "rewrite_prompt_template": DEFAULT_REWRITE_PROMPT_TEMPLATE,
+        "faq_lookup": faq_index.match,
+    }
+
+
+_runtime: Dict[str, Any] = {}
+
+
+def register_runtime(**callables: Any) -> None:
+    """Override default_runtime() callables the startup sweep resumes runs with.
+
+    Call this from the module that builds the app, before startup.
+    """
+    _runtime.update(callables)
 
-        state = rewrite_reply(state, llm_call, rewrite_prompt_template)
-        persistence.save_state(run_id, state)
+
+def resume_on_startup() -> None:
+    """Resume pending runs in a background thread (API startup, AGENT_RESUME_ON_STARTUP=1).
+
+    Runs use default_runtime() plus anything passed to register_runtime. Runs
+    updated within AGENT_RESUME_STALE_SECONDS (default 60) may still be in
+    flight in another process and are left alone.
+    """
+    runtime = dict(_runtime)
+    try:
+        runtime = {**default_runtime(), **runtime}
+    except ImportError as e:
+        print(f" Default agent runtime unavailable ({e}); resuming with registered callables only")
+    stale_after = float(os.getenv("AGENT_RESUME_STALE_SECONDS", "60"))
+
+    def sweep():
+        resumed = resume_pending_runs(stale_after, **runtime)
+        print(f" Resumed {len(resumed)} pending agent run(s)")
+
+    threading.Thread(target=sweep, name="agent-resume", daemon=True).start()
+
+
+def ignore(state: AgentState) -> AgentState:
+    """Drop the email without replying (spam / no content)."""
+    state["status"] = "ignored"
+    _log(state, "ignore", {"reason": state.get("triage", {}).get("reason")})
+
+    metrics.increment_runs_ignored()
+    return state
 
 
 # === Explainability Export Helper === #
@@ -216,9 +819,18 @@ def build_agent_graph(
     rewrite_prompt_template: str,
     *,
     max_rewrites: Optional[int] = None,
+    checkpointer: Any = None,
+    speculative_drafts: Optional[int] = None,
+    faq_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
 ):
     """Build a LangGraph StateGraph that mirrors run_agent control-flow.
 
+    With speculative_drafts > 1 (default from config), retrieve is followed by
+    one staggered draft+validate node instead of the draft/validate/rewrite loop.
+
+    Pass a LangGraph checkpointer (see get_checkpointer) to make runs resumable
+    with resume_with_graph; the run_id is used as the checkpoint thread_id.
+
     Returns a compiled graph if langgraph is installed; otherwise raises ImportError.
     """
     if not _HAS_LANGGRAPH:
@@ -227,15 +839,39 @@ def build_agent_graph(
     cfg = get_config()
     max_rewrites = max_rewrites or cfg.max_rewrites
     pii_policy = cfg.pii_policy
+    if speculative_drafts is None:
+        speculative_drafts = cfg.speculative_drafts
+    speculative = speculative_drafts > 1
+
+    def node_triage(state: AgentState) -> AgentState:
+        return triage_input(state)
+
+    def node_ignore(state: AgentState) -> AgentState:
+        return ignore(state)
 
     def node_retrieve(state: AgentState) -> AgentState:
         return retrieve_context(state, rag_retrieve)
 
     def node_draft(state: AgentState) -> AgentState:
-        return draft_reply(state, llm_call, prompt_template)
+        _start_drafting(state)
+        return faq_reply(state, faq_lookup) or draft_reply(state, llm_call, prompt_template)
+
+    def node_draft_speculative(state: AgentState) -> AgentState:
+        state["draft_mode"] = "speculative"
+        _start_drafting(state)
+        faq = faq_reply(state, faq_lookup)
+        if faq:
+            state = validate_reply(faq, validator)
+        else:
+            state = speculative_draft(state, llm_call, prompt_template, validator, speculative_drafts)
+        _finish_drafting(state)
+        return state
 
     def node_validate(state: AgentState) -> AgentState:
-        return validate_reply(state, validator)
+        state = validate_reply(state, validator)
+        if should_finish(state) != "rewrite":
+            _finish_drafting(state)
+        return state
 
     def node_rewrite(state: AgentState) -> AgentState:
         return rewrite_reply(state, llm_call, rewrite_prompt_template)
@@ -246,6 +882,9 @@ def build_agent_graph(
     def node_escalate(state: AgentState) -> AgentState:
         return escalate(state, escalate_handler)
 
+    def after_triage(state: AgentState) -> str:
+        return state.get("triage", {}).get("decision", "proceed")
+
     def should_finish(state: AgentState) -> str:
         """Router after validate: send/escalate or rewrite.
 
@@ -263,34 +902,53 @@ def build_agent_graph(
         return "rewrite"
 
     def follow_policy(state: AgentState) -> str:
-        if pii_policy == "redact_and_send":
-            return "send"
-        if pii_policy == "block_and_escalate":
-            return "escalate"
-        raise ValueError(f"Unknown pii_policy: {pii_policy}")
+        return "escalate" if _policy_blocks_send(state, pii_policy) else "send"
 
     graph = StateGraph(dict)  # using plain dict state
+    graph.add_node("triage", node_triage)
     graph.add_node("retrieve", node_retrieve)
-    graph.add_node("draft", node_draft)
-    graph.add_node("validate", node_validate)
-    graph.add_node("rewrite", node_rewrite)
+    if speculative:
+        graph.add_node("draft_speculative", node_draft_speculative)
+    else:
+        graph.add_node("draft", node_draft)
+        graph.add_node("validate", node_validate)
+        graph.add_node("rewrite", node_rewrite)
     graph.add_node("send", node_send)
     graph.add_node("escalate", node_escalate)
+    graph.add_node("ignore", node_ignore)
+    # Pass-through node; routing happens on its conditional edges
+    graph.add_node("policy_router", lambda state: state)
 
-    graph.set_entry_point("retrieve")
-    graph.add_edge("retrieve", "draft")
-    graph.add_edge("draft", "validate")
-
-    # Router after validate
+    graph.set_entry_point("triage")
     graph.add_conditional_edges(
-        "validate",
-        should_finish,
-        {
-            "policy": "policy_router",
-            "rewrite": "rewrite",
-            "escalate": "escalate",
-        },
+        "triage",
+        after_triage,
+        {"proceed": "retrieve", "escalate": "escalate", "ignore": "ignore"},
     )
+    if speculative:
+        graph.add_edge("retrieve", "draft_speculative")
+        graph.add_conditional_edges(
+            "draft_speculative",
+            lambda state: "policy" if state.get("validation_result", {}).get("is_valid") else "escalate",
+            {"policy": "policy_router", "escalate": "escalate"},
+        )
+    else:
+        graph.add_edge("retrieve", "draft")
+        graph.add_edge("draft", "validate")
+
+        # Router after validate
+        graph.add_conditional_edges(
+            "validate",
+            should_finish,
+            {
+                "policy": "policy_router",
+                "rewrite": "rewrite",
+                "escalate": "escalate",
+            },
+        )
+
+        # After rewrite, go back to validate
+        graph.add_edge("rewrite", "validate")
 
     # A lightweight policy router node implemented via conditional edges
     graph.add_conditional_edges(
@@ -299,14 +957,44 @@ def build_agent_graph(
         {"send": "send", "escalate": "escalate"},
     )
 
-    # After rewrite, go back to validate
-    graph.add_edge("rewrite", "validate")
-
     # Terminal nodes
     graph.add_edge("send", END)
     graph.add_edge("escalate", END)
+    graph.add_edge("ignore", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
+
+
+def get_checkpointer(path: str = os.path.join("runs", "checkpoints.sqlite")):
+    """Return a durable SQLite LangGraph checkpointer, or an in-memory one.
+
+    The SQLite saver ships in the optional ``langgraph-checkpoint-sqlite`` package;
+    without it, checkpoints only survive for the life of the process.
+    """
+    if not _HAS_LANGGRAPH:
+        raise ImportError("langgraph is not installed. Add 'langgraph' to dependencies.")
+    try:
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    except ImportError:
+        from langgraph.checkpoint.memory import MemorySaver
+
+        return MemorySaver()
+
+
+def _stream_and_persist(compiled_graph, graph_input, run_id: str, state: AgentState):
+    config = {"configurable": {"thread_id": run_id}}
+    # stream_mode="values" yields the full state after every node
+    for step in compiled_graph.stream(graph_input, config, stream_mode="values"):
+        persistence.save_state(run_id, step)
+        state = step
+
+    # Final state is last yielded
+    persistence.save_state(run_id, state)
+    return state
 
 
 def run_with_graph(
@@ -324,11 +1012,13 @@ def run_with_graph(
     _log(state, "run_started", {"run_id": run_id})
     persistence.save_state(run_id, state)
 
-    for step in compiled_graph.stream(state):  # yields intermediate states
-        # step is a dict-like state; persist incrementally
-        persistence.save_state(run_id, step)
-        state = step
+    return _stream_and_persist(compiled_graph, state, run_id, state)
 
-    # Final state is last yielded
-    persistence.save_state(run_id, state)
-    return state
+
+def resume_with_graph(compiled_graph, run_id: str) -> AgentState:
+    """Resume a checkpointed graph run (compiled with a checkpointer) where it stopped."""
+    state = persistence.load_state(run_id)
+    if state.get("status") in _TERMINAL_STATUSES:
+        return state
+    # Streaming None continues from the last checkpoint for this thread_id
+    return _stream_and_persist(compiled_graph, None, run_id, state)
@@ -1,30 +1,92 @@
-from app.models.llm_model import generate_response   
-from app.rag.rag_pipeline import retrieve_context    
+from typing import Any, Dict, Optional
 
+from app.models.llm_model import generate_chat
+from app.rag import faq_index
+from app.rag.rag_pipeline import retrieve_documents
+from app.agent import model_router
+from app.agent.pii_guard import validate_draft
+from app.agent.prompt_budget import compress_email, count_tokens, fit_prompt
+from app.agent.triage import estimate_tokens
+from app.agent.prompt_builder import SYSTEM_PREAMBLE, build_messages, prefix_hashes, track_prefix
+from app.services import metrics
+from app.config import get_config
 
-def draft_reply(email_body: str) -> str:
+
+def _add_tokens(usage: Optional[Dict[str, int]], prompt: int, completion: int) -> None:
+    metrics.add_prompt_tokens(prompt)
+    metrics.add_completion_tokens(completion)
+    if usage is not None:
+        usage["prompt"] = usage.get("prompt", 0) + prompt
+        usage["completion"] = usage.get("completion", 0) + completion
+
+
+def draft_reply(
+    email_body: str, triage: Optional[Dict[str, Any]] = None, usage: Optional[Dict[str, int]] = None
+) -> str:
     """
-    Generate intelligent reply using RAG + Groq LLM
+    Generate intelligent reply using RAG + Groq LLM.
+    Emails that match an FAQ question get its canonical answer without an LLM
+    call, if it validates against the matched entry. Otherwise the model tier
+    is picked by model_router; a fast-tier reply that fails validation is
+    regenerated with the large model. Prompt/completion tokens of every call
+    are added to ``usage`` ({"prompt", "completion"}) so the caller can store
+    them with the run.
     """
-    # Step 1: Retrieve airline policy context from FAISS
-    context = retrieve_context(email_body)
+    cfg = get_config()
 
-    # Step 2: Construct the prompt
-    prompt = f"""
-    You are an airline customer support assistant.
-    Use the following policy context to answer the email.
-    If the answer is not in the context, politely escalate.
+    # Step 0: FAQ fast path (question index, no retrieval or LLM)
+    faq = faq_index.match(email_body)
+    if faq:
+        result = validate_draft(faq["reply"], [faq_index.as_doc(faq)])
+        if result["is_valid"]:
+            metrics.add_llm_calls_saved(1)
+            metrics.add_tokens_saved(estimate_tokens(email_body) + cfg.max_completion_tokens)
+            return faq["reply"]
+        print(f" FAQ reply failed validation ({result['reason']}); drafting with the LLM")
 
-    Customer Email:
-    {email_body}
+    # Step 1: Retrieve airline policy context from FAISS (quoted history/signature
+    # would only dilute the query embedding)
+    docs = retrieve_documents(compress_email(email_body) or email_body)
+    chunks = [doc["content"] for doc in docs]
 
-    Relevant Policy Context:
-    {context}
+    # Step 2: Fit email + context into the token budget, then lay out the
+    # messages static-first so provider-side prefix caching can hit
+    fitted = fit_prompt(
+        email_body,
+        chunks,
+        budget=cfg.prompt_token_budget,
+        overhead=SYSTEM_PREAMBLE,
+    )
+    messages = build_messages(fitted["email"], fitted["chunks"])
+    if track_prefix(prefix_hashes(messages)["system"]):
+        metrics.increment_prompt_prefix_reused()
 
-    Draft a polite, professional reply:
-    """
+    # Step 3: Call Groq LLM via centralized model wrapper, on the routed tier
+    tier, _ = model_router.route(email_body, docs, triage)
+
+    def call(tier: str) -> str:
+        return model_router.timed_call(
+            tier,
+            lambda: generate_chat(messages, model=model_router.model_for(tier), max_tokens=cfg.max_completion_tokens),
+            fitted["stats"]["prompt"],
+        )
 
-    # Step 3: Call Groq LLM via centralized model wrapper
-    reply = generate_response(prompt)
+    try:
+        reply = call(tier)
+    except Exception as e:
+        if tier != model_router.FAST:
+            raise
+        print(f" Fast model failed, retrying with the large model. Error: {e}")
+        metrics.increment_tier_fallbacks(tier)
+        tier = model_router.LARGE
+        reply = call(tier)
+    _add_tokens(usage, fitted["stats"]["prompt"], count_tokens(reply))
 
+    if tier == model_router.FAST:
+        valid = validate_draft(reply, docs)["is_valid"]
+        metrics.record_tier_validation(tier, valid)
+        if not valid:
+            metrics.increment_tier_fallbacks(tier)
+            reply = call(model_router.LARGE)
+            _add_tokens(usage, fitted["stats"]["prompt"], count_tokens(reply))
     return reply
@@ -0,0 +1,71 @@
+"""Confidence-based routing between a fast and a large LLM tier.
+
+Each LLM request is routed from cheap signals already on hand before the call:
+- rewrites -> "large" (the first draft already failed validation)
+- triage flags or warnings -> "large"
+- emails over ROUTER_MAX_EMAIL_TOKENS -> "large" (long, multi-issue complaints)
+- best retrieval similarity below ROUTER_MIN_SIMILARITY -> "large"
+- otherwise -> "fast" (a short question close to a policy chunk)
+
+A fast-tier reply that fails validation is redone on the large tier. Without
+LLM_FAST_MODEL everything goes to LLM_MODEL, as before. Calls, latency,
+tokens and validation pass rate per tier are in metrics.model_tier_stats().
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from app.agent.prompt_budget import count_tokens
+from app.config import get_config
+from app.services import metrics
+
+__all__ = ["FAST", "LARGE", "route", "model_for", "top_score", "timed_call"]
+
+FAST = "fast"
+LARGE = "large"
+
+
+def top_score(docs: Sequence[Dict[str, Any]]) -> Optional[float]:
+    """Best retrieval similarity among ``docs`` (None if they carry no scores)."""
+    scores = [d["score"] for d in docs if isinstance(d.get("score"), (int, float))]
+    return max(scores) if scores else None
+
+
+def route(
+    email: str,
+    docs: Sequence[Dict[str, Any]],
+    triage: Optional[Dict[str, Any]] = None,
+    rewrite: bool = False,
+) -> Tuple[str, str]:
+    """Pick the tier for one request; returns (tier, reason)."""
+    cfg = get_config()
+    score = top_score(docs)
+    if not cfg.llm_fast_model:
+        tier, reason = LARGE, "no_fast_model"
+    elif rewrite:
+        tier, reason = LARGE, "rewrite"
+    elif triage and (triage.get("warnings") or any((triage.get("flags") or {}).values())):
+        tier, reason = LARGE, "triage_flags"
+    elif count_tokens(email or "") > cfg.router_max_email_tokens:
+        tier, reason = LARGE, "long_email"
+    elif score is None or score < cfg.router_min_similarity:
+        tier, reason = LARGE, "low_similarity"
+    else:
+        tier, reason = FAST, "confident"
+    metrics.record_route(tier, reason)
+    return tier, reason
+
+
+def model_for(tier: str) -> str:
+    cfg = get_config()
+    if tier == FAST and cfg.llm_fast_model:
+        return cfg.llm_fast_model
+    return cfg.llm_model
+
+
+def timed_call(tier: str, call: Callable[[], str], prompt_tokens: int) -> str:
+    """Run ``call`` and record its latency and token counts under ``tier``."""
+    start = time.perf_counter()
+    reply = call()
+    metrics.record_model_call(tier, time.perf_counter() - start, prompt_tokens, count_tokens(reply))
+    return reply
@@ -0,0 +1,306 @@
+"""Deterministic PII detection, redaction and draft validation.
+
+Provides production implementations of the ``validator`` and ``pii_redactor``
+callables expected by ``run_agent``/``build_agent_graph``:
+
+- validate_draft(draft, retrieved_docs) -> {"is_valid", "reason", "pii", "ungrounded"}
+- redact_pii(text) -> str
+
+Detection is a single regex scan per text; candidates are then confirmed with
+checksums (Luhn for cards, ISO 7064 mod-97 for IBANs) or context rules
+(e-tickets, PNR codes, phone numbers).
+"""
+
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "luhn_valid",
+    "iban_valid",
+    "detect_pii",
+    "customer_pii",
+    "quoted_pii",
+    "redact_pii",
+    "find_ungrounded_facts",
+    "validate_draft",
+    "validate_batch",
+    "redact_batch",
+]
+
+
+# One combined pattern so each text is scanned exactly once. Numeric runs are
+# captured generically and classified afterwards (card / e-ticket / phone).
+_PII_RE = re.compile(
+    r"""
+    (?P<email>[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})
+    |(?P<iban>\b[A-Z]{2}\d{2}(?:\ ?[A-Z0-9]{4}){2,7}(?:\ ?[A-Z0-9]{1,3})?\b)
+    |(?P<number>(?<![\w.,])\+?\d(?:[\ ()./-]{0,2}\d){6,18}(?![\w]))
+    |(?P<pnr>\b[A-Z0-9]{6}\b)
+    """,
+    re.VERBOSE,
+)
+
+# Dates (2024-05-12, 12.05.2024, 12/05/24) with an optional time: digit runs
+# shaped like phone numbers, e.g. "2024-05-12 10:30" scans as "2024-05-12 10"
+_DATE_RE = re.compile(
+    r"\b(?:(?:19|20)\d{2}(?P<s1>[-/.])\d{1,2}(?P=s1)\d{1,2}"
+    r"|\d{1,2}(?P<s2>[-/.])\d{1,2}(?P=s2)(?:19|20)?\d{2})\b"
+)
+
+_PNR_CONTEXT_RE = re.compile(
+    r"(booking\s+(?:reference|code|ref)|pnr|record\s+locator|reservation\s+(?:code|number))\W{0,5}$",
+    re.IGNORECASE,
+)
+
+# Facts that must be backed by policy context: currency amounts and
+# quantities with units (fees, time limits, weights, percentages).
+_FACT_RE = re.compile(
+    r"""
+    (?:(?:CHF|EUR|USD|GBP|[$€£])\ ?\d[\d,']*(?:\.\d+)?)
+    |(?:\d[\d,']*(?:\.\d+)?\ ?(?:CHF|EUR|USD|GBP))
+    |(?:\d+(?:\.\d+)?\ ?(?:%|percent|kg|lbs?|cm|days?|hours?|minutes?|weeks?|months?))
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+_REDACTION_LABELS = {
+    "email": "[REDACTED_EMAIL]",
+    "iban": "[REDACTED_IBAN]",
+    "card": "[REDACTED_CARD]",
+    "eticket": "[REDACTED_ETICKET]",
+    "phone": "[REDACTED_PHONE]",
+    "pnr": "[REDACTED_PNR]",
+}
+
+
+def luhn_valid(digits: str) -> bool:
+    """Luhn checksum used by payment card numbers."""
+    if not digits.isdigit():
+        return False
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch)
+        if i % 2 == 1:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+
+def iban_valid(iban: str) -> bool:
+    """ISO 13616 IBAN check (mod-97 == 1)."""
+    compact = iban.replace(" ", "").upper()
+    if not 15 <= len(compact) <= 34 or not compact.isalnum():
+        return False
+    rearranged = compact[4:] + compact[:4]
+    remainder = 0
+    for ch in rearranged:
+        # Letters expand to two digits (A=10 ... Z=35); fold incrementally
+        value = str(int(ch, 36))
+        for d in value:
+            remainder = (remainder * 10 + int(d)) % 97
+    return remainder == 1
+
+
+def _classify_number(raw: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", raw)
+    if len(digits) == 13 and digits.startswith("724"):
+        return "eticket"
+    if 13 <= len(digits) <= 19 and luhn_valid(digits):
+        return "card"
+    date = _DATE_RE.search(raw)
+    if date and len(re.sub(r"\D", "", raw.replace(date.group(), "", 1))) <= 4:
+        return None  # a date plus at most an hh/hhmm time
+    if raw.startswith("+") and 8 <= len(digits) <= 15:
+        return "phone"
+    if 9 <= len(digits) <= 15 and re.search(r"[ ()./-]", raw):
+        return "phone"
+    return None
+
+
+def _is_pnr(text: str, match: "re.Match[str]") -> bool:
+    token = match.group("pnr")
+    if not any(c.isalpha() for c in token):
+        return False
+    # Six-character codes collide with flight numbers (LX1234), fare classes and
+    # shouted words; require an explicit label
+    prefix = text[max(0, match.start() - 40) : match.start()]
+    return bool(_PNR_CONTEXT_RE.search(prefix))
+
+
+def detect_pii(text: str) -> List[Dict[str, Any]]:
+    """Return PII findings as dicts with keys {"type", "value", "start", "end"}."""
+    if not text:
+        return []
+    findings: List[Dict[str, Any]] = []
+    for m in _PII_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "iban" and not iban_valid(m.group()):
+            continue
+        if kind == "number":
+            kind = _classify_number(m.group())
+            if kind is None:
+                continue
+        if kind == "pnr" and not _is_pnr(text, m):
+            continue
+        findings.append(
+            {"type": kind, "value": m.group(), "start": m.start(), "end": m.end()}
+        )
+    return findings
+
+
+def customer_pii(
+    text: str,
+    retrieved_docs: Sequence[Dict[str, Any]],
+    *,
+    index: Optional[Tuple[str, FrozenSet[str]]] = None,
+) -> List[Dict[str, Any]]:
+    """detect_pii findings minus values quoted verbatim from the retrieved docs.
+
+    A support address or phone number copied from policy is not customer PII.
+    """
+    corpus = (index or _doc_index(retrieved_docs))[0]
+    return [f for f in detect_pii(text) if not (corpus and f["value"] in corpus)]
+
+
+def quoted_pii(
+    text: str,
+    retrieved_docs: Sequence[Dict[str, Any]],
+    *,
+    index: Optional[Tuple[str, FrozenSet[str]]] = None,
+) -> List[str]:
+    """PII-shaped values in ``text`` quoted verbatim from the retrieved docs.
+
+    The complement of customer_pii; pass it as ``redact_pii(..., allow=...)`` so
+    redaction keeps what validation accepted.
+    """
+    corpus = (index or _doc_index(retrieved_docs))[0]
+    return [f["value"] for f in detect_pii(text) if corpus and f["value"] in corpus]
+
+
+def redact_pii(text: str, *, allow: Iterable[str] = ()) -> str:
+    """Replace detected PII with typed placeholders.
+
+    Values listed in ``allow`` (e.g. a support address quoted from policy) are kept.
+    """
+    if not text:
+        return ""
+    allowed = set(allow)
+    out: List[str] = []
+    pos = 0
+    for f in detect_pii(text):
+        if f["value"] in allowed:
+            continue
+        out.append(text[pos : f["start"]])
+        out.append(_REDACTION_LABELS[f["type"]])
+        pos = f["end"]
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def _doc_text(doc: Dict[str, Any]) -> str:
+    for key in ("content", "page_content", "text"):
+        if doc.get(key):
+            return str(doc[key])
+    return ""
+
+
+_FACT_NUMBER_RE = re.compile(r"\d[\d,']*(?:\.\d+)?")
+
+
+def _normalize_fact(fact: str) -> str:
+    """Canonical key for an amount/quantity: "CHF 1'000.00" and "1,000 chf" -> "1000chf"."""
+    fact = fact.lower()
+    number = _FACT_NUMBER_RE.search(fact)
+    value = re.sub(r"[,']", "", number.group())
+    if "." in value:
+        value = value.rstrip("0").rstrip(".")
+    unit = re.sub(r"\s", "", fact[: number.start()] + fact[number.end() :])
+    if unit == "percent":
+        unit = "%"
+    elif len(unit) > 2 and unit.endswith("s"):
+        unit = unit[:-1]  # days -> day, lbs -> lb
+    return value + unit
+
+
+def _doc_index(docs: Sequence[Dict[str, Any]]) -> Tuple[str, FrozenSet[str]]:
+    """Concatenated doc text plus the normalized facts it states (built once per doc set)."""
+    corpus = "\n".join(_doc_text(d) for d in docs)
+    return corpus, frozenset(_normalize_fact(m.group()) for m in _FACT_RE.finditer(corpus))
+
+
+def find_ungrounded_facts(
+    draft: str,
+    retrieved_docs: Sequence[Dict[str, Any]],
+    *,
+    index: Optional[Tuple[str, FrozenSet[str]]] = None,
+) -> List[str]:
+    """List amounts/quantities in the draft that the retrieved docs do not state.
+
+    Facts are compared whole ("5 days" is not grounded by "15 days"). Returns an
+    empty list when the docs carry no text (nothing to ground against).
+    """
+    corpus, facts = index or _doc_index(retrieved_docs)
+    if not corpus:
+        return []
+    return [m.group() for m in _FACT_RE.finditer(draft or "") if _normalize_fact(m.group()) not in facts]
+
+
+def validate_draft(
+    draft: str,
+    retrieved_docs: Sequence[Dict[str, Any]],
+    *,
+    block_pii: bool = False,
+    index: Optional[Tuple[str, FrozenSet[str]]] = None,
+) -> Dict[str, Any]:
+    """Validate a draft reply: non-empty, grounded in the docs, optionally PII-free.
+
+    PII is always reported under ``pii``; it only fails validation when
+    ``block_pii`` is set (with ``redact_and_send`` the redactor handles it).
+    """
+    if not draft or not draft.strip():
+        return {"is_valid": False, "reason": "empty_draft", "pii": [], "ungrounded": []}
+
+    index = index or _doc_index(retrieved_docs)
+    pii = customer_pii(draft, retrieved_docs, index=index)
+    ungrounded = find_ungrounded_facts(draft, retrieved_docs, index=index)
+
+    reason = "ok"
+    if ungrounded:
+        reason = "ungrounded_facts: " + ", ".join(ungrounded)
+    elif block_pii and pii:
+        reason = "pii_detected: " + ", ".join(sorted({f["type"] for f in pii}))
+
+    return {
+        "is_valid": reason == "ok",
+        "reason": reason,
+        "pii": [{"type": f["type"], "start": f["start"], "end": f["end"]} for f in pii],
+        "ungrounded": ungrounded,
+    }
+
+
+def validate_batch(
+    items: Iterable[Tuple[str, Sequence[Dict[str, Any]]]],
+    *,
+    block_pii: bool = False,
+) -> List[Dict[str, Any]]:
+    """Validate many (draft, retrieved_docs) pairs for sweeps.
+
+    Fact indexes are built once per distinct document set, so drafts that share
+    retrieval results (common for FAQ-style traffic) reuse them.
+    """
+    results = []
+    cache: Dict[Tuple[Any, ...], Tuple[str, FrozenSet[str]]] = {}
+    for draft, docs in items:
+        key = tuple(d.get("id") or _doc_text(d) for d in docs)
+        if key not in cache:
+            cache[key] = _doc_index(docs)
+        results.append(validate_draft(draft, docs, block_pii=block_pii, index=cache[key]))
+    return results
+
+
+def redact_batch(texts: Iterable[str], *, allow: Iterable[str] = ()) -> List[str]:
+    """Redact a sequence of texts with a shared allow-list."""
+    allowed = set(allow)
+    return [redact_pii(t, allow=allowed) for t in texts]
@@ -0,0 +1,167 @@
+"""Prompt token accounting and context compression before LLM calls.
+
+fit_prompt() trims the customer email (quoted history, signature), drops
+duplicate/overlapping context chunks and then enforces a token budget by
+truncating the lowest-ranked context first. Token counts use tiktoken's
+``cl100k_base`` BPE (a declared dependency; it tracks Llama-3's vocabulary
+closely). If tiktoken is missing or cannot load its encoding (it is
+downloaded on first use), counts fall back to a word/punctuation estimate
+of ~1.3 tokens per piece, which can be off by 20% or more; leave that much
+headroom in AGENT_PROMPT_TOKEN_BUDGET on such installs.
+"""
+
+import re
+from typing import Any, Dict, List, Sequence
+
+from app.agent.validation_utils import strip_quoted_history, strip_signature
+
+try:
+    # Soft dependency: exact BPE counts if available
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # pragma: no cover - not installed, or the encoding download failed offline
+    _ENCODING = None
+    print(" tiktoken unavailable; prompt token counts are estimated (~1.3 tokens per word)")
+
+__all__ = [
+    "count_tokens",
+    "truncate_to_tokens",
+    "compress_email",
+    "dedupe_chunks",
+    "fit_prompt",
+]
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text`` under the local tokenizer."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # BPE splits long words; ~1.3 tokens per word/punctuation piece on English text
+    return int(len(_WORD_RE.findall(text)) * 1.3) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to at most ``max_tokens`` tokens (ellipsis marks the cut)."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _ENCODING is not None:
+        ids = _ENCODING.encode(text, disallowed_special=())
+        return _ENCODING.decode(ids[: max_tokens - 1]) + "…"
+    pieces = list(_WORD_RE.finditer(text))
+    keep = max(0, int((max_tokens - 1) / 1.3) - 1)
+    if keep >= len(pieces):
+        return text
+    return text[: pieces[keep].start()].rstrip() + "…"
+
+
+def compress_email(email_body: str) -> str:
+    """Strip quoted reply history and trailing signature from a raw email body."""
+    return strip_signature(strip_quoted_history(email_body or ""))
+
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedupe_chunks(chunks: Sequence[str], *, containment: float = 0.8) -> List[str]:
+    """Drop empty, duplicate and mostly-contained chunks, preserving rank order.
+
+    A chunk is dropped when at least ``containment`` of its 5-word shingles
+    already appear in a higher-ranked chunk.
+    """
+    kept: List[str] = []
+    seen: set = set()
+    for chunk in chunks:
+        text = (chunk or "").strip()
+        if not text:
+            continue
+        sh = _shingles(text)
+        if sh and len(sh & seen) / len(sh) >= containment:
+            continue
+        kept.append(text)
+        seen |= sh
+    return kept
+
+
+def fit_prompt(
+    email_body: str,
+    chunks: Sequence[str],
+    *,
+    budget: int,
+    overhead: str = "",
+    min_email_tokens: int = 200,
+) -> Dict[str, Any]:
+    """Compress email + context so that overhead + email + context <= budget tokens.
+
+    ``chunks`` must be ordered best-first. Returns:
+    - email: compressed (and if needed truncated) email body
+    - chunks: surviving context chunks, best-first
+    - kept_indices: positions of surviving chunks in the input sequence
+    - stats: token counts {"overhead", "email", "context", "prompt", "budget",
+      "email_tokens_before", "context_tokens_before", "dropped_chunks", "truncated"}
+    """
+    overhead_tokens = count_tokens(overhead)
+    email_before = count_tokens(email_body)
+    context_before = sum(count_tokens(c) for c in chunks)
+
+    email = compress_email(email_body)
+    available = max(0, budget - overhead_tokens)
+
+    # The email always keeps a floor; context fills what remains.
+    email_tokens = count_tokens(email)
+    if email_tokens > available:
+        email = truncate_to_tokens(email, available)
+        email_tokens = count_tokens(email)
+    elif email_tokens > max(min_email_tokens, available // 2):
+        email = truncate_to_tokens(email, max(min_email_tokens, available // 2))
+        email_tokens = count_tokens(email)
+
+    index_of = {}
+    for i, c in enumerate(chunks):
+        index_of.setdefault((c or "").strip(), i)
+    unique = dedupe_chunks(chunks)
+
+    remaining = available - email_tokens
+    kept: List[str] = []
+    truncated = False
+    for chunk in unique:
+        tokens = count_tokens(chunk)
+        if tokens <= remaining:
+            kept.append(chunk)
+            remaining -= tokens
+            continue
+        # Lowest-ranked context is cut first: partially keep the boundary chunk,
+        # drop everything ranked below it.
+        if remaining > 20:
+            kept.append(truncate_to_tokens(chunk, remaining))
+            truncated = True
+            remaining = 0
+        break
+
+    context_tokens = sum(count_tokens(c) for c in kept)
+    return {
+        "email": email,
+        "chunks": kept,
+        "kept_indices": [index_of[c] for c in unique[: len(kept)]],
+        "stats": {
+            "overhead": overhead_tokens,
+            "email": email_tokens,
+            "context": context_tokens,
+            "prompt": overhead_tokens + email_tokens + context_tokens,
+            "budget": budget,
+            "email_tokens_before": email_before,
+            "context_tokens_before": context_before,
+            "dropped_chunks": len(chunks) - len(kept),
+            "truncated": truncated,
+        },
+    }
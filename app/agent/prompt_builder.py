@@ -0,0 +1,158 @@
+"""Cache-friendly prompt layout for chat completions.
+
+Providers that cache prompts do so by exact prefix, so the layout is:
+
+1. system: static preamble (identical for every request)
+2. system: policy context chunks in a deterministic order (sorted by chunk key,
+   not by retrieval score) so the same chunk set always renders identically
+3. user: the customer email (the only per-request content)
+
+prefix_hashes() returns stable hashes of (1) and (1)+(2) for tracking, and
+measure_prefix_reuse() replays a corpus of emails to report how often those
+prefixes repeat.
+
+CLI: python -m app.agent.prompt_builder emails.jsonl
+"""
+
+import hashlib
+import json
+import sys
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.agent.prompt_budget import count_tokens
+
+__all__ = [
+    "SYSTEM_PREAMBLE",
+    "order_chunks",
+    "build_messages",
+    "prefix_hashes",
+    "track_prefix",
+    "measure_prefix_reuse",
+]
+
+
+SYSTEM_PREAMBLE = """You are an airline customer support assistant.
+Use only the policy context below to answer the customer's email.
+If the answer is not in the context, politely say the request will be passed to a human agent.
+Write a polite, professional reply addressed to the customer. Do not invent fees, time limits or policies."""
+
+_CONTEXT_HEADER = "\n\nRelevant Policy Context:\n"
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def order_chunks(chunks: Sequence[str], keys: Optional[Sequence[Any]] = None) -> List[str]:
+    """Order chunks deterministically (by key, or by content hash when no keys)."""
+    if keys is None:
+        keys = [_hash(c) for c in chunks]
+    return [c for _, c in sorted(zip(keys, chunks), key=lambda kc: str(kc[0]))]
+
+
+def build_messages(
+    email: str,
+    chunks: Sequence[str],
+    *,
+    keys: Optional[Sequence[Any]] = None,
+    preamble: str = SYSTEM_PREAMBLE,
+) -> List[Dict[str, str]]:
+    """Build [system, user] chat messages with the stable content first."""
+    ordered = order_chunks(chunks, keys)
+    system = preamble
+    if ordered:
+        system += _CONTEXT_HEADER + "\n\n".join(ordered)
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": email},
+    ]
+
+
+def prefix_hashes(messages: Sequence[Dict[str, str]], preamble: str = SYSTEM_PREAMBLE) -> Dict[str, str]:
+    """Hashes of the shareable prefixes: preamble only, and full system message."""
+    system = messages[0]["content"] if messages else ""
+    return {"preamble": _hash(preamble), "system": _hash(system)}
+
+
+_SEEN_MAX = 50_000
+_seen: "OrderedDict[str, int]" = OrderedDict()
+_seen_lock = Lock()
+
+
+def track_prefix(system_hash: str) -> bool:
+    """Record a system-prefix hash; True if it was seen before in this process."""
+    with _seen_lock:
+        reused = system_hash in _seen
+        _seen[system_hash] = _seen.get(system_hash, 0) + 1
+        _seen.move_to_end(system_hash)
+        while len(_seen) > _SEEN_MAX:
+            _seen.popitem(last=False)
+    return reused
+
+
+def measure_prefix_reuse(
+    emails: Iterable[str],
+    retrieve: Callable[[str], Sequence[str]],
+    *,
+    preamble: str = SYSTEM_PREAMBLE,
+) -> Dict[str, Any]:
+    """Replay emails through the builder and report prefix reuse.
+
+    - system_reuse_rate: share of requests whose whole system message was seen before
+    - cacheable_token_share: share of prompt tokens covered by a previously seen
+      prefix (full system message if reused, else the preamble after the first request)
+    """
+    seen_system: set = set()
+    preamble_tokens = count_tokens(preamble)
+    requests = reused = 0
+    total_tokens = cacheable_tokens = 0
+    distinct: Dict[str, int] = {}
+
+    for email in emails:
+        messages = build_messages(email, retrieve(email), preamble=preamble)
+        h = prefix_hashes(messages, preamble)["system"]
+        system_tokens = count_tokens(messages[0]["content"])
+        total_tokens += system_tokens + count_tokens(messages[1]["content"])
+        if h in seen_system:
+            reused += 1
+            cacheable_tokens += system_tokens
+        elif requests:
+            cacheable_tokens += preamble_tokens
+        seen_system.add(h)
+        distinct[h] = distinct.get(h, 0) + 1
+        requests += 1
+
+    return {
+        "requests": requests,
+        "distinct_system_prefixes": len(distinct),
+        "system_reuse_rate": reused / requests if requests else 0.0,
+        "cacheable_token_share": cacheable_tokens / total_tokens if total_tokens else 0.0,
+        "top_prefixes": sorted(distinct.items(), key=lambda kv: kv[1], reverse=True)[:10],
+    }
+
+
+def _read_corpus(path: str) -> List[str]:
+    emails = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                emails.append(item.get("body") or item.get("email_content") or "")
+            except (json.JSONDecodeError, AttributeError):
+                emails.append(line)
+    return emails
+
+
+if __name__ == "__main__":
+    from app.rag.rag_pipeline import retrieve_chunks
+
+    if len(sys.argv) != 2:
+        print("usage: python -m app.agent.prompt_builder <emails.jsonl>")
+        sys.exit(2)
+    report = measure_prefix_reuse(_read_corpus(sys.argv[1]), retrieve_chunks)
+    print(json.dumps(report, indent=2))
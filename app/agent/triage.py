@@ -0,0 +1,98 @@
+"""Validation-first triage: decide before retrieval whether an email needs an LLM reply.
+
+Uses the flags from ``prepare_input_for_llm``:
+- prompt_injection -> "escalate" (a human should look at it)
+- spam_like / too_short -> "ignore" (no reply, no LLM spend)
+- otherwise -> "proceed"
+
+Spam and injection decisions are cached per Gmail thread so follow-ups in a
+flagged thread are routed the same way without re-scanning. ``too_short`` is
+a property of one message (e.g. a "thanks!" follow-up), so it is not cached.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from app.agent.validation_utils import prepare_input_for_llm
+from app.services import metrics
+
+__all__ = ["triage_email", "estimate_tokens", "clear_cache"]
+
+# Rough cost of the work a skipped email avoids: k retrieved chunks in the
+# prompt plus the completion budget of generate_response.
+_EST_CONTEXT_TOKENS = 3 * 200
+_EST_COMPLETION_TOKENS = 512
+
+_CACHE_MAX = 10_000
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return len(text or "") // 4 + 1
+
+
+def _decide(flags: Dict[str, bool]) -> Dict[str, str]:
+    if flags.get("prompt_injection"):
+        return {"decision": "escalate", "reason": "prompt_injection"}
+    if flags.get("spam_like"):
+        return {"decision": "ignore", "reason": "spam_like"}
+    if flags.get("too_short"):
+        return {"decision": "ignore", "reason": "too_short"}
+    return {"decision": "proceed", "reason": "ok"}
+
+
+def _cache_get(thread_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not thread_id:
+        return None
+    with _lock:
+        hit = _cache.get(thread_id)
+        if hit is not None:
+            _cache.move_to_end(thread_id)
+        return hit
+
+
+def _cache_put(thread_id: Optional[str], result: Dict[str, Any]) -> None:
+    if not thread_id:
+        return
+    with _lock:
+        _cache[thread_id] = result
+        _cache.move_to_end(thread_id)
+        while len(_cache) > _CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def triage_email(email_body: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """Classify an email body as proceed / escalate / ignore.
+
+    Returns a dict with keys {"decision", "reason", "flags", "warnings", "cached"}.
+    Skipped emails are counted in metrics as saved LLM calls and tokens.
+    """
+    cached = _cache_get(thread_id)
+    if cached is not None:
+        result = {**cached, "cached": True}
+    else:
+        prepared = prepare_input_for_llm(email_body or "")
+        result = {
+            **_decide(prepared["flags"]),
+            "flags": prepared["flags"],
+            "warnings": prepared["warnings"],
+            "cached": False,
+        }
+        if result["decision"] != "proceed" and result["reason"] != "too_short":
+            _cache_put(thread_id, {k: v for k, v in result.items() if k != "cached"})
+
+    if result["decision"] != "proceed":
+        metrics.increment_triage_skips()
+        metrics.add_llm_calls_saved(1)
+        metrics.add_tokens_saved(
+            estimate_tokens(email_body) + _EST_CONTEXT_TOKENS + _EST_COMPLETION_TOKENS
+        )
+    return result
@@ -8,6 +8,8 @@ __all__ = [
     "contains_spam_signals",
     "ensure_minimum_content",
     "clamp_length",
+    "strip_quoted_history",
+    "strip_signature",
     "prepare_input_for_llm",
 ]
 
@@ -111,6 +113,75 @@ def clamp_length(text: str, *, max_chars: int = 6000) -> str:
     return text[: max_chars - 1] + "…"
 
 
+_QUOTE_HEADER_RE = re.compile(
+    r"^\s*(on\s.+wrote:|-+\s*original message\s*-+|from:\s.+@.+|_{5,})\s*$",
+    re.IGNORECASE,
+)
+_SIGNATURE_RE = re.compile(
+    r"^\s*(--\s*|sent from my .+|get outlook for .+)$",
+    re.IGNORECASE,
+)
+_SIGN_OFF_RE = re.compile(
+    r"^\s*(best|kind|warm)?\s*(regards|wishes|thanks|thank you|cheers|sincerely)[,!.]?\s*$",
+    re.IGNORECASE,
+)
+_CONTACT_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|https?://|www\.|\+?\d[\d\s().-]{6,}\d")
+
+
+def strip_quoted_history(text: str) -> str:
+    """Drop quoted reply history: ``>`` lines and everything after a reply header.
+
+    Works on raw (newline-preserving) bodies, so call it before sanitize_email_body.
+    """
+    if not text:
+        return ""
+    kept: List[str] = []
+    for line in text.splitlines():
+        if _QUOTE_HEADER_RE.match(line) and kept:
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def _is_signature_line(line: str) -> bool:
+    """True for lines a signature block is made of: sign-offs, names, titles, contact details."""
+    stripped = line.strip()
+    if not stripped:
+        return True
+    if "?" in stripped:
+        return False
+    if _SIGNATURE_RE.match(stripped) or _SIGN_OFF_RE.match(stripped):
+        return True
+    words = len(stripped.split())
+    if _CONTACT_RE.search(stripped):
+        return words <= 8
+    return words <= 6
+
+
+def strip_signature(text: str, *, max_tail_lines: int = 8) -> str:
+    """Remove a trailing signature block (``--`` delimiter, mobile footers, sign-offs).
+
+    Scans backwards from the end and only cuts at a delimiter or sign-off that is
+    followed by nothing but signature or contact lines, so a question written
+    after "Thanks!" is kept.
+    """
+    if not text:
+        return ""
+    lines = text.rstrip().splitlines()
+    tail_start = max(1, len(lines) - max_tail_lines)
+    cut = None
+    for i in range(len(lines) - 1, tail_start - 1, -1):
+        if not _is_signature_line(lines[i]):
+            break
+        if _SIGNATURE_RE.match(lines[i]) or _SIGN_OFF_RE.match(lines[i]):
+            cut = i
+    if cut is None:
+        return "\n".join(lines)
+    return "\n".join(lines[:cut]).rstrip()
+
+
 def prepare_input_for_llm(email_body: str, *, max_chars: int = 6000) -> Dict[str, object]:
     """Produce a sanitized body and basic risk flags for safe LLM prompting.
 
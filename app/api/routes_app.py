@@ -1,20 +1,24 @@
 from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Header, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
+from dataclasses import asdict
+import asyncio
 import json
+import time
 
-from app.services.metrics import snapshot as metrics_snapshot
+from app.config.service import CONFIG_FILE, get_config_service
+from app.services.metrics import draft_mode_stats, faq_stats, model_tier_stats, snapshot as metrics_snapshot
 from app.services.email_service import send_manual_email
+from app.services.action_log import LOG_FILE, end_offset, file_identity, parse_line, read_new_lines, tail_lines
 
 
 router = APIRouter()
 
 
 # Paths
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-LOG_FILE = PROJECT_ROOT / "app" / "logs" / "actions.log"
-SETTINGS_FILE = PROJECT_ROOT / "data" / "ui_settings.json"
+SETTINGS_FILE = Path(CONFIG_FILE)
 
 
 class SettingsModel(BaseModel):
@@ -24,28 +28,21 @@ class SettingsModel(BaseModel):
 
 
 def _read_log_tail(max_lines: int = 200) -> List[str]:
-    if not LOG_FILE.exists():
-        return []
-    try:
-        with LOG_FILE.open("r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-        return [line.rstrip("\n") for line in lines[-max_lines:]]
-    except Exception:
-        return []
+    return tail_lines(LOG_FILE, max_lines)
 
 
 def _load_settings() -> Dict[str, Any]:
-    if SETTINGS_FILE.exists():
-        try:
-            return json.loads(SETTINGS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+    # Served from the config snapshot; the file is only re-read when it changes
+    return dict(get_config_service().current.layer("file"))
 
 
 def _save_settings(data: Dict[str, Any]) -> None:
     SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    SETTINGS_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    tmp = SETTINGS_FILE.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    tmp.replace(SETTINGS_FILE)
+    # Publish immediately instead of waiting for the watcher
+    get_config_service().reload()
 
 
 @router.get("/status")
@@ -58,8 +55,51 @@ def get_status() -> Dict[str, Any]:
 
 
 @router.get("/logs")
-def get_logs(limit: int = 200) -> Dict[str, Any]:
-    return {"logs": _read_log_tail(limit)}
+def get_logs(limit: int = 200, parsed: bool = False) -> Dict[str, Any]:
+    lines = _read_log_tail(limit)
+    return {"logs": [parse_line(line) for line in lines] if parsed else lines}
+
+
+def _sse(data: str, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}data: {data}\n\n"
+
+
+@router.get("/logs/stream")
+async def stream_logs(
+    request: Request,
+    backlog: int = 0,
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-sent events: one event per new log line (id = byte offset).
+
+    Reconnecting clients send Last-Event-ID and resume after that offset;
+    ``backlog`` replays the last N lines first.
+    """
+    async def events():
+        offset = int(last_event_id) if last_event_id and last_event_id.isdigit() else end_offset(LOG_FILE)
+        ident = file_identity(LOG_FILE)
+        if backlog and not last_event_id:
+            for line in tail_lines(LOG_FILE, backlog):
+                yield _sse(line)
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            lines, offset, ident = read_new_lines(LOG_FILE, offset, ident)
+            for line in lines:
+                yield _sse(line, offset)
+            if lines:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > 15:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/analytics")
@@ -70,6 +110,12 @@ def get_analytics() -> Dict[str, Any]:
         "escalated": metrics.get("runs_escalated", 0),
         "validation_failures": metrics.get("validation_failures", 0),
         "rewrite_attempts": metrics.get("rewrite_attempts", 0),
+        "ignored": metrics.get("runs_ignored", 0),
+        "llm_calls_saved": metrics.get("llm_calls_saved", 0),
+        "tokens_saved": metrics.get("tokens_saved", 0),
+        "draft_modes": draft_mode_stats(),
+        "model_tiers": model_tier_stats(),
+        "faq": faq_stats(),
     }
 
 
@@ -78,6 +124,13 @@ def get_settings() -> Dict[str, Any]:
     return _load_settings()
 
 
+@router.get("/config")
+def get_runtime_config() -> Dict[str, Any]:
+    """Effective runtime settings and the snapshot version serving them"""
+    snapshot = get_config_service().current
+    return {"version": snapshot.version, "loaded_at": snapshot.loaded_at, "settings": asdict(snapshot.settings)}
+
+
 @router.post("/settings")
 def update_settings(settings: SettingsModel) -> Dict[str, Any]:
     current = _load_settings()
@@ -1,15 +1,54 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from typing import Any, Dict, List
-from app.services.email_service import fetch_and_reply_emails, send_manual_email
+from app.services.email_service import enqueue_unread_emails, send_manual_email
+from app.services.job_queue import get_job
+from app.services.push_ingest import handle_push, verify_push_request
 from app.services.persistence import get_all_email_history, get_escalated_emails
 
 router = APIRouter()
 
 @router.post("/fetch")
-def fetch_and_reply(max_results: int = 5):
-    """Fetch unread emails and auto-reply using RAG"""
-    result = fetch_and_reply_emails(max_results)
-    return {"status": "success", "details": result}
+def fetch_and_reply(max_results: int = 5, account_id: str = "default"):
+    """Enqueue unread emails for background auto-reply; returns job IDs immediately"""
+    jobs = enqueue_unread_emails(max_results, account_id)
+    return {"status": "queued", "jobs": jobs, "total": len(jobs)}
+
+@router.post("/push")
+async def gmail_push(request: Request) -> Dict[str, Any]:
+    """Gmail Pub/Sub push webhook: debounce and enqueue only changed messages"""
+    try:
+        # OIDC verification may fetch Google's signing certs
+        await run_in_threadpool(
+            verify_push_request, request.headers.get("authorization"), request.query_params.get("token")
+        )
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    envelope = await request.json()
+    try:
+        note = handle_push(envelope)
+    except (ValueError, KeyError) as e:
+        # Malformed envelopes and unknown mailboxes are acknowledged so Pub/Sub
+        # does not redeliver them
+        return {"status": "ignored", "reason": str(e)}
+    return {"status": "accepted", **note}
+
+@router.get("/jobs/{job_id}")
+def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Get the status of a queued email job"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "last_error": job["last_error"],
+        "result": job["result"],
+        "payload": job["payload"],
+    }
 
 @router.post("/send")
 def send_custom_email(to: str, subject: str, body: str):
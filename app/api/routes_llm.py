@@ -1,11 +1,14 @@
 from fastapi import APIRouter
-from app.models.llm_model import generate_response
+from app.models.llm_model import generate_chat
 
 router = APIRouter()
 
 @router.post("/reply")
 def generate_reply(email_body: str):
     """Generate LLM reply for email"""
-    prompt = f"You are an airline assistant. Reply to: {email_body}"
-    reply = generate_response(prompt)
+    messages = [
+        {"role": "system", "content": "You are an airline assistant. Reply to the customer's email."},
+        {"role": "user", "content": email_body},
+    ]
+    reply = generate_chat(messages)
     return {"email_body": email_body, "reply": reply}
@@ -1,10 +1,21 @@
+from typing import Optional
 from fastapi import APIRouter
-from app.rag.rag_pipeline import retrieve_context
+from app.rag.rag_pipeline import available_namespaces, retrieve_documents
 
 router = APIRouter()
 
 @router.get("/search")
-def search_policies(query: str, k: int = 3):
-    """Retrieve airline policy context"""
-    context = retrieve_context(query, k)
-    return {"query": query, "context": context}
+def search_policies(query: str, k: int = 3, section: Optional[str] = None, source: Optional[str] = None):
+    """Retrieve airline policy context, optionally only from one section and/or source"""
+    docs = retrieve_documents(query, k, section=section, source=source)
+    context = "\n".join(doc["content"] for doc in docs)
+    return {
+        "query": query,
+        "context": context,
+        "sources": [{"section": d.get("section"), "source": d.get("source")} for d in docs],
+    }
+
+@router.get("/namespaces")
+def list_policy_namespaces():
+    """Sections and sources available as /search filters"""
+    return available_namespaces()
@@ -1,5 +1,4 @@
 from .settings import get_config, Settings
+from .service import ConfigSnapshot, get_config_service
 
-__all__ = ["get_config", "Settings"]
-
-
+__all__ = ["get_config", "Settings", "ConfigSnapshot", "get_config_service"]
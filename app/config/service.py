@@ -0,0 +1,182 @@
+"""Central, hot-reloadable runtime configuration.
+
+The service keeps one immutable ConfigSnapshot (settings + raw layers +
+version). Sources are layered, later ones winning:
+
+- environment variables (see Settings field metadata), re-read on every reload
+- ``file``: CONFIG_FILE, JSON keyed by Settings field names (default
+  data/ui_settings.json, which the /settings API writes)
+- extra sources registered with add_source() (e.g. the SQLite app_settings table)
+
+A daemon thread polls each source's signature (file mtime, or the
+app_settings version row) every CONFIG_POLL_SECONDS. When the merged values
+change, a new snapshot with version + 1 is swapped in atomically and
+subscribers are called with (new, old). A change that fails validation is
+rejected and the last good snapshot stays current. Readers never parse anything per request: they read
+``get_config_service().current``.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.config.settings import Settings, build_settings
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONFIG_FILE = os.getenv("CONFIG_FILE", os.path.join(PROJECT_ROOT, "data", "ui_settings.json"))
+
+Loader = Callable[[], Dict[str, Any]]
+Signature = Callable[[], Any]
+Subscriber = Callable[["ConfigSnapshot", "ConfigSnapshot"], None]
+
+_SETTINGS_FIELDS = {f.name for f in fields(Settings)}
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    version: int
+    settings: Settings
+    layers: Mapping[str, Mapping[str, Any]]
+    loaded_at: float
+
+    def layer(self, name: str) -> Mapping[str, Any]:
+        return self.layers.get(name, MappingProxyType({}))
+
+    def changed(self, other: "ConfigSnapshot", *names: str) -> bool:
+        """True if any of the given Settings fields differ from ``other``."""
+        return any(getattr(self.settings, n) != getattr(other.settings, n) for n in names)
+
+
+def _file_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def json_file_source(path: str) -> Tuple[Loader, Signature]:
+    def load() -> Dict[str, Any]:
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f" Ignoring unreadable config file {path}: {e}")
+            return {}
+
+    return load, lambda: _file_mtime(path)
+
+
+class ConfigService:
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self._sources: List[Tuple[str, Loader, Signature]] = []
+        self._signatures: Dict[str, Any] = {}
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._current = ConfigSnapshot(0, build_settings(), MappingProxyType({}), time.time())
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        # Attribute reads are atomic; the snapshot itself is immutable
+        return self._current
+
+    def add_source(self, name: str, loader: Loader, signature: Signature = lambda: None) -> None:
+        """Register a layer (later sources override earlier ones) and reload."""
+        with self._lock:
+            self._sources = [s for s in self._sources if s[0] != name] + [(name, loader, signature)]
+            self._signatures.pop(name, None)
+        self.reload()
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call ``callback(new, old)`` after every published change; returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def reload(self) -> ConfigSnapshot:
+        """Re-read all sources; publish a new version if the merged values changed."""
+        with self._lock:
+            layers: Dict[str, Mapping[str, Any]] = {}
+            merged: Dict[str, Any] = {}
+            for name, loader, signature in self._sources:
+                self._signatures[name] = signature()
+                values = loader()
+                layers[name] = MappingProxyType(dict(values))
+                merged.update({k: v for k, v in values.items() if k in _SETTINGS_FIELDS})
+            try:
+                settings = build_settings(merged)
+            except (TypeError, ValueError) as e:
+                # Keep serving the last good snapshot
+                print(f" Rejected config update: {e}")
+                return self._current
+            old = self._current
+            if settings == old.settings and dict(layers) == dict(old.layers):
+                return old
+            new = ConfigSnapshot(old.version + 1, settings, MappingProxyType(layers), time.time())
+            self._current = new
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(new, old)
+            except Exception as e:
+                print(f" Config subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+        return new
+
+    def _changed_sources(self) -> bool:
+        with self._lock:
+            return any(self._signatures.get(name) != signature() for name, _, signature in self._sources)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self._changed_sources():
+                    self.reload()
+            except Exception as e:
+                print(f" Config watch failed: {e}")
+
+    def start_watching(self) -> None:
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stop.clear()
+                self._watcher = threading.Thread(target=self._watch, name="config-watch", daemon=True)
+                self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+
+
+_service: Optional[ConfigService] = None
+_service_lock = threading.Lock()
+
+
+def get_config_service() -> ConfigService:
+    """Process-wide config service (env + CONFIG_FILE layers, watcher started)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            try:
+                from dotenv import load_dotenv
+                load_dotenv()
+            except ImportError:  # pragma: no cover
+                pass
+            service = ConfigService(float(os.getenv("CONFIG_POLL_SECONDS", "2")))
+            service.add_source("file", *json_file_source(CONFIG_FILE))
+            service.start_watching()
+            _service = service
+        return _service
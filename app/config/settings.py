@@ -1,17 +1,75 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 import os
+from typing import Any, Dict, Mapping, Optional, Tuple
 
 
-@dataclass
+def _env(name: str, choices: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    return {"env": name, "choices": choices}
+
+
+@dataclass(frozen=True)
 class Settings:
-    max_rewrites: int = 2
-    pii_policy: str = "redact_and_send"  # or "block_and_escalate"
+    max_rewrites: int = field(default=2, metadata=_env("AGENT_MAX_REWRITES"))
+    pii_policy: str = field(
+        default="redact_and_send", metadata=_env("AGENT_PII_POLICY", ("redact_and_send", "block_and_escalate"))
+    )
+    # prompt tokens per LLM request (email + context)
+    prompt_token_budget: int = field(default=3000, metadata=_env("AGENT_PROMPT_TOKEN_BUDGET"))
+    max_completion_tokens: int = field(default=512, metadata=_env("AGENT_MAX_COMPLETION_TOKENS"))
+    # >1 drafts up to that many hedged candidates instead of the rewrite loop
+    speculative_drafts: int = field(default=0, metadata=_env("AGENT_SPECULATIVE_DRAFTS"))
+    # wait for a valid candidate before starting the next; 0 starts all at once
+    speculative_stagger_ms: float = field(default=1500.0, metadata=_env("AGENT_SPECULATIVE_STAGGER_MS"))
+    job_workers: int = field(default=2, metadata=_env("JOB_WORKERS"))
+    # seconds before an unacknowledged job is re-leased
+    job_visibility_timeout: float = field(default=120.0, metadata=_env("JOB_VISIBILITY_TIMEOUT"))
+    job_max_attempts: int = field(default=5, metadata=_env("JOB_MAX_ATTEMPTS"))
+    llm_model: str = field(default="", metadata=_env("LLM_MODEL"))
+    # Smaller/faster model for confident requests; empty sends everything to llm_model
+    llm_fast_model: str = field(default="", metadata=_env("LLM_FAST_MODEL"))
+    # top retrieval cosine similarity needed for the fast tier
+    router_min_similarity: float = field(default=0.6, metadata=_env("ROUTER_MIN_SIMILARITY"))
+    router_max_email_tokens: int = field(default=300, metadata=_env("ROUTER_MAX_EMAIL_TOKENS"))
+    # Reply with the canonical FAQ answer (no LLM call) when an email matches an FAQ question
+    faq_fast_path: bool = field(default=True, metadata=_env("FAQ_FAST_PATH"))
+    faq_match_threshold: float = field(default=0.9, metadata=_env("FAQ_MATCH_THRESHOLD"))
+    # concurrent Groq requests per process
+    llm_max_concurrency: int = field(default=4, metadata=_env("LLM_MAX_CONCURRENCY"))
+    embedding_backend: str = field(default="hf", metadata=_env("EMBEDDING_BACKEND", ("hf", "onnx")))
+    compact_embeddings: str = field(
+        default="off", metadata=_env("COMPACT_EMBEDDINGS", ("off", "binary", "truncated"))
+    )
+    compact_rescore: int = field(default=10, metadata=_env("COMPACT_RESCORE"))
+    push_debounce_seconds: float = field(default=2.0, metadata=_env("PUSH_DEBOUNCE_SECONDS"))
 
 
-def get_config() -> Settings:
-    # Read environment overrides if present, else default
-    max_rewrites = int(os.getenv("AGENT_MAX_REWRITES", "2"))
-    pii_policy = os.getenv("AGENT_PII_POLICY", "redact_and_send")
-    return Settings(max_rewrites=max_rewrites, pii_policy=pii_policy)
+def _coerce(value: Any, default: Any) -> Any:
+    if isinstance(default, bool):
+        return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
+
 
+def build_settings(overrides: Optional[Mapping[str, Any]] = None) -> Settings:
+    """Settings from defaults < environment < ``overrides`` (keyed by field name).
+
+    Unknown override keys are ignored; values are coerced to the field type.
+    Raises ValueError for a value outside a field's choices.
+    """
+    overrides = overrides or {}
+    values = {}
+    for f in fields(Settings):
+        raw = overrides.get(f.name, os.getenv(f.metadata["env"]))
+        if raw is None or raw == "":
+            continue
+        values[f.name] = _coerce(raw, f.default)
+        choices = f.metadata["choices"]
+        if choices and values[f.name] not in choices:
+            raise ValueError(f"{f.name} must be one of {', '.join(choices)}, not {values[f.name]!r}")
+    return Settings(**values)
+
+
+def get_config() -> Settings:
+    """Current settings snapshot (see app.config.service for hot reload)."""
+    from app.config.service import get_config_service
 
+    return get_config_service().current.settings
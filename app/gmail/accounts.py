@@ -0,0 +1,163 @@
+"""Registry of support mailboxes with cached credentials and Gmail clients.
+
+Accounts are listed in ``app/config/accounts.json`` (override with
+GMAIL_ACCOUNTS_FILE)::
+
+    [{"id": "support-ch", "email": "support-ch@example.com",
+      "token_path": "app/config/tokens/support-ch.json"}, ...]
+
+Without that file a single ``default`` account uses GMAIL_TOKEN_PATH /
+GMAIL_CREDENTIALS_PATH (app/config/token.json and credentials.json), with
+GMAIL_ADDRESS as its mailbox address for push notifications.
+
+Credentials are loaded from disk once per account and refreshed before they
+expire. The discovery client is built once per account and worker thread
+(httplib2 transports are not thread-safe), then reused.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+SCOPES = [
+    'https://www.googleapis.com/auth/gmail.modify',
+    'https://www.googleapis.com/auth/gmail.send'
+]
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, "config")
+ACCOUNTS_FILE = os.getenv("GMAIL_ACCOUNTS_FILE", os.path.join(CONFIG_DIR, "accounts.json"))
+
+DEFAULT_ACCOUNT = "default"
+
+# Refresh access tokens this long before they expire
+REFRESH_MARGIN = timedelta(minutes=5)
+
+
+@dataclass(frozen=True)
+class Account:
+    id: str
+    token_path: str
+    credentials_path: str
+    email: Optional[str] = None
+
+
+def _load_accounts() -> Dict[str, Account]:
+    default_credentials = os.getenv(
+        "GMAIL_CREDENTIALS_PATH", os.path.join(CONFIG_DIR, "credentials.json")
+    )
+    if not os.path.exists(ACCOUNTS_FILE):
+        token_path = os.getenv("GMAIL_TOKEN_PATH", os.path.join(CONFIG_DIR, "token.json"))
+        email = os.getenv("GMAIL_ADDRESS") or None
+        return {DEFAULT_ACCOUNT: Account(DEFAULT_ACCOUNT, token_path, default_credentials, email)}
+
+    with open(ACCOUNTS_FILE, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    accounts = {}
+    for entry in entries:
+        accounts[entry["id"]] = Account(
+            id=entry["id"],
+            token_path=entry["token_path"],
+            credentials_path=entry.get("credentials_path", default_credentials),
+            email=entry.get("email"),
+        )
+    return accounts
+
+
+class AccountRegistry:
+    """Per-account credential cache and Gmail client pool."""
+
+    def __init__(self, accounts: Optional[Dict[str, Account]] = None):
+        self._accounts = accounts if accounts is not None else _load_accounts()
+        self._creds: Dict[str, Credentials] = {}
+        self._locks: Dict[str, threading.Lock] = {a: threading.Lock() for a in self._accounts}
+        self._local = threading.local()
+
+    def account_ids(self) -> List[str]:
+        return sorted(self._accounts)
+
+    def get_account(self, account_id: str) -> Account:
+        try:
+            return self._accounts[account_id]
+        except KeyError:
+            raise KeyError(f"Unknown Gmail account: {account_id}") from None
+
+    def account_for_email(self, email_address: str) -> Optional[str]:
+        """Map a mailbox address (e.g. from a push notification) to its account id."""
+        wanted = (email_address or "").lower()
+        for account in self._accounts.values():
+            if account.email and account.email.lower() == wanted:
+                return account.id
+        return None
+
+    def _needs_refresh(self, creds: Credentials) -> bool:
+        if not creds.valid:
+            return True
+        # google-auth stores expiry as naive UTC
+        return creds.expiry is not None and creds.expiry - datetime.utcnow() < REFRESH_MARGIN
+
+    def get_credentials(self, account_id: str) -> Credentials:
+        """Cached credentials for an account, refreshed ahead of expiry."""
+        account = self.get_account(account_id)
+        with self._locks[account_id]:
+            creds = self._creds.get(account_id)
+            if creds is None and os.path.exists(account.token_path):
+                creds = Credentials.from_authorized_user_file(account.token_path, SCOPES)
+
+            if creds is None or self._needs_refresh(creds):
+                if creds and creds.refresh_token:
+                    creds.refresh(Request())
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(account.credentials_path, SCOPES)
+                    creds = flow.run_local_server(port=0)
+
+                # Save the token for next runs
+                os.makedirs(os.path.dirname(account.token_path) or ".", exist_ok=True)
+                with open(account.token_path, 'w') as token:
+                    token.write(creds.to_json())
+
+            self._creds[account_id] = creds
+            return creds
+
+    def get_service(self, account_id: str = DEFAULT_ACCOUNT):
+        """Reusable Gmail API client for the account (one per worker thread)."""
+        creds = self.get_credentials(account_id)
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        cached = clients.get(account_id)
+        # Credentials objects are refreshed in place, so a cached client bound to
+        # the same object stays valid across token refreshes
+        if cached is None or cached[0] is not creds:
+            service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+            clients[account_id] = (creds, service)
+            return service
+        return cached[1]
+
+    def refresh_all(self) -> None:
+        """Proactively refresh every account's token (called by the scheduler)."""
+        for account_id in self.account_ids():
+            try:
+                self.get_credentials(account_id)
+            except Exception as e:
+                print(f" Could not refresh credentials for {account_id}: {e}")
+
+
+_registry: Optional[AccountRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> AccountRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AccountRegistry()
+        return _registry
@@ -1,42 +1,12 @@
-import os
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from app.gmail.accounts import DEFAULT_ACCOUNT, SCOPES, CONFIG_DIR, get_registry
 
-# Scopes required for Gmail API
-SCOPES = [
-    'https://www.googleapis.com/auth/gmail.modify',
-    'https://www.googleapis.com/auth/gmail.send'
-]
+def authenticate_gmail(account_id=DEFAULT_ACCOUNT):
+    """Return the cached Gmail API service instance for an account.
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))  
-CONFIG_DIR = os.path.join(BASE_DIR, "config")
-
-def authenticate_gmail():
-    """Authenticate user and return Gmail API service instance"""
-    creds = None
-    token_path = os.path.join(CONFIG_DIR, "token.json")
-    credentials_path = os.path.join(CONFIG_DIR, "credentials.json")
-
-    # Load existing token
-    if os.path.exists(token_path):
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-
-    # If no valid creds, do OAuth
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        # Save the token for next runs
-        with open(token_path, 'w') as token:
-            token.write(creds.to_json())
-
-    service = build('gmail', 'v1', credentials=creds)
-    return service
+    Credentials are loaded once and refreshed ahead of expiry by the account
+    registry; the OAuth browser flow only runs when no usable token exists.
+    """
+    return get_registry().get_service(account_id)
 
 if __name__ == "__main__":
     service = authenticate_gmail()
@@ -1,28 +1,51 @@
 from app.gmail.auth_gmail import authenticate_gmail
+from app.gmail.accounts import DEFAULT_ACCOUNT
 from app.agent.agent_reply import draft_reply   
+from app.agent.triage import triage_email
+from app.gmail.mime_utils import DEFAULT_MAX_BYTES, extract_body
+from app.services import email_logs
 from email.mime.text import MIMEText
+import html
 import base64
 
 # --------- Helper: Extract email body ----------
-def get_message_body(msg_data):
-    """Extract the plain text body from Gmail API message data"""
-    body = ""
-    if "parts" in msg_data["payload"]:  # multipart emails
-        for part in msg_data["payload"]["parts"]:
-            if part["mimeType"] == "text/plain":
-                body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
-                break
-            elif part["mimeType"] == "text/html":
-                body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
-                break
-    else:  # single-part
-        body = base64.urlsafe_b64decode(msg_data["payload"]["body"]["data"]).decode("utf-8")
-    return body.strip()
+def get_message_body(msg_data, max_bytes=DEFAULT_MAX_BYTES, include_attachments=False):
+    """Extract the plain text body from Gmail API message data.
+
+    Walks the whole MIME tree (text/plain preferred over text/html), decodes at
+    most max_bytes per part and strips quoted history and signatures.
+    """
+    return extract_body(
+        msg_data["payload"], max_bytes=max_bytes, include_attachments=include_attachments
+    )
+
+
+# Partial responses: only the fields ingest actually reads
+METADATA_FIELDS = "id,threadId,labelIds,snippet,sizeEstimate,internalDate,payload/headers"
+FULL_FIELDS = "id,threadId,payload"
+
+
+def get_message_metadata(service, msg_id):
+    """Headers + snippet only (format=metadata); cheap enough to triage every message"""
+    return service.users().messages().get(
+        userId='me',
+        id=msg_id,
+        format='metadata',
+        metadataHeaders=['From', 'Subject', 'Reply-To'],
+        fields=METADATA_FIELDS,
+    ).execute()
+
+
+def get_message_full(service, msg_id):
+    """Full payload (parts + inline bodies) for messages that will be drafted"""
+    return service.users().messages().get(
+        userId='me', id=msg_id, format='full', fields=FULL_FIELDS
+    ).execute()
 
 
 # --------- Send Email ----------
-def send_email(to, subject, message_text):
-    service = authenticate_gmail()
+def send_email(to, subject, message_text, account_id=DEFAULT_ACCOUNT):
+    service = authenticate_gmail(account_id)
     message = MIMEText(message_text)
     message['to'] = to
     message['subject'] = subject
@@ -34,57 +57,209 @@ def send_email(to, subject, message_text):
     return f" Email sent to {to}, Message Id: {sent_message['id']}"
 
 
-# --------- Fetch Emails & Auto-Reply ----------
-def process_unread_emails(max_results=5):
-    service = authenticate_gmail()
+# --------- Mark as read ----------
+def mark_as_read(service, msg_id):
+    try:
+        service.users().messages().modify(
+            userId='me',
+            id=msg_id,
+            body={'removeLabelIds': ['UNREAD']}
+        ).execute()
+    except Exception as e:
+        print(f" Could not mark as read: {e}")
+
+
+# --------- List unread message ids ----------
+def list_unread_messages(service, max_results=5):
+    """Return [{'id', 'threadId'}] for unread INBOX messages"""
     results = service.users().messages().list(
         userId='me',
         labelIds=['INBOX'],
         q="is:unread",
         maxResults=max_results
     ).execute()
+    return results.get('messages', [])
 
-    messages = results.get('messages', [])
-    if not messages:
-        return "📭 No unread emails."
 
+FALLBACK_REPLY = "Dear Customer,\n\nThank you for your query. Our support team will get back to you shortly.\n\nRegards,\nEmail RAG Agent"
+
+
+# --------- Thread helpers ----------
+def group_by_thread(messages):
+    """Group [{'id', 'threadId'}] into {threadId: [message ids]}, keeping first-seen order"""
+    groups = {}
     for msg in messages:
-        msg_data = service.users().messages().get(userId='me', id=msg['id']).execute()
-        headers = msg_data['payload']['headers']
+        groups.setdefault(msg.get('threadId') or msg['id'], []).append(msg['id'])
+    return groups
+
+
+def merge_thread_bodies(bodies):
+    """Merge follow-up bodies oldest-first, dropping paragraphs already seen earlier
+    in the thread (re-pasted text, partially quoted replies)"""
+    seen = set()
+    merged = []
+    for body in bodies:
+        fresh = []
+        for para in body.split("\n\n"):
+            key = " ".join(para.split()).lower()
+            if key and key not in seen:
+                seen.add(key)
+                fresh.append(para.strip())
+        if fresh:
+            merged.append("\n\n".join(fresh))
+    if len(merged) <= 1:
+        return merged[0] if merged else ""
+    return "\n\n".join(f"[Message {i}]\n{text}" for i, text in enumerate(merged, 1))
+
 
-        sender, subject = None, None
-        for header in headers:
-            if header['name'] == 'Subject':
-                subject = header['value']
-            if header['name'] == 'From':
-                sender = header['value']
+def _headers(meta):
+    found = {}
+    for header in meta.get('payload', {}).get('headers', []):
+        if header['name'] in ('Subject', 'From'):
+            found[header['name']] = header['value']
+    return found.get('From'), found.get('Subject')
 
-        body = get_message_body(msg_data)
 
+def _finish(result, account_id, metas, content, reply=""):
+    """Record a handled thread in the dashboard's email_logs (batched) and return ``result``"""
+    sender, _ = _headers(metas[-1])
+    _, subject = _headers(metas[0])
+    email_logs.record_thread(result, account_id, sender or "", subject or "", content, reply)
+    return result
+
+
+# --------- Reply to one message (agent_graph gmail_send) ----------
+def reply_to_message(msg_id, message_text, account_id=DEFAULT_ACCOUNT):
+    """Reply to the sender of ``msg_id`` under "Re: <subject>" and mark it read"""
+    service = authenticate_gmail(account_id)
+    sender, subject = _headers(get_message_metadata(service, msg_id))
+    subject = subject or ""
+    if not subject.lower().startswith("re:"):
+        subject = f"Re: {subject}"
+    response = send_email(sender, subject, message_text, account_id)
+    mark_as_read(service, msg_id)
+    return response
+
+
+# --------- Process a thread (one draft for all its unread messages) ----------
+def process_thread(service, thread_id, msg_ids, fallback_on_error=True, account_id=DEFAULT_ACCOUNT, absorb=None):
+    """Triage, draft, send and mark read all unread messages of one Gmail thread.
+
+    Follow-ups in the same thread are merged into a single agent run and reply.
+    ``absorb()`` may return message ids that arrived for the thread meanwhile;
+    they are merged in before drafting. Messages already read (handled by an
+    earlier run) are skipped. With fallback_on_error=False, LLM errors propagate
+    so a job worker can retry them; it may also be a predicate ``(exc) -> bool``
+    deciding per error whether to send the fallback reply. Every sent, escalated or ignored thread is
+    recorded in email_logs, with the prompt/completion tokens of its drafting
+    (``token_usage``). Returns a short status dict.
+    """
+    # ---- Metadata first: headers + snippet, no body transfer ----
+    msg_ids = list(msg_ids)
+    metas = []
+    pending = msg_ids
+    while pending:
+        metas += [get_message_metadata(service, msg_id) for msg_id in pending]
+        pending = absorb() if absorb else []
+        msg_ids += pending
+    thread_id = thread_id or metas[0].get('threadId')
+    metas = [m for m in metas if 'UNREAD' in m.get('labelIds', ['UNREAD'])]
+    if not metas:
+        return {"thread_id": thread_id, "message_ids": msg_ids, "status": "already_handled"}
+    metas.sort(key=lambda m: int(m.get('internalDate', 0)))
+    msg_ids = [m['id'] for m in metas]
+
+    # ---- Triage: no retrieval/LLM for spam, injection or empty emails ----
+    # Snippets drop most of them per message before fetching any body
+    to_fetch, ignored, escalate_reason = [], [], None
+    for meta in metas:
+        sender, subject = _headers(meta)
+        snippet = html.unescape(meta.get('snippet', ''))
         print("\n New Email Found")
         print("From:", sender)
         print("Subject:", subject)
-        print("Body Preview:", body[:200])
-
-        # ---- RAG + LLM auto reply (replaces rules, flow unchanged) ----
-        try:
-            reply_text = draft_reply(body)  
-        except Exception as e:
-            print(f"LLM failed, using fallback. Error: {e}")
-            reply_text = "Dear Customer,\n\nThank you for your query. Our support team will get back to you shortly.\n\nRegards,\nEmail RAG Agent"
-
-        # ---- Send Reply ----
-        response = send_email(sender, f"Re: {subject}", reply_text)
-        print(response)
-
-        # ---- Mark email as read ----
-        try:
-            service.users().messages().modify(
-                userId='me',
-                id=msg['id'],
-                body={'removeLabelIds': ['UNREAD']}
-            ).execute()
-        except Exception as e:
-            print(f" Could not mark as read: {e}")
+        print("Snippet:", snippet[:200])
+        snippet_triage = triage_email(snippet)
+        if snippet_triage["decision"] == "proceed":
+            to_fetch.append(meta)
+        elif snippet_triage["decision"] == "ignore":
+            ignored.append(meta['id'])
+        elif escalate_reason is None:
+            escalate_reason = snippet_triage["reason"]
+
+    snippets = "\n\n".join(html.unescape(meta.get('snippet', '')) for meta in metas)
+    if escalate_reason is not None:
+        # One flagged message escalates the thread; leave it all unread for a human
+        print(f" Escalated without reply: {escalate_reason}")
+        result = {"thread_id": thread_id, "message_ids": msg_ids, "status": "escalated", "reason": escalate_reason}
+        return _finish(result, account_id, metas, snippets)
+    if not to_fetch:
+        for msg_id in ignored:
+            mark_as_read(service, msg_id)
+        print(" Ignored thread: no message needs a reply")
+        result = {"thread_id": thread_id, "message_ids": msg_ids, "status": "ignored"}
+        return _finish(result, account_id, metas, snippets)
+    # Read only what was ignored or answered
+    handled = ignored + [meta['id'] for meta in to_fetch]
+
+    body = merge_thread_bodies(
+        [get_message_body(get_message_full(service, meta['id'])) for meta in to_fetch]
+    )
+    triage = triage_email(body, thread_id)
+    if triage["decision"] == "escalate":
+        # Leave unread so a human picks it up
+        print(f" Escalated without reply: {triage['reason']}")
+        result = {"thread_id": thread_id, "message_ids": msg_ids, "status": "escalated", "reason": triage["reason"]}
+        return _finish(result, account_id, metas, body)
+    if triage["decision"] == "ignore":
+        print(f" Ignored: {triage['reason']}")
+        for msg_id in handled:
+            mark_as_read(service, msg_id)
+        result = {"thread_id": thread_id, "message_ids": msg_ids, "status": "ignored", "reason": triage["reason"]}
+        return _finish(result, account_id, metas, body)
+
+    # ---- RAG + LLM auto reply (replaces rules, flow unchanged) ----
+    result = {"thread_id": thread_id, "message_ids": msg_ids, "status": "sent"}
+    usage = result["token_usage"] = {"prompt": 0, "completion": 0}
+    try:
+        reply_text = draft_reply(body, triage, usage)
+    except Exception as e:
+        fallback = fallback_on_error(e) if callable(fallback_on_error) else fallback_on_error
+        if not fallback:
+            raise
+        print(f"LLM failed, using fallback. Error: {e}")
+        reply_text = FALLBACK_REPLY
+        result["reason"] = "llm_fallback"
+
+    # ---- Send one reply to the latest sender ----
+    sender, _ = _headers(to_fetch[-1])
+    _, subject = _headers(metas[0])
+    subject = subject or ""
+    if not subject.lower().startswith("re:"):
+        subject = f"Re: {subject}"
+    response = send_email(sender, subject, reply_text, account_id)
+    print(response)
+
+    # ---- Mark email as read ----
+    for msg_id in handled:
+        mark_as_read(service, msg_id)
+    return _finish(result, account_id, metas, body, reply_text)
+
+
+def process_message(service, msg_id, thread_id=None, fallback_on_error=True, account_id=DEFAULT_ACCOUNT):
+    """Triage, draft, send and mark one message as read (single-message thread run)"""
+    return process_thread(service, thread_id, [msg_id], fallback_on_error, account_id)
+
+
+# --------- Fetch Emails & Auto-Reply ----------
+def process_unread_emails(max_results=5, account_id=DEFAULT_ACCOUNT):
+    service = authenticate_gmail(account_id)
+    messages = list_unread_messages(service, max_results)
+    if not messages:
+        return "📭 No unread emails."
+
+    # One agent run per thread, not per message
+    for thread_id, msg_ids in group_by_thread(messages).items():
+        process_thread(service, thread_id, msg_ids, account_id=account_id)
 
     return " Processed all unread emails."
@@ -0,0 +1,124 @@
+"""Bounded-memory body extraction from Gmail API message payloads.
+
+- walk_parts() visits the MIME tree recursively (multipart/alternative inside
+  multipart/mixed, forwarded message/rfc822, ...)
+- extract_body() prefers text/plain over text/html at any depth, decodes at
+  most ``max_bytes`` per part, strips quoted history and signatures, and
+  skips attachment parts unless asked for
+"""
+
+import base64
+import codecs
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.agent.validation_utils import strip_html, strip_quoted_history, strip_signature
+
+__all__ = ["walk_parts", "is_attachment", "decode_part_data", "extract_body"]
+
+DEFAULT_MAX_BYTES = 64 * 1024
+
+_CHARSET_RE = re.compile(r'charset="?([\w.:-]+)"?', re.IGNORECASE)
+
+
+def walk_parts(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield leaf parts of a Gmail payload, depth-first in document order."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get("parts")
+        if children:
+            stack.extend(reversed(children))
+        else:
+            yield part
+
+
+def is_attachment(part: Dict[str, Any]) -> bool:
+    body = part.get("body") or {}
+    return bool(part.get("filename")) or "attachmentId" in body
+
+
+def _header(part: Dict[str, Any], name: str) -> Optional[str]:
+    for h in part.get("headers") or []:
+        if h.get("name", "").lower() == name.lower():
+            return h.get("value")
+    return None
+
+
+def _charset(part: Dict[str, Any]) -> str:
+    content_type = _header(part, "Content-Type") or ""
+    m = _CHARSET_RE.search(content_type)
+    if m:
+        try:
+            codecs.lookup(m.group(1))
+            return m.group(1)
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def decode_part_data(part: Dict[str, Any], max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """Decode at most ``max_bytes`` of a part's base64url body.
+
+    Only the needed prefix of the encoded string is decoded (4 chars -> 3 bytes),
+    and an incremental decoder drops a multi-byte character cut at the cap.
+    """
+    data = (part.get("body") or {}).get("data")
+    if not data:
+        return ""
+    needed_chars = -(-max_bytes // 3) * 4
+    chunk = data[:needed_chars]
+    chunk += "=" * (-len(chunk) % 4)
+    raw = base64.urlsafe_b64decode(chunk)[:max_bytes]
+    decoder = codecs.getincrementaldecoder(_charset(part))(errors="replace")
+    return decoder.decode(raw, final=len(data) <= needed_chars)
+
+
+def extract_body(
+    payload: Dict[str, Any],
+    *,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    include_attachments: bool = False,
+    strip_quotes: bool = True,
+) -> str:
+    """Return the best text body of a message.
+
+    Picks the first text/plain part anywhere in the tree, falling back to the
+    first text/html part (tags stripped). Inline text attachments are appended
+    only with ``include_attachments``; attachments stored by id are never fetched.
+    """
+    plain: Optional[Dict[str, Any]] = None
+    html: Optional[Dict[str, Any]] = None
+    attachments: List[Dict[str, Any]] = []
+
+    for part in walk_parts(payload):
+        mime = (part.get("mimeType") or "").lower()
+        if is_attachment(part):
+            if include_attachments and mime.startswith("text/"):
+                attachments.append(part)
+            continue
+        if mime == "text/plain" and plain is None:
+            plain = part
+        elif mime == "text/html" and html is None:
+            html = part
+
+    if plain is not None:
+        body = decode_part_data(plain, max_bytes)
+    elif html is not None:
+        # Keep line breaks from block tags so quote stripping still sees lines
+        markup = decode_part_data(html, max_bytes)
+        if strip_quotes:
+            markup = re.sub(r"(?is)<blockquote.*?</blockquote>", " ", markup)
+        markup = re.sub(r"(?i)<\s*(br|/p|/div|/li|/tr)\s*/?>", "\n", markup)
+        body = "\n".join(strip_html(line) for line in markup.splitlines())
+    else:
+        body = ""
+
+    if strip_quotes:
+        body = strip_signature(strip_quoted_history(body))
+
+    for part in attachments:
+        text = decode_part_data(part, max_bytes)
+        if text:
+            body += f"\n\n[Attachment: {part.get('filename')}]\n{text}"
+    return body.strip()
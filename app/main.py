@@ -1,16 +1,31 @@
 import sqlite3
-from fastapi import FastAPI, HTTPException, Query, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from starlette.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, Iterator, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
 from collections import Counter
-
-# Assuming these imports exist in your project structure
-# from app.api import routes_email, routes_rag, routes_llm, routes_app
+import csv
+import io
+import json
+import os
+
+try:
+    # Soft dependency: ~5-10x faster than json for large log lists
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+    _HAS_ORJSON = False
+
+from app.config import get_config_service
+from app.services import email_logs, escalations, live_events
+
+from app.api import routes_email, routes_rag, routes_llm, routes_app
 # from app.services.email_service import fetch_and_reply_emails
 
 # --- FastAPI App Initialisation ---
@@ -26,80 +41,180 @@ app.add_middleware(
 )
 
 # --- Database Configuration ---
-DB_PATH = "data/sqlite.db3"
+DB_PATH = email_logs.DB_PATH
 
 def get_db_connection():
     """Establishes and returns a SQLite database connection."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # This allows dictionary-like access to rows
-    return conn
+    return email_logs.connect()  # rows support dictionary-like access
 
-def init_db():
-    """Initialises the database tables if they do not already exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# Column order shared by the list endpoints and /export
+LOG_COLUMNS = (
+    "id", "original_sender", "subject", "email_content", "draft_reply",
+    "final_reply", "validation_is_valid", "validation_reason", "timestamp",
+)
+_EXPORT_BATCH = 1000
 
-    # Create email_logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS email_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            original_sender TEXT,
-            subject TEXT,
-            email_content TEXT,
-            draft_reply TEXT,
-            final_reply TEXT,
-            validation_is_valid BOOLEAN,
-            validation_reason TEXT,
-            timestamp TEXT
-        )
-    """)
 
-    # Create app_settings table for persistent settings
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS app_settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-    """)
-
-    # Seed default settings if not present
-    default_settings = {
-        "llm_provider": "OpenAI GPT-4o",
-        "vector_db": "ChromaDB",
-        "polling_interval": "60", # Stored as text, converted to int in UI
-        "notifications": "True",  # Boolean as text
-        "auto_reply": "False"     # Boolean as text
+def dumps(content: Any) -> bytes:
+    """JSON bytes via orjson when installed, else the stdlib encoder."""
+    if _HAS_ORJSON:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """Serializes plain dicts/lists directly, skipping response_model re-validation."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def log_row_to_dict(row) -> Dict[str, Any]:
+    """EmailLogResponse-shaped dict straight from a row tuple (LOG_COLUMNS order)."""
+    return {
+        "id": row[0],
+        "original_sender": row[1],
+        "subject": row[2],
+        "email_content": row[3],
+        "draft_reply": row[4],
+        "final_reply": row[5],
+        "validation_result": {"is_valid": bool(row[6]), "reason": row[7] or ""},
+        "timestamp": row[8],
     }
-    for key, val in default_settings.items():
-        cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES (?, ?)", (key, val))
 
-    conn.commit()
-    conn.close()
 
-def add_sample_data():
-    conn = sqlite3.connect("data/sqlite.db3")
-    cursor = conn.cursor()
-    
-    sample_data = [
-        ("john@example.com", "Project Update", "Hi, can you provide an update on the project status?", "Thanks for reaching out. The project is on track and we expect completion by Friday.", "Thanks for reaching out. The project is on track and we expect completion by Friday.", 1, "Valid response", (datetime.now() - timedelta(days=2)).isoformat()),
-        ("sarah@company.com", "Meeting Request", "Would you be available for a meeting next week?", "I'm available Tuesday and Wednesday next week. Please let me know what works best.", "I'm available Tuesday and Wednesday next week. Please let me know what works best.", 1, "Valid response", (datetime.now() - timedelta(days=1)).isoformat()),
-        ("client@business.com", "Invoice Question", "I have questions about the recent invoice.", "This requires detailed financial information that I cannot provide.", "This requires detailed financial information that I cannot provide.", 0, "Escalated - financial inquiry", datetime.now().isoformat()),
-        ("support@vendor.com", "Technical Issue", "We're experiencing issues with the API integration.", "Let me connect you with our technical team for assistance.", "Let me connect you with our technical team for assistance.", 0, "Escalated - technical issue", datetime.now().isoformat()),
-        ("mary@client.com", "Thank You", "Thank you for the quick response on our request!", "You're welcome! Please don't hesitate to reach out if you need anything else.", "You're welcome! Please don't hesitate to reach out if you need anything else.", 1, "Valid response", (datetime.now() - timedelta(hours=6)).isoformat())
-    ]
-    
-    cursor.executemany("""
-        INSERT INTO email_logs (original_sender, subject, email_content, draft_reply, final_reply, validation_is_valid, validation_reason, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, sample_data)
-    
-    conn.commit()
-    conn.close()
-    print(f"Added {len(sample_data)} sample email logs")
+def escalation_row_to_dict(row) -> Dict[str, Any]:
+    """EscalationResponse-shaped dict: LOG_COLUMNS (NULL without a log row), then item fields."""
+    item_id, reason, created_at, email_id, item_status = row[len(LOG_COLUMNS):]
+    if row[0] is None:
+        entry = {
+            "id": None,
+            "original_sender": "",
+            "subject": "",
+            "email_content": "",
+            "draft_reply": "",
+            "final_reply": "",
+            "validation_result": {"is_valid": False, "reason": reason or ""},
+            "timestamp": datetime.fromtimestamp(created_at).isoformat(),
+        }
+    else:
+        entry = log_row_to_dict(row)
+    entry.update({"escalation_id": item_id, "email_id": email_id, "escalation_status": item_status})
+    return entry
+
+
+def _day_start(day: str, days: int = 0) -> float:
+    """Epoch seconds of local midnight of ``day`` (YYYY-MM-DD) plus ``days``."""
+    try:
+        return (datetime.strptime(day[:10], "%Y-%m-%d") + timedelta(days=days)).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid date: {day}")
+
+
+def log_filters(
+    query: Optional[str] = None,
+    sender: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    escalated_only: bool = False,
+) -> Tuple[str, List[Any]]:
+    """WHERE clause and parameters for the email_logs filters."""
+    sql = " WHERE 1=1"
+    params: List[Any] = []
+    if query:
+        sql += " AND (email_content LIKE ? OR subject LIKE ?)"
+        params.extend([f"%{query}%", f"%{query}%"])
+    if sender:
+        sql += " AND original_sender LIKE ?"
+        params.append(f"%{sender}%")
+    # Day bounds become a range on the indexed ts column
+    if start_date:
+        sql += " AND ts >= ?"
+        params.append(_day_start(start_date))
+    if end_date:
+        sql += " AND ts < ?"
+        params.append(_day_start(end_date, days=1))
+    if escalated_only:
+        sql += " AND validation_is_valid = 0"
+    return sql, params
 
-# Ensure DB is initialised when the app starts and dummy data is added to it
-init_db()
-add_sample_data()
+
+def _select_logs(where: str, params: List[Any], limit: int, offset: int) -> List[Dict[str, Any]]:
+    sql = f"SELECT {', '.join(LOG_COLUMNS)} FROM email_logs{where} ORDER BY ts DESC LIMIT ? OFFSET ?"
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return [log_row_to_dict(row) for row in conn.execute(sql, params + [limit, offset])]
+    finally:
+        conn.close()
+
+
+def iter_log_export(where: str, params: List[Any], fmt: str = "ndjson") -> Iterator[bytes]:
+    """Stream matching rows as NDJSON or CSV, ``_EXPORT_BATCH`` rows per chunk.
+
+    Rows come from a cursor with fetchmany, so memory stays bounded by the
+    batch size whatever the table size. StreamingResponse advances a sync
+    generator from the threadpool, so each chunk (and the final close) may run
+    on a different thread; the connection is only ever used by one at a time.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(
+            f"SELECT {', '.join(LOG_COLUMNS)} FROM email_logs{where} ORDER BY ts DESC", params
+        )
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(LOG_COLUMNS)
+            yield buf.getvalue().encode("utf-8")
+            while True:
+                rows = cursor.fetchmany(_EXPORT_BATCH)
+                if not rows:
+                    break
+                buf.seek(0)
+                buf.truncate()
+                writer.writerows(rows)
+                yield buf.getvalue().encode("utf-8")
+        else:
+            while True:
+                rows = cursor.fetchmany(_EXPORT_BATCH)
+                if not rows:
+                    break
+                yield b"".join(dumps(log_row_to_dict(row)) + b"\n" for row in rows)
+    finally:
+        conn.close()
+
+def _load_app_settings() -> Dict[str, str]:
+    conn = get_db_connection()
+    try:
+        return {row["key"]: row["value"] for row in conn.execute("SELECT key, value FROM app_settings")}
+    finally:
+        conn.close()
+
+
+def _app_settings_version():
+    conn = get_db_connection()
+    try:
+        return email_logs.app_settings_version(conn)
+    finally:
+        conn.close()
+
+
+@app.on_event("startup")
+def init_db():
+    """Applies pending schema migrations; demo rows only go into an empty table."""
+    email_logs.migrate()
+    if os.getenv("SEED_SAMPLE_DATA", "1").lower() not in ("0", "false", "no"):
+        email_logs.seed_sample_data()
+    # app_settings is a config layer: read once, re-read only when its version
+    # row changes (email_logs writes and WAL checkpoints don't touch it)
+    get_config_service().add_source("app_settings", _load_app_settings, _app_settings_version)
+    # Live events from job worker processes (python -m app.services.job_queue)
+    live_events.relay_tailer.start()
+    if os.getenv("AGENT_RESUME_ON_STARTUP", "0").lower() in ("1", "true", "yes"):
+        from app.agent import agent_graph  # imported lazily: pulls in the agent stack
+
+        agent_graph.resume_on_startup()
 
 
 # --- Pydantic Models for Request/Response Validation ---
@@ -118,6 +233,12 @@ class EmailLogResponse(BaseModel):
     validation_result: ValidationResult
     timestamp: str
 
+class EscalationResponse(EmailLogResponse):
+    id: Optional[int]  # None until the item's email_logs row is written
+    escalation_id: int
+    email_id: Optional[str] = None
+    escalation_status: str
+
 class SettingsModel(BaseModel):
     llm_provider: str
     vector_db: str
@@ -128,33 +249,51 @@ class SettingsModel(BaseModel):
 class EditReplyRequest(BaseModel):
     new_reply: str
 
-# --- Routers (if you have them in separate files, include them here) ---
-# app.include_router(routes_email.router, prefix="/email", tags=["Email"])
-# app.include_router(routes_rag.router, prefix="/rag", tags=["RAG"])
-# app.include_router(routes_llm.router, prefix="/llm", tags=["LLM"])
-# app.include_router(routes_app.router, tags=["App"])
+class ClaimRequest(BaseModel):
+    operator: str
+    lease_seconds: Optional[float] = None
+
+class OperatorRequest(BaseModel):
+    operator: str
+    resolution: Optional[str] = None
 
 # --- API Endpoints with Persistent Logic ---
 
 @app.get("/status", response_model=Dict, tags=["Frontend"])
 def get_status():
-    """Returns the current status of the agent, fetching counts from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM email_logs")
-    processed_count = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM email_logs WHERE validation_is_valid = 0")
-    escalated_count = cursor.fetchone()[0] # Considered pending if escalated for human review
-
-    conn.close()
+    """Returns the current status of the agent from the in-memory dashboard totals."""
+    live_events.counters.maybe_resync()
+    totals = live_events.counters.snapshot()
     return {
         "state": "Running",  # Could be dynamic, e.g., "Processing" if agent is active
-        "processed": processed_count,
-        "pending": escalated_count # Assuming pending means escalated for human review
+        "processed": totals["total"],
+        "pending": totals["pending"] # Assuming pending means escalated for human review
     }
 
+@app.get("/events", tags=["Frontend"])
+async def stream_events(request: Request):
+    """Server-sent events for live dashboards: a snapshot of the totals, then incremental updates."""
+    # First load of the totals touches SQLite; keep it off the event loop
+    await run_in_threadpool(live_events.counters.maybe_resync)
+    sub = live_events.broadcaster.subscribe(request.headers.get("last-event-id"))
+
+    async def frames():
+        try:
+            while not await request.is_disconnected():
+                frame = await sub.next(live_events.HEARTBEAT_SECONDS)
+                if frame is None:
+                    await run_in_threadpool(live_events.counters.maybe_resync)
+                    frame = b": keep-alive\n\n"
+                yield frame
+        finally:
+            live_events.broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/logs", response_model=List[EmailLogResponse], tags=["Frontend"])
 def get_logs(
     query: Optional[str] = Query(None, description="Keyword to search in email content or subject"),
@@ -165,48 +304,9 @@ def get_logs(
     offset: int = Query(0, ge=0, description="Offset for pagination")
 ):
     """Retrieves processed email logs with filtering and pagination from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    sql_query = "SELECT * FROM email_logs WHERE 1=1"
-    params = []
-
-    if query:
-        sql_query += " AND (email_content LIKE ? OR subject LIKE ?)"
-        params.extend([f"%{query}%", f"%{query}%"])
-    if sender:
-        sql_query += " AND original_sender LIKE ?"
-        params.append(f"%{sender}%")
-    if start_date:
-        sql_query += " AND substr(timestamp, 1, 10) >= ?"
-        params.append(start_date)
-    if end_date:
-        sql_query += " AND substr(timestamp, 1, 10) <= ?"
-        params.append(end_date)
-
-    sql_query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
-
-    cursor.execute(sql_query, params)
-    rows = cursor.fetchall()
-    conn.close()
-
-    logs = []
-    for row in rows:
-        logs.append(EmailLogResponse(
-            id=row["id"],
-            original_sender=row["original_sender"],
-            subject=row["subject"],
-            email_content=row["email_content"],
-            draft_reply=row["draft_reply"],
-            final_reply=row["final_reply"],
-            validation_result=ValidationResult(
-                is_valid=bool(row["validation_is_valid"]),
-                reason=row["validation_reason"]
-            ),
-            timestamp=row["timestamp"]
-        ).dict())
-    return logs
+    where, params = log_filters(query, sender, start_date, end_date)
+    # Rows are already in the response shape; serialize them directly
+    return FastJSONResponse(_select_logs(where, params, limit, offset))
 
 @app.get("/email/history", response_model=List[EmailLogResponse], tags=["Frontend"])
 def get_history(
@@ -221,71 +321,108 @@ def get_history(
     # Reuses the logic from get_logs, just with a different default limit
     return get_logs(query, sender, start_date, end_date, limit, offset)
 
-@app.get("/email/escalations", response_model=List[EmailLogResponse], tags=["Frontend"])
-def get_escalations():
-    """Retrieves only escalated emails from the database."""
+@app.get("/email/escalations", response_model=List[EscalationResponse], tags=["Frontend"])
+def get_escalations(
+    limit: int = Query(200, ge=1, le=5000, description="Maximum number of escalations to return"),
+    offset: int = Query(0, ge=0, description="Offset for pagination")
+):
+    """Retrieves unresolved escalated emails in queue order (SLA deadline, then age).
+
+    Items without an email_logs row yet (Gmail threads waiting for the batched
+    log write) are listed from the item itself, with ``id`` null.
+    """
+    sql = (
+        f"SELECT {', '.join('l.' + c for c in LOG_COLUMNS)}, "
+        "e.id, e.reason, e.created_at, e.email_id, e.status FROM escalations e "
+        "LEFT JOIN email_logs l ON l.id = e.log_id "
+        "WHERE e.status IN ('open', 'claimed') ORDER BY e.sla_due_at, e.created_at LIMIT ? OFFSET ?"
+    )
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM email_logs WHERE validation_is_valid = 0 ORDER BY timestamp DESC")
-    rows = cursor.fetchall()
-    conn.close()
-
-    escalations = []
-    for row in rows:
-        escalations.append(EmailLogResponse(
-            id=row["id"],
-            original_sender=row["original_sender"],
-            subject=row["subject"],
-            email_content=row["email_content"],
-            draft_reply=row["draft_reply"],
-            final_reply=row["final_reply"],
-            validation_result=ValidationResult(
-                is_valid=bool(row["validation_is_valid"]),
-                reason=row["validation_reason"]
-            ),
-            timestamp=row["timestamp"]
-        ).dict())
-    return escalations
+    try:
+        return FastJSONResponse([escalation_row_to_dict(row) for row in conn.execute(sql, (limit, offset))])
+    finally:
+        conn.close()
+
+# --- Escalation work queue (claim/lease per operator) ---
+
+@app.get("/escalation-queue", tags=["Escalations"])
+def list_escalation_queue(
+    status_filter: str = Query("open", alias="status", pattern="^(open|claimed|resolved)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """One page of queue items in SLA order; keyset-paginated."""
+    try:
+        return FastJSONResponse(escalations.list_items(status_filter, limit, cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.get("/escalation-queue/stats", tags=["Escalations"])
+def escalation_queue_stats():
+    return escalations.stats()
+
+@app.post("/escalation-queue/claim", tags=["Escalations"])
+def claim_escalation(request_body: ClaimRequest):
+    """Leases the most urgent open item to the operator; 204 when the queue is empty."""
+    item = escalations.claim(
+        request_body.operator, request_body.lease_seconds or escalations.DEFAULT_LEASE_SECONDS
+    )
+    if item is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return item
+
+@app.post("/escalation-queue/{item_id}/{action}", tags=["Escalations"])
+def update_escalation(item_id: int, action: str, request_body: OperatorRequest):
+    """renew / release / resolve an item; 409 unless the operator holds its lease."""
+    if action == "renew":
+        ok = escalations.renew(item_id, request_body.operator)
+    elif action == "release":
+        ok = escalations.release(item_id, request_body.operator)
+    elif action == "resolve":
+        ok = escalations.resolve(item_id, request_body.operator, request_body.resolution or "Manually resolved")
+    else:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown action: {action}")
+    if not ok:
+        if escalations.get(item_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Escalation not found")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Escalation is not held by this operator")
+    return escalations.get(item_id)
+
+@app.get("/export", tags=["Frontend"])
+def export_logs(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    query: Optional[str] = Query(None, description="Keyword to search in email content or subject"),
+    sender: Optional[str] = Query(None, description="Filter by sender email"),
+    start_date: Optional[str] = Query(None, description="Filter logs from this date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Filter logs up to this date (YYYY-MM-DD)"),
+    escalated_only: bool = Query(False, description="Only escalated emails")
+):
+    """Streams all matching email logs as NDJSON or CSV in bounded memory."""
+    where, params = log_filters(query, sender, start_date, end_date, escalated_only)
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"email_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        iter_log_export(where, params, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @app.get("/analytics", response_model=Dict, tags=["Frontend"])
 def get_analytics():
-    """Calculates and returns analytics data based on processed emails from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM email_logs")
-    total_emails = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM email_logs WHERE validation_is_valid = 1")
-    answered_emails = cursor.fetchone()[0]
-
-    escalated_emails = total_emails - answered_emails
-
-    # Processed per day
-    processed_per_day = {}
-    cursor.execute("SELECT substr(timestamp, 1, 10) as date, COUNT(*) as count FROM email_logs GROUP BY date ORDER BY date")
-    daily_counts = cursor.fetchall()
-    for row in daily_counts:
-        processed_per_day[row["date"]] = row["count"]
-
-    conn.close()
+    """Returns analytics on processed emails from the in-memory dashboard totals."""
+    live_events.counters.maybe_resync()
+    totals = live_events.counters.snapshot()
     return {
-        "total": total_emails,
-        "answered": answered_emails,
-        "escalated": escalated_emails,
-        "processed_per_day": processed_per_day
+        "total": totals["total"],
+        "answered": totals["answered"],
+        "escalated": totals["escalated"],
+        "processed_per_day": totals["processed_per_day"]
     }
 
 @app.get("/settings", response_model=SettingsModel, tags=["Frontend"])
 def get_settings():
-    """Retrieves application settings from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT key, value FROM app_settings")
-    settings_rows = cursor.fetchall()
-    conn.close()
-
-    settings_dict = {row["key"]: row["value"] for row in settings_rows}
+    """Retrieves application settings from the in-memory config snapshot."""
+    settings_dict = get_config_service().current.layer("app_settings")
 
     # Convert stored string values to appropriate types for Pydantic model
     return SettingsModel(
@@ -310,21 +447,33 @@ def update_settings(new_settings: SettingsModel):
 
     conn.commit()
     conn.close()
+    # Publish the new settings to the snapshot right away
+    get_config_service().reload()
     return {"status": "success", "settings": new_settings.dict()}
 
+def _mark_resolved(log_id: int, resolution: str) -> None:
+    """Closes the log's queue item and marks the row valid; 409 if an operator currently holds it."""
+    if escalations.resolve_log(log_id, "dashboard", resolution) is False:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Escalation is claimed by another operator")
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT validation_is_valid FROM email_logs WHERE id = ?", (log_id,)).fetchone()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Log not found")
+        conn.execute(
+            "UPDATE email_logs SET validation_is_valid = 1, validation_reason = ? WHERE id = ?",
+            (resolution, log_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    if row[0] == 0:
+        live_events.counters.resolved()
+
 @app.post("/resolve-escalation/{log_id}", response_model=Dict, tags=["Frontend"])
 def resolve_escalation(log_id: int):
     """Marks an escalated email as resolved in the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE email_logs SET validation_is_valid = 1, validation_reason = 'Manually resolved' WHERE id = ?",
-        (log_id,)
-    )
-    conn.commit()
-    conn.close()
-    if cursor.rowcount == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Log not found")
+    _mark_resolved(log_id, "Manually resolved")
     return {"message": f"Escalation {log_id} resolved successfully"}
 
 @app.post("/edit-reply/{log_id}", response_model=Dict, tags=["Frontend"])
@@ -345,17 +494,8 @@ def edit_reply(log_id: int, request_body: EditReplyRequest):
 @app.post("/send-reply/{log_id}", response_model=Dict, tags=["Frontend"])
 def send_reply(log_id: int):
     """Placeholder for sending the final reply via email, updates log status in DB."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     # In a real scenario, this would trigger Gmail API send and then update DB
-    cursor.execute(
-        "UPDATE email_logs SET validation_is_valid = 1, validation_reason = 'Reply sent manually' WHERE id = ?",
-        (log_id,)
-    )
-    conn.commit()
-    conn.close()
-    if cursor.rowcount == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Log not found")
+    _mark_resolved(log_id, "Reply sent manually")
     return {"message": f"Reply for log {log_id} sent (simulated)"}
 
 @app.get("/sidebar", tags=["Frontend"])
@@ -372,6 +512,15 @@ def get_sidebar_links():
         ]
     }
 
+# --- Routers ---
+# Included after the endpoints above: where a router repeats one of their
+# paths (/logs, /status, /email/history, ...) the dashboard version wins, and
+# before the SPA fallback so it does not swallow router paths.
+app.include_router(routes_email.router, prefix="/email", tags=["Email"])
+app.include_router(routes_rag.router, prefix="/rag", tags=["RAG"])
+app.include_router(routes_llm.router, prefix="/llm", tags=["LLM"])
+app.include_router(routes_app.router, tags=["App"])
+
 # --- Frontend Static Hosting (after build) ---
 PROJECT_ROOT = Path(__file__).resolve().parents[1] # Adjust if main.py is deeper
 FRONTEND_DIST_DIR = PROJECT_ROOT / "Frontend" / "dist"
@@ -388,7 +537,7 @@ if FRONTEND_DIST_DIR.exists():
     def spa_fallback(full_path: str):
         """Serves index.html for all client-side routes, unless it's an API route."""
         # If request targets API prefixes, let FastAPI handle normally
-        if full_path.startswith(("email", "rag", "llm", "docs", "redoc", "openapi.json", "status", "logs", "analytics", "settings", "resolve-escalation", "edit-reply", "send-reply", "sidebar")):
+        if full_path.startswith(("email", "rag", "llm", "docs", "redoc", "openapi.json", "status", "logs", "analytics", "settings", "resolve-escalation", "edit-reply", "send-reply", "sidebar", "export", "escalation-queue", "events", "config")):
             # If it matches an API endpoint, let FastAPI's other routes handle it,
             # or return 404 if no specific API route matches.
             # This is a fallback to prevent SPA routing from catching API calls
@@ -0,0 +1,368 @@
+"""Shared embedding server over a UNIX socket, with dynamic micro-batching.
+
+One process loads the embedding model (EMBEDDING_BACKEND) once and serves
+every uvicorn worker and job worker, instead of one model copy per process.
+Concurrent encode requests are queued and encoded together: the batcher
+takes the first waiting request, then keeps collecting for up to
+EMBEDDING_BATCH_WAIT_MS or until EMBEDDING_MAX_BATCH texts, and runs a
+single forward pass for all of them. If that pass fails, the batch is
+re-encoded one request at a time so only the offending request gets the
+error.
+
+    python -m app.models.embedding_server serve   # load the model, listen on the socket
+    python -m app.models.embedding_server stats   # batches, texts, mean batch size
+    python -m app.models.embedding_server bench   # concurrent throughput: server vs in-process
+
+Processes use it when EMBEDDING_SERVER_SOCKET is set (see
+embeddings.get_embedding_model). If the server is down or fails a request,
+the client encodes in-process (loading the model on first use) and retries
+the socket after EMBEDDING_SERVER_RETRY seconds.
+
+Wire format: every message is a 4-byte big-endian length plus payload. A
+request is JSON ({"op": "embed", "backend": ..., "texts": [...]} or
+{"op": "stats"}); the reply is a JSON header ({"rows", "dim"} or {"error"})
+followed, for embeddings, by one frame of native float32 values.
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from langchain_core.embeddings import Embeddings
+except Exception:  # pragma: no cover
+    Embeddings = object  # type: ignore
+
+SOCKET_PATH = os.getenv("EMBEDDING_SERVER_SOCKET", "")
+MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+BATCH_WAIT = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")) / 1000
+TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "30"))
+RETRY_SECONDS = float(os.getenv("EMBEDDING_SERVER_RETRY", "5"))
+
+_HEADER = struct.Struct(">I")
+
+
+def _send(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock: socket.socket) -> bytes:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+# === Server === #
+
+
+class _Request:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """Single encode thread that merges requests arriving within ``max_wait``."""
+
+    def __init__(self, encode: Callable[[List[str]], List[List[float]]],
+                 max_batch: int = MAX_BATCH, max_wait: float = BATCH_WAIT):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._stats = {"requests": 0, "texts": 0, "batches": 0, "batch_failures": 0, "encode_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def submit(self, texts: List[str]) -> Future:
+        request = _Request(texts)
+        self._queue.put(request)
+        return request.future
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            start = time.perf_counter()
+            try:
+                vectors = self.encode(texts)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                else:
+                    self._run_singly(batch)
+                continue
+            with self._stats_lock:
+                self._stats["requests"] += len(batch)
+                self._stats["texts"] += len(texts)
+                self._stats["batches"] += 1
+                self._stats["encode_seconds"] += time.perf_counter() - start
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+    def _run_singly(self, batch: List[_Request]) -> None:
+        """Re-encode a failed batch one request at a time, so only the bad request fails."""
+        with self._stats_lock:
+            self._stats["batch_failures"] += 1
+        for request in batch:
+            start = time.perf_counter()
+            try:
+                vectors = self.encode(request.texts)
+            except Exception as e:
+                request.future.set_exception(e)
+                continue
+            with self._stats_lock:
+                self._stats["requests"] += 1
+                self._stats["texts"] += len(request.texts)
+                self._stats["batches"] += 1
+                self._stats["encode_seconds"] += time.perf_counter() - start
+            request.future.set_result(vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["mean_batch_texts"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["encode_seconds"] = round(stats["encode_seconds"], 3)
+        return stats
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """One client connection; requests on it are answered in order."""
+
+    def handle(self) -> None:
+        server: "EmbeddingServer" = self.server  # type: ignore[assignment]
+        while True:
+            try:
+                request = json.loads(_recv(self.request))
+            except (ConnectionError, OSError, ValueError):
+                return
+            try:
+                if request.get("op") == "stats":
+                    reply = {**server.batcher.stats(), "backend": server.backend, "pid": os.getpid()}
+                    _send(self.request, json.dumps(reply).encode("utf-8"))
+                    continue
+                if request.get("backend") not in (None, server.backend):
+                    raise ValueError(f"server encodes with {server.backend}, not {request['backend']}")
+                vectors = server.batcher.submit(list(request.get("texts") or [])).result()
+            except Exception as e:
+                _send(self.request, json.dumps({"error": str(e)}).encode("utf-8"))
+                continue
+            dim = len(vectors[0]) if vectors else 0
+            flat = array("f", (value for vector in vectors for value in vector))
+            _send(self.request, json.dumps({"rows": len(vectors), "dim": dim}).encode("utf-8"))
+            _send(self.request, flat.tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every worker process and thread connects at once after a deploy
+    request_queue_size = 256
+
+    def __init__(self, path: str, backend: str, batcher: MicroBatcher):
+        self.backend = backend
+        self.batcher = batcher
+        super().__init__(path, _Handler)
+
+
+def _remove_stale_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)  # left behind by a server that died
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"An embedding server is already listening on {path}")
+
+
+def serve(path: str = SOCKET_PATH, backend: Optional[str] = None) -> None:
+    """Load the model once and serve encode requests until interrupted."""
+    from app.config import get_config
+    from app.models.embeddings import get_embedding_model
+
+    if not path:
+        raise ValueError("Set EMBEDDING_SERVER_SOCKET (or pass --socket)")
+    backend = backend or get_config().embedding_backend
+    model = get_embedding_model(backend, local=True)
+    model.embed_documents(["warm up"])
+    batcher = MicroBatcher(model.embed_documents)
+
+    _remove_stale_socket(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    server = EmbeddingServer(path, backend, batcher)
+    os.chmod(path, 0o660)
+    print(f" Embedding server ({backend}) listening on {path} "
+          f"(batch <= {batcher.max_batch} texts, wait {batcher.max_wait * 1000:.1f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+# === Client === #
+
+
+class EmbeddingClient(Embeddings):
+    """LangChain-compatible embeddings served by the shared server.
+
+    Each thread keeps its own connection. While the server is unreachable,
+    texts are encoded by ``fallback()`` (the in-process model).
+    """
+
+    def __init__(self, path: str, backend: str, fallback: Callable[[], Any], timeout: float = TIMEOUT):
+        self.path = path
+        self.backend = backend
+        self.fallback = fallback
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _remote(self, texts: List[str]) -> List[List[float]]:
+        sock = self._connection()
+        try:
+            _send(sock, json.dumps({"op": "embed", "backend": self.backend, "texts": texts}).encode("utf-8"))
+            header = json.loads(_recv(sock))
+            if "error" in header:
+                raise RuntimeError(header["error"])
+            flat = array("f")
+            flat.frombytes(_recv(sock))
+        except Exception:
+            # The stream may be mid-message; start over on a new connection
+            self._drop_connection()
+            raise
+        dim = header["dim"]
+        return [flat[i * dim:(i + 1) * dim].tolist() for i in range(header["rows"])]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        if time.monotonic() >= self._down_until:
+            try:
+                return self._remote(texts)
+            except Exception as e:
+                self._down_until = time.monotonic() + RETRY_SECONDS
+                print(f" Embedding server unavailable ({e}); encoding in-process")
+        return self.fallback().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def server_stats(path: str = SOCKET_PATH) -> Dict[str, Any]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(TIMEOUT)
+    try:
+        sock.connect(path)
+        _send(sock, b'{"op": "stats"}')
+        return json.loads(_recv(sock))
+    finally:
+        sock.close()
+
+
+def bench(path: str = SOCKET_PATH, threads: int = 16, requests: int = 50) -> Dict[str, Any]:
+    """Texts/second with ``threads`` concurrent callers: shared server vs in-process model."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.config import get_config
+    from app.models.embeddings import get_embedding_model
+    from app.models.onnx_embeddings import PARITY_TEXTS
+
+    backend = get_config().embedding_backend
+    local = get_embedding_model(backend, local=True)
+    remote = EmbeddingClient(path, backend, fallback=lambda: local)
+    results = {}
+    for name, model in (("in_process", local), ("server", remote)):
+        model.embed_query("warm up")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(
+                lambda i: model.embed_query(PARITY_TEXTS[i % len(PARITY_TEXTS)]),
+                range(threads * requests),
+            ))
+        elapsed = time.perf_counter() - start
+        results[name] = {"seconds": round(elapsed, 3), "texts_per_second": round(threads * requests / elapsed, 1)}
+    results["server_stats"] = server_stats(path)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared embedding server")
+    parser.add_argument("command", choices=["serve", "stats", "bench"])
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.socket, args.backend)
+    elif args.command == "stats":
+        print(json.dumps(server_stats(args.socket), indent=2))
+    else:
+        print(json.dumps(bench(args.socket, args.threads), indent=2))
@@ -1,22 +1,59 @@
 import os
+from typing import Dict, Optional
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings  
+from app.config import get_config
 
 # Ensure embeddings folder exists
 EMB_PATH = "data/embeddings/faiss_index"
 os.makedirs(os.path.dirname(EMB_PATH), exist_ok=True)
 
+_models: Dict[str, object] = {}
+_clients: Dict[str, object] = {}
+
 # Load embedding model
-def get_embedding_model():
-    """Return HuggingFace embedding model"""
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+def get_embedding_model(backend: Optional[str] = None, local: bool = False):
+    """Return the embedding model for EMBEDDING_BACKEND ("hf" or "onnx"), loaded once.
+
+    Both backends produce compatible normalized MiniLM vectors, so an index built
+    with one can be queried with the other. With EMBEDDING_SERVER_SOCKET set,
+    returns a client of the shared embedding server (see embedding_server.py),
+    which loads the in-process model only if the server is down; ``local=True``
+    always returns the in-process model.
+    """
+    backend = backend or get_config().embedding_backend
+    from app.models.embedding_server import SOCKET_PATH, EmbeddingClient
+
+    if SOCKET_PATH and not local:
+        if backend not in _clients:
+            _clients[backend] = EmbeddingClient(
+                SOCKET_PATH, backend, fallback=lambda: get_embedding_model(backend, local=True)
+            )
+        return _clients[backend]
+    if backend not in _models:
+        if backend == "onnx":
+            from app.models.onnx_embeddings import OnnxEmbeddings
+            _models[backend] = OnnxEmbeddings()
+        elif backend == "hf":
+            # Imported lazily: pulls in torch
+            from langchain_huggingface import HuggingFaceEmbeddings
+            _models[backend] = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    return _models[backend]
 
 # Save vector DB
-def save_vector_db(texts, db_path=EMB_PATH):
-    """Save FAISS vector DB"""
+def save_vector_db(texts, db_path=EMB_PATH, metadatas=None):
+    """Save FAISS vector DB, plus a compact index at <db_path>_compact if COMPACT_EMBEDDINGS is set"""
     embeddings = get_embedding_model()
-    db = FAISS.from_texts(texts, embedding=embeddings)
+    db = FAISS.from_texts(texts, embedding=embeddings, metadatas=metadatas)
     db.save_local(db_path)
+
+    compact_mode = get_config().compact_embeddings
+    if compact_mode != "off":
+        from app.rag.compact_index import CompactIndex, faiss_vectors
+        dims = int(os.getenv("COMPACT_DIMS", "0")) or None
+        vectors, chunk_texts = faiss_vectors(db)
+        CompactIndex.build(vectors, chunk_texts, compact_mode, dims).save(f"{db_path}_compact")
     return db
 
 # Load vector DB
@@ -1,27 +1,93 @@
 import os
+import threading
 from groq import Groq
 from dotenv import load_dotenv
+from app.config import get_config, get_config_service
 load_dotenv()
 
-# Initialize Groq Client
+
+class _ConcurrencyLimit:
+    """Semaphore whose limit can be changed while requests are in flight"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def resize(self, limit: int) -> None:
+        with self._cond:
+            self.limit = max(1, limit)
+            self._cond.notify_all()
+
+    def __enter__(self):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+
+_limit = None
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+
+def _on_config(new, old):
+    if new.changed(old, "llm_max_concurrency"):
+        _limit.resize(new.settings.llm_max_concurrency)
+
+
+def _concurrency_limit():
+    """Created on the first LLM call, so importing this module starts no config watcher"""
+    global _limit
+    with _client_lock:
+        if _limit is None:
+            _limit = _ConcurrencyLimit(get_config().llm_max_concurrency)
+            get_config_service().subscribe(_on_config)
+        return _limit
+
+# Groq client, created once and rebuilt only if the API key changes
 def get_llm():
+    global _client, _client_key
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError(" GROQ_API_KEY not found in environment variables")
-    return Groq(api_key=api_key)
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            _client, _client_key = Groq(api_key=api_key), api_key
+        return _client
 
 # Generate response
-def generate_response(prompt, model=os.environ['LLM_MODEL'], temperature=0.3, max_tokens=512):
-    if model is None:
-        model = os.environ['LLM_MODEL']
-        if not model:
-            raise ValueError("LLM_MODEL not set in environment variables")
-    
-    client = get_llm()
-    response = client.chat.completions.create(
+def generate_response(prompt, model=None, temperature=0.3, max_tokens=None):
+    return generate_chat(
+        [{"role": "system", "content": prompt}],
         model=model,
-        messages=[{"role": "system", "content": prompt}],
         temperature=temperature,
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
     )
+
+# Generate response from pre-built chat messages (stable system prefix + user turn)
+def generate_chat(messages, model=None, temperature=0.3, max_tokens=None):
+    cfg = get_config()
+    if max_tokens is None:
+        max_tokens = cfg.max_completion_tokens
+    # Model comes from the live config snapshot, so a changed LLM_MODEL applies to the next call
+    model = model or cfg.llm_model
+    if not model:
+        raise ValueError("LLM_MODEL not set in environment variables")
+
+    client = get_llm()
+    with _concurrency_limit():
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
     return response.choices[0].message.content.strip()
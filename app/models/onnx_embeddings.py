@@ -0,0 +1,238 @@
+"""ONNX Runtime (int8) backend for the MiniLM sentence embeddings.
+
+Produces the same vectors as the default HuggingFace backend (mean pooling
+over token embeddings, then L2 normalisation), so an index built with one
+backend can be queried with the other. Inference needs only onnxruntime,
+tokenizers and numpy; torch is needed once, to export the model.
+
+    python -m app.models.onnx_embeddings export   # export + int8 dynamic quantization
+    python -m app.models.onnx_embeddings parity   # cosine agreement vs the HF backend
+    python -m app.models.onnx_embeddings bench    # startup, per-query latency, peak RSS
+
+Select it with EMBEDDING_BACKEND=onnx (threads: EMBEDDING_THREADS).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    # Soft dependency: only needed for EMBEDDING_BACKEND=onnx
+    import numpy as np
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    _HAS_ONNX = True
+except Exception:  # pragma: no cover - default backend doesn't need onnxruntime
+    np = None  # type: ignore
+    ort = None  # type: ignore
+    Tokenizer = None  # type: ignore
+    _HAS_ONNX = False
+
+try:
+    from langchain_core.embeddings import Embeddings
+except Exception:  # pragma: no cover
+    Embeddings = object  # type: ignore
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "data/embeddings/onnx")
+MODEL_FILE = "model.int8.onnx"
+MAX_SEQ_LENGTH = 256  # same truncation as the sentence-transformers model
+
+PARITY_TEXTS = [
+    "I want a refund for my cancelled flight.",
+    "How many kilograms of checked baggage are included in economy?",
+    "Can I change the date of my booking without paying a fee?",
+    "My bag was damaged on arrival, how do I file a claim?",
+    "Refunds are processed within 7 business days to the original payment method.",
+    "Passengers may bring one personal item and one cabin bag up to 8 kg.",
+]
+
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain-compatible embeddings served by an int8 ONNX Runtime session."""
+
+    def __init__(
+        self,
+        model_dir: str = ONNX_DIR,
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+    ):
+        if not _HAS_ONNX:
+            raise ImportError("onnxruntime, tokenizers and numpy are required for EMBEDDING_BACKEND=onnx")
+        model_path = os.path.join(model_dir, MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found. Run: python -m app.models.onnx_embeddings export"
+            )
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = num_threads or int(os.getenv("EMBEDDING_THREADS", "0"))
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        # Pad to the longest sequence of each batch, not to a fixed length
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        self.batch_size = batch_size
+
+    def _encode_batch(self, texts: List[str]) -> "np.ndarray":
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalise (as sentence-transformers)
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def encode(self, texts: List[str]) -> "np.ndarray":
+        """Embed texts in length-sorted batches so short texts aren't padded to long ones."""
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Any] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            for i, vector in zip(idx, self._encode_batch([texts[i] for i in idx])):
+                vectors[i] = vector
+        return np.stack(vectors).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode_batch([text])[0].tolist()
+
+
+def export_model(model_name: str = MODEL_NAME, out_dir: str = ONNX_DIR) -> str:
+    """Export the HF model to ONNX and apply int8 dynamic quantization (needs torch)."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(out_dir)  # writes tokenizer.json
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {name: {0: "batch", 1: "seq"} for name in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "seq"}
+    fp32_path = os.path.join(out_dir, "model.fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=14,
+        )
+
+    out_path = os.path.join(out_dir, MODEL_FILE)
+    quantize_dynamic(fp32_path, out_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    return out_path
+
+
+def parity_report(texts: Optional[List[str]] = None, min_cosine: float = 0.98) -> Dict[str, Any]:
+    """Cosine agreement between HF and ONNX embeddings of the same texts.
+
+    Vectors are L2-normalised by both backends, so the dot product is the cosine.
+    ``ok`` is False if any text falls below ``min_cosine``.
+    """
+    from app.models.embeddings import get_embedding_model
+
+    texts = texts or PARITY_TEXTS
+    reference = np.array(get_embedding_model("hf", local=True).embed_documents(texts), dtype=np.float32)
+    onnx = np.array(get_embedding_model("onnx", local=True).embed_documents(texts), dtype=np.float32)
+    cosines = (reference * onnx).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 4),
+        "mean_cosine": round(float(cosines.mean()), 4),
+        "threshold": min_cosine,
+        "ok": bool(cosines.min() >= min_cosine),
+    }
+
+
+def _probe(backend: str, queries: int) -> Dict[str, Any]:
+    """Measure one backend in the current (fresh) process."""
+    import resource
+
+    started = time.perf_counter()
+    from app.models.embeddings import get_embedding_model
+
+    model = get_embedding_model(backend, local=True)
+    model.embed_query("warm up")
+    startup = time.perf_counter() - started
+
+    latencies = []
+    for i in range(queries):
+        text = PARITY_TEXTS[i % len(PARITY_TEXTS)]
+        t0 = time.perf_counter()
+        model.embed_query(text)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return {
+        "backend": backend,
+        "startup_s": round(startup, 2),
+        "p50_query_ms": round(1000 * latencies[len(latencies) // 2], 2),
+        "p95_query_ms": round(1000 * latencies[int(len(latencies) * 0.95)], 2),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def benchmark(queries: int = 200) -> List[Dict[str, Any]]:
+    """Run each backend in its own process so startup time and peak RSS are comparable."""
+    results = []
+    for backend in ("hf", "onnx"):
+        out = subprocess.run(
+            [sys.executable, "-m", "app.models.onnx_embeddings", "probe", backend, str(queries)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ONNX Runtime embedding backend tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("export")
+    p = sub.add_parser("parity")
+    p.add_argument("--min-cosine", type=float, default=0.98)
+    b = sub.add_parser("bench")
+    b.add_argument("--queries", type=int, default=200)
+    pr = sub.add_parser("probe")
+    pr.add_argument("backend")
+    pr.add_argument("queries", type=int)
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        print(f" Exported {export_model()}")
+    elif args.cmd == "parity":
+        report = parity_report(min_cosine=args.min_cosine)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["ok"] else 1)
+    elif args.cmd == "bench":
+        for row in benchmark(args.queries):
+            print(json.dumps(row))
+    else:
+        print(json.dumps(_probe(args.backend, args.queries)))
@@ -0,0 +1,204 @@
+"""Compact embeddings with a two-stage search: cheap prefilter, then float rescoring.
+
+Modes (COMPACT_EMBEDDINGS):
+- ``binary``: sign bits packed into uint8 (384 dims -> 48 bytes per vector);
+  candidates are ranked by Hamming distance (XOR + popcount)
+- ``truncated``: the first ``COMPACT_DIMS`` dimensions as float16, re-normalised
+  (Matryoshka-style; MiniLM is not Matryoshka-trained, so keep the rescore pool wide)
+
+Only the compact codes are held in memory. Full float32 vectors are memory-mapped
+from disk and read for the ``rescore`` shortlist only.
+
+    python -m app.rag.compact_index report   # memory, recall@k and latency vs flat search
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+COMPACT_PATH = "data/embeddings/faiss_index_compact"
+
+if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[x]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Sign-bit codes packed 8 dims per byte."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    return _popcount(np.bitwise_xor(codes, query_code)).sum(axis=1, dtype=np.int32)
+
+
+class CompactIndex:
+    """Prefilter over compact codes, rescoring the shortlist with full vectors."""
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        vectors: np.ndarray,
+        texts: List[str],
+        mode: str = "binary",
+        dims: Optional[int] = None,
+    ):
+        if mode not in ("binary", "truncated"):
+            raise ValueError(f"Unknown compact mode: {mode}")
+        self.codes = codes
+        self.vectors = vectors  # usually a read-only memmap
+        self.texts = texts
+        self.mode = mode
+        self.dims = dims or vectors.shape[1]
+
+    @classmethod
+    def build(
+        cls, vectors: np.ndarray, texts: List[str], mode: str = "binary", dims: Optional[int] = None
+    ) -> "CompactIndex":
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        dims = dims or vectors.shape[1]
+        prefix = vectors[:, :dims]
+        if mode == "binary":
+            codes = binarize(prefix)
+        else:
+            codes = _normalize(prefix).astype(np.float16)
+        return cls(codes, vectors, texts, mode, dims)
+
+    def _encode_query(self, query: np.ndarray) -> np.ndarray:
+        prefix = query[: self.dims]
+        if self.mode == "binary":
+            return binarize(prefix)
+        return _normalize(prefix).astype(np.float16)
+
+    def prefilter(self, query: np.ndarray, n: int, ids: Optional[List[int]] = None) -> np.ndarray:
+        """Indices of the ``n`` best candidates by compact code (among ``ids`` if given)."""
+        code = self._encode_query(query)
+        rows = np.arange(len(self.codes)) if ids is None else np.asarray(ids, dtype=np.int64)
+        codes = self.codes if ids is None else self.codes[rows]
+        if self.mode == "binary":
+            scores = -hamming_distances(codes, code)
+        else:
+            scores = codes.astype(np.float32) @ code.astype(np.float32)
+        if n >= len(scores):
+            return rows
+        return rows[np.argpartition(-scores, n - 1)[:n]]
+
+    def search(
+        self, query: Any, k: int = 3, rescore: int = 10, ids: Optional[List[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Top ``k`` (index, cosine) after rescoring ``rescore * k`` candidates.
+
+        ``ids`` restricts the search to those rows (a namespace, see app.rag.namespaces).
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        # Sorted row order keeps memmap reads sequential
+        candidates = np.sort(self.prefilter(query, max(k, rescore * k), ids))
+        if len(candidates) == 0:
+            return []
+        scores = np.asarray(self.vectors[candidates]) @ query
+        order = np.argsort(-scores)[:k]
+        return [(int(candidates[j]), float(scores[j])) for j in order]
+
+    def memory_bytes(self) -> Dict[str, int]:
+        return {
+            "flat_float32": int(self.vectors.shape[0] * self.vectors.shape[1] * 4),
+            "compact_codes": int(self.codes.nbytes),
+        }
+
+    def save(self, path: str = COMPACT_PATH) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "codes.npy"), self.codes)
+        np.save(os.path.join(path, "vectors.npy"), np.asarray(self.vectors, dtype=np.float32))
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "dims": self.dims, "texts": self.texts}, f)
+
+    @classmethod
+    def load(cls, path: str = COMPACT_PATH) -> "CompactIndex":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        codes = np.load(os.path.join(path, "codes.npy"))
+        # Full vectors stay on disk; only rescored rows are paged in
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        return cls(codes, vectors, meta["texts"], meta["mode"], meta["dims"])
+
+
+def faiss_vectors(db) -> Tuple[np.ndarray, List[str]]:
+    """Float vectors and texts of a LangChain FAISS store, in index order."""
+    vectors = db.index.reconstruct_n(0, db.index.ntotal)
+    texts = [db.docstore.search(db.index_to_docstore_id[i]).page_content for i in range(db.index.ntotal)]
+    return np.asarray(vectors, dtype=np.float32), texts
+
+
+def compare_with_flat(
+    index: CompactIndex,
+    queries: np.ndarray,
+    k: int = 3,
+    rescore_factors: Tuple[int, ...] = (1, 2, 5, 10, 20, 50),
+) -> Dict[str, Any]:
+    """Recall@k and per-query latency of the two-stage search against exact flat search."""
+    queries = _normalize(np.asarray(queries, dtype=np.float32))
+    full = np.asarray(index.vectors, dtype=np.float32)
+
+    t0 = time.perf_counter()
+    truth = [set(np.argsort(-(full @ q))[:k].tolist()) for q in queries]
+    flat_ms = 1000 * (time.perf_counter() - t0) / len(queries)
+
+    rows = []
+    for factor in rescore_factors:
+        t0 = time.perf_counter()
+        results = [index.search(q, k, factor) for q in queries]
+        elapsed_ms = 1000 * (time.perf_counter() - t0) / len(queries)
+        hits = sum(len(truth[i] & {idx for idx, _ in r}) for i, r in enumerate(results))
+        rows.append({
+            "rescore": factor,
+            "recall_at_k": round(hits / (k * len(queries)), 4),
+            "query_ms": round(elapsed_ms, 3),
+        })
+
+    memory = index.memory_bytes()
+    return {
+        "mode": index.mode,
+        "dims": index.dims,
+        "vectors": int(full.shape[0]),
+        "memory_bytes": memory,
+        "memory_reduction": round(memory["flat_float32"] / max(1, memory["compact_codes"]), 1),
+        "flat_query_ms": round(flat_ms, 3),
+        "two_stage": rows,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.models.embeddings import get_embedding_model, load_vector_db
+    from app.rag.rag_pipeline import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Compact index vs flat FAISS report")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--mode", choices=["binary", "truncated"], default="binary")
+    parser.add_argument("--dims", type=int, default=None)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", default=None, help="file with one query per line (default: the chunks)")
+    args = parser.parse_args()
+
+    vectors, texts = faiss_vectors(load_vector_db(DB_PATH))
+    index = CompactIndex.build(vectors, texts, args.mode, args.dims)
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        queries = np.asarray(get_embedding_model().embed_documents(lines), dtype=np.float32)
+    else:
+        queries = vectors
+    print(json.dumps(compare_with_flat(index, queries, args.k), indent=2))
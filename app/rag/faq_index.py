@@ -0,0 +1,210 @@
+"""Question index over the numbered FAQ entries of the policy files.
+
+Each ``N. question`` line under a ``##`` section is embedded on its own, with
+its answer block (the lines up to the next question or heading) in the
+metadata. An email that is essentially one of those questions gets the
+canonical answer as a templated reply, with no LLM call: when the top
+``similarity_search_with_score`` hit has cosine similarity of at least
+FAQ_MATCH_THRESHOLD. Hits, misses and the distribution of top scores are in
+metrics.faq_stats().
+
+The index lives at ``FAQ_DB_PATH`` and is rebuilt when a policy file is newer.
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.config import get_config, get_config_service
+from app.models.embeddings import get_embedding_model, load_vector_db
+from app.services import metrics
+
+FAQ_DB_PATH = "data/embeddings/faq_index"
+
+_QUESTION_RE = re.compile(r"^\s*(\d+)\.\s+(.+?)\s*$")
+_HEADING_RE = re.compile(r"^##\s+(.+?)\s*$")
+_BULLET_RE = re.compile(r"^\s*[*\-]\s+")
+# Some sections write "Answer: ..." under each question
+_ANSWER_LABEL_RE = re.compile(r"^answer\s*:\s*", re.IGNORECASE)
+
+# Bumped when parsing changes; an index built by an older version is rebuilt
+_INDEX_VERSION = "2"
+_VERSION_FILE = "VERSION"
+
+REPLY_TEMPLATE = (
+    "Dear Customer,\n\n"
+    "Thank you for your message. Regarding your question \"{question}\":\n\n"
+    "{answer}\n\n"
+    "If this does not answer your request, simply reply to this email and our support team will help you.\n\n"
+    "Regards,\nEmail RAG Agent"
+)
+
+_db = None
+_lock = threading.Lock()
+
+
+def _on_config(new, old):
+    """The index holds the previous backend's embedding function"""
+    global _db
+    if new.changed(old, "embedding_backend"):
+        _db = None
+
+
+get_config_service().subscribe(_on_config)
+
+
+def parse_faq(text: str, source: str = "") -> List[Dict[str, str]]:
+    """Numbered question/answer entries, in file order; questions without an answer are skipped."""
+    entries: List[Dict[str, str]] = []
+    section = ""
+    current: Optional[Dict[str, Any]] = None
+
+    def close() -> None:
+        if current is not None:
+            answer = _ANSWER_LABEL_RE.sub("", "\n".join(current.pop("lines")).strip(), count=1)
+            if answer:
+                entries.append({**current, "answer": answer})
+
+    for line in text.splitlines():
+        heading = _HEADING_RE.match(line)
+        question = _QUESTION_RE.match(line) if not line.startswith(("\t", "    ")) else None
+        if heading:
+            close()
+            section, current = heading.group(1), None
+        elif question:
+            close()
+            current = {
+                "source": source,
+                "section": section,
+                "number": question.group(1),
+                "question": question.group(2),
+                "lines": [],
+            }
+        elif current is not None and (line.strip() or current["lines"]):
+            current["lines"].append(_BULLET_RE.sub("- ", line).strip())
+    close()
+    return entries
+
+
+def _policy_mtime() -> float:
+    from app.rag.rag_pipeline import policy_paths
+
+    return max((os.path.getmtime(p) for p in policy_paths() if os.path.exists(p)), default=0.0)
+
+
+def build_faq_index(db_path: str = FAQ_DB_PATH):
+    """Embed every FAQ question of the policy files (answers go in the metadata)."""
+    from langchain_community.vectorstores import FAISS
+    from app.rag.rag_pipeline import policy_paths
+
+    entries: List[Dict[str, str]] = []
+    for path in policy_paths():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f" Policy file not found at {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            entries += parse_faq(f.read(), os.path.splitext(os.path.basename(path))[0])
+    if not entries:
+        return None
+
+    questions = [e["question"] for e in entries]
+    metadatas = [{k: v for k, v in e.items() if k != "question"} for e in entries]
+    db = FAISS.from_texts(questions, embedding=get_embedding_model(), metadatas=metadatas)
+    db.save_local(db_path)
+    with open(os.path.join(db_path, _VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(_INDEX_VERSION)
+    print(f" FAQ index built at {db_path} ({len(entries)} questions)")
+    return db
+
+
+def _index_version(db_path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(db_path, _VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _load():
+    """Loaded question index, rebuilt if missing, outdated or older than the policy files"""
+    global _db
+    with _lock:
+        index_file = os.path.join(FAQ_DB_PATH, "index.faiss")
+        if (
+            not os.path.exists(index_file)
+            or os.path.getmtime(index_file) < _policy_mtime()
+            or _index_version(FAQ_DB_PATH) != _INDEX_VERSION
+        ):
+            _db = build_faq_index(FAQ_DB_PATH)
+        elif _db is None:
+            _db = load_vector_db(FAQ_DB_PATH)
+        return _db
+
+
+def lookup(query: str) -> Optional[Dict[str, Any]]:
+    """Closest FAQ entry with its cosine ``score`` (no threshold applied)."""
+    from app.rag.rag_pipeline import distance_to_similarity
+
+    db = _load() if query and query.strip() else None
+    if db is None:
+        return None
+    hits = db.similarity_search_with_score(query, k=1)
+    if not hits:
+        return None
+    doc, distance = hits[0]
+    return {"question": doc.page_content, **doc.metadata, "score": distance_to_similarity(distance)}
+
+
+def match(email_body: str, threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """FAQ entry the email is essentially asking, or None (FAQ_FAST_PATH off, or below threshold).
+
+    The result has ``reply``, the templated canonical answer. Every lookup is
+    recorded as a hit or miss with its top score.
+    """
+    cfg = get_config()
+    if not cfg.faq_fast_path:
+        return None
+    threshold = cfg.faq_match_threshold if threshold is None else threshold
+    from app.agent.prompt_budget import compress_email
+
+    try:
+        entry = lookup(compress_email(email_body) or email_body)
+    except Exception as e:
+        # The LLM path still answers; a broken index must not block replies
+        print(f" FAQ lookup failed: {e}")
+        return None
+    score = entry["score"] if entry else None
+    hit = entry is not None and score >= threshold
+    metrics.record_faq_lookup(score, hit)
+    if not hit:
+        return None
+    return {**entry, "reply": REPLY_TEMPLATE.format(question=entry["question"], answer=entry["answer"])}
+
+
+def as_doc(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The matched answer as a retrieved-doc dict (grounding for validation)."""
+    return {
+        "id": f"faq:{entry.get('section', '')}#{entry.get('number', '')}",
+        "content": f"{entry['question']}\n{entry['answer']}",
+        "source": entry.get("source"),
+        "section": entry.get("section"),
+        "score": entry.get("score"),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="FAQ question index")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build")
+    q = sub.add_parser("query")
+    q.add_argument("text")
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        build_faq_index()
+    else:
+        entry = lookup(args.text)
+        print(json.dumps(entry, indent=2, ensure_ascii=False) if entry else "no FAQ entries")
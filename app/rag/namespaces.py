@@ -0,0 +1,118 @@
+"""Section/source namespaces over the FAISS index.
+
+At indexing time every chunk gets ``{"source", "section"}`` metadata from its
+file name and the ``##`` heading above it. ``namespaces.json`` next to the
+index maps each namespace to the FAISS row ids it contains, so a filtered
+search only scores those rows (faiss IDSelector) instead of post-filtering a
+large k over the whole corpus.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NAMESPACES_FILE = "namespaces.json"
+# Bumped when chunk metadata changes; older namespace maps trigger a rebuild
+NAMESPACES_VERSION = 2
+
+# re.M: a heading is often followed by body text in the same paragraph
+_HEADING_RE = re.compile(r"^##\s+(.+?)\s*$", re.M)
+
+
+def namespace_key(kind: str, value: str) -> str:
+    """Normalised key, e.g. ("section", "Booking and Cancellation") -> "section:booking and cancellation"."""
+    return f"{kind}:{' '.join(value.split()).lower()}"
+
+
+def chunk_policy(text: str, source: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """Paragraph chunks with the ``##`` section each falls under."""
+    chunks, metadatas = [], []
+    section = ""
+    for chunk in text.split("\n\n"):  # simple chunking
+        heading = _HEADING_RE.search(chunk)
+        if heading:
+            section = heading.group(1)
+        if not chunk.strip():
+            continue
+        chunks.append(chunk)
+        metadatas.append({"source": source, "section": section})
+    return chunks, metadatas
+
+
+def build_namespaces(metadatas: Iterable[Dict[str, str]]) -> Dict[str, Any]:
+    """Map namespace keys to FAISS row ids, plus display names for listing."""
+    ids: Dict[str, List[int]] = {}
+    names: Dict[str, str] = {}
+    for row, meta in enumerate(metadatas):
+        for kind in ("source", "section"):
+            value = meta.get(kind)
+            if not value:
+                continue
+            key = namespace_key(kind, value)
+            ids.setdefault(key, []).append(row)
+            names.setdefault(key, value)
+    return {"ids": ids, "names": names, "version": NAMESPACES_VERSION}
+
+
+def save_namespaces(namespaces: Dict[str, Any], db_path: str) -> None:
+    with open(os.path.join(db_path, NAMESPACES_FILE), "w", encoding="utf-8") as f:
+        json.dump(namespaces, f)
+
+
+def load_namespaces(db_path: str) -> Dict[str, Any]:
+    path = os.path.join(db_path, NAMESPACES_FILE)
+    if not os.path.exists(path):
+        return {"ids": {}, "names": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_namespaces(namespaces: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    out: Dict[str, List[Dict[str, Any]]] = {"sources": [], "sections": []}
+    for key, rows in namespaces["ids"].items():
+        kind = key.split(":", 1)[0]
+        out[kind + "s"].append({"name": namespaces["names"][key], "chunks": len(rows)})
+    return out
+
+
+def resolve_ids(
+    namespaces: Dict[str, Any], section: Optional[str] = None, source: Optional[str] = None
+) -> Optional[List[int]]:
+    """Row ids matching all given filters; None when unfiltered, [] when nothing matches."""
+    selected = None
+    for kind, value in (("section", section), ("source", source)):
+        if not value:
+            continue
+        rows = set(namespaces["ids"].get(namespace_key(kind, value), ()))
+        selected = rows if selected is None else selected & rows
+    return None if selected is None else sorted(selected)
+
+
+def search_ids(db, query_vector: List[float], ids: List[int], k: int) -> List[Any]:
+    """Top-k LangChain Documents among FAISS rows ``ids`` only."""
+    return [doc for doc, _ in search_ids_with_score(db, query_vector, ids, k)]
+
+
+def search_ids_with_score(db, query_vector: List[float], ids: List[int], k: int) -> List[Tuple[Any, float]]:
+    """Like search_ids, with each Document's squared L2 distance (lower is closer)."""
+    if not ids:
+        return []
+    import faiss
+
+    vector = np.asarray([query_vector], dtype=np.float32)
+    k = min(k, len(ids))
+    try:
+        id_array = np.asarray(ids, dtype=np.int64)
+        selector = faiss.IDSelectorBatch(len(id_array), faiss.swig_ptr(id_array))
+        params = faiss.SearchParameters(sel=selector)
+        distances, rows = db.index.search(vector, k, params=params)
+        hits = [(int(r), float(d)) for r, d in zip(rows[0], distances[0]) if r >= 0]
+    except (AttributeError, TypeError):
+        # Older faiss without search parameters: score the namespace rows directly
+        sub = np.vstack([db.index.reconstruct(int(i)) for i in ids])
+        distances = ((sub - vector) ** 2).sum(axis=1)
+        hits = [(ids[j], float(distances[j])) for j in np.argsort(distances)[:k]]
+    return [(db.docstore.search(db.index_to_docstore_id[r]), d) for r, d in hits]
@@ -1,29 +1,151 @@
 import os
-from app.models.embeddings import save_vector_db, load_vector_db
+from typing import Any, Dict, List, Optional
+from app.config import get_config, get_config_service
+from app.models.embeddings import get_embedding_model, save_vector_db, load_vector_db
+from app.rag.namespaces import (
+    NAMESPACES_FILE,
+    NAMESPACES_VERSION,
+    build_namespaces,
+    chunk_policy,
+    list_namespaces,
+    load_namespaces,
+    resolve_ids,
+    save_namespaces,
+    search_ids_with_score,
+)
 
 DATA_PATH = "data/airlines_policy.md"
 DB_PATH = "data/embeddings/faiss_index"
+COMPACT_DB_PATH = f"{DB_PATH}_compact"
+
+_compact_index = None
+_db = None
+_namespaces = None
+
+
+def _on_config(new, old):
+    """Drop cached indexes when the retriever configuration changes"""
+    global _db, _compact_index
+    if new.changed(old, "embedding_backend"):
+        _db = None  # holds the previous backend's embedding function
+    if new.changed(old, "embedding_backend", "compact_embeddings"):
+        _compact_index = None
+
+
+get_config_service().subscribe(_on_config)
+
+
+def policy_paths() -> List[str]:
+    """Policy corpora to index: POLICY_PATHS (comma-separated) or DATA_PATH"""
+    paths = os.getenv("POLICY_PATHS", "")
+    return [p.strip() for p in paths.split(",") if p.strip()] or [DATA_PATH]
 
 
 def build_vector_db():
-    """Build FAISS DB from airline policy file"""
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f" Policy file not found at {DATA_PATH}")
+    """Build FAISS DB from the policy files, with source/section metadata per chunk"""
+    global _db, _namespaces, _compact_index
+    chunks, metadatas = [], []
+    for path in policy_paths():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f" Policy file not found at {path}")
 
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        policy_text = f.read()
+        with open(path, "r", encoding="utf-8") as f:
+            policy_text = f.read()
 
-    chunks = policy_text.split("\n\n")  # simple chunking
-    save_vector_db(chunks, db_path=DB_PATH)
+        source = os.path.splitext(os.path.basename(path))[0]
+        file_chunks, file_metadatas = chunk_policy(policy_text, source)
+        chunks += file_chunks
+        metadatas += file_metadatas
+
+    save_vector_db(chunks, db_path=DB_PATH, metadatas=metadatas)
+    save_namespaces(build_namespaces(metadatas), DB_PATH)
+    _db = _namespaces = _compact_index = None
     print(f" FAISS DB built at {DB_PATH}")
 
 
-def retrieve_context(query: str, k: int = 3) -> str:
-    """Retrieve context from FAISS DB, auto-build if missing"""
+def _load():
+    """Loaded index and namespace map, cached for the life of the process"""
+    global _db, _namespaces
     if not os.path.exists(DB_PATH):
         print(" No FAISS index found. Building one...")
         build_vector_db()
+    elif not os.path.exists(os.path.join(DB_PATH, NAMESPACES_FILE)):
+        print(" FAISS index has no section metadata. Rebuilding...")
+        build_vector_db()
+    if _db is None:
+        if load_namespaces(DB_PATH).get("version") != NAMESPACES_VERSION:
+            print(" FAISS index has outdated section metadata. Rebuilding...")
+            build_vector_db()
+        _db = load_vector_db(DB_PATH)
+        _namespaces = load_namespaces(DB_PATH)
+    return _db, _namespaces
+
+
+def retrieve_documents(
+    query: str, k: int = 3, section: Optional[str] = None, source: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Retrieve policy chunks with metadata, best match first; auto-build if missing.
+
+    ``section`` (a ``##`` heading) and ``source`` (policy file name without
+    extension) restrict the search to that namespace's rows only. Each chunk
+    carries ``score``, its cosine similarity to the query.
+    """
+    db, namespaces = _load()
+    ids = resolve_ids(namespaces, section, source)
 
-    db = load_vector_db(DB_PATH)
-    docs = db.similarity_search(query, k=k)
-    return "\n".join([doc.page_content for doc in docs])
+    if get_config().compact_embeddings != "off" and os.path.exists(COMPACT_DB_PATH):
+        return _retrieve_compact(db, query, k, ids)
+
+    if ids is None:
+        hits = db.similarity_search_with_score(query, k=k)
+    else:
+        hits = search_ids_with_score(db, get_embedding_model().embed_query(query), ids, k)
+    return [
+        {"content": doc.page_content, **doc.metadata, "score": distance_to_similarity(distance)}
+        for doc, distance in hits
+    ]
+
+
+def distance_to_similarity(distance: float) -> float:
+    """Cosine similarity from a FAISS squared L2 distance (vectors are normalized)."""
+    return round(1.0 - float(distance) / 2.0, 4)
+
+
+def retrieve_chunks(
+    query: str, k: int = 3, section: Optional[str] = None, source: Optional[str] = None
+) -> List[str]:
+    """Retrieve policy chunks from FAISS DB, best match first; auto-build if missing"""
+    return [doc["content"] for doc in retrieve_documents(query, k, section, source)]
+
+
+def _retrieve_compact(db, query: str, k: int, ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Two-stage search: compact-code prefilter, float rescoring of the shortlist"""
+    global _compact_index
+    from app.rag.compact_index import CompactIndex
+
+    if _compact_index is None:
+        _compact_index = CompactIndex.load(COMPACT_DB_PATH)
+    vector = get_embedding_model().embed_query(query)
+    rescore = get_config().compact_rescore
+    hits = _compact_index.search(vector, k=k, rescore=rescore, ids=ids)
+    # Compact rows are stored in FAISS row order
+    return [
+        {
+            "content": _compact_index.texts[i],
+            **db.docstore.search(db.index_to_docstore_id[i]).metadata,
+            "score": round(score, 4),
+        }
+        for i, score in hits
+    ]
+
+
+def available_namespaces() -> Dict[str, List[Dict[str, Any]]]:
+    """Sources and sections that can be used as search filters"""
+    return list_namespaces(_load()[1])
+
+
+def retrieve_context(
+    query: str, k: int = 3, section: Optional[str] = None, source: Optional[str] = None
+) -> str:
+    """Retrieve context from FAISS DB, auto-build if missing"""
+    return "\n".join(retrieve_chunks(query, k, section, source))
@@ -0,0 +1,224 @@
+"""Structured action log (JSONL) with rotation, tail reading and incremental reads.
+
+- log_action() appends one JSON object per line to app/logs/actions.log
+- the file rotates at LOG_MAX_BYTES; rotated files are gzip-compressed
+  (actions.log.1.gz ... actions.log.N.gz, N = LOG_BACKUP_COUNT)
+- API and job worker processes share the file: writes and rotation hold an
+  flock on actions.log.lock, and a process reopens the file when another
+  one rotated it away
+- tail_lines() reads fixed-size blocks backwards from the end, so the cost
+  depends on the lines returned, not on the file size
+- read_new_lines() returns lines appended after a byte offset and survives
+  rotation (used by the /logs/stream SSE endpoint)
+"""
+
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    # Soft dependency: POSIX only; without it rotation is only safe in one process
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+    _HAS_FCNTL = False
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+LOG_FILE = PROJECT_ROOT / "app" / "logs" / "actions.log"
+
+_BLOCK_SIZE = 8192
+
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler for a file appended to by several processes.
+
+    Each emit (size check, rollover, write) runs under an exclusive flock on
+    ``<file>.lock``. Before writing, the stream is reopened if the file it
+    points to was rotated by another process, as WatchedFileHandler does.
+    """
+
+    def __init__(self, filename, *args: Any, **kwargs: Any):
+        self._ident: Optional[Tuple[int, int]] = None
+        super().__init__(filename, *args, **kwargs)
+        self._lock_file = open(str(filename) + ".lock", "a") if _HAS_FCNTL else None
+
+    def _open(self):
+        stream = super()._open()
+        st = os.fstat(stream.fileno())
+        self._ident = (st.st_dev, st.st_ino)
+        return stream
+
+    def _reopen_if_rotated(self) -> None:
+        if self.stream is None:
+            return
+        try:
+            st = os.stat(self.baseFilename)
+            current = (st.st_dev, st.st_ino)
+        except FileNotFoundError:
+            current = None
+        if current != self._ident:
+            # FileHandler.emit opens the new file when the stream is None
+            self.stream.close()
+            self.stream = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._lock_file is None:
+            super().emit(record)
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def get_action_logger() -> logging.Logger:
+    """Logger writing JSON lines to LOG_FILE with size-based, gzip-compressed rotation."""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            handler = SharedRotatingFileHandler(
+                LOG_FILE,
+                maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+                backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+                encoding="utf-8",
+            )
+            handler.namer = _gzip_namer
+            handler.rotator = _gzip_rotator
+            handler.setFormatter(JsonLineFormatter())
+            logger = logging.getLogger("email_rag_agent.actions")
+            logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+            logger.addHandler(handler)
+            logger.propagate = False
+            _logger = logger
+        return _logger
+
+
+def log_action(event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """Append ``{"ts", "level", "event", **fields}`` to the action log."""
+    get_action_logger().log(level, event, extra={"fields": fields})
+
+
+def tail_lines(path: Path = LOG_FILE, max_lines: int = 200, block_size: int = _BLOCK_SIZE) -> List[str]:
+    """Last ``max_lines`` lines of a file, reading blocks backwards from the end."""
+    if max_lines <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunks: List[bytes] = []
+        newlines = 0
+        # One extra newline: the first line found may be partial
+        while pos > 0 and newlines <= max_lines:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    data = b"".join(reversed(chunks))
+    lines = data.decode("utf-8", errors="ignore").splitlines()
+    return lines[-max_lines:]
+
+
+def end_offset(path: Path = LOG_FILE) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def file_identity(path: Path = LOG_FILE) -> Optional[Tuple[int, bytes]]:
+    """(inode, first bytes) of the file; changes when the log is rotated.
+
+    The gzip rotator deletes the old file right away, so the new file often
+    reuses its inode; the leading bytes (first timestamp) tell them apart.
+    """
+    try:
+        with open(path, "rb") as f:
+            return os.fstat(f.fileno()).st_ino, f.read(64)
+    except FileNotFoundError:
+        return None
+
+
+def read_new_lines(
+    path: Path, offset: int, ident: Optional[Tuple[int, bytes]]
+) -> Tuple[List[str], int, Optional[Tuple[int, bytes]]]:
+    """Complete lines appended since ``offset``; returns (lines, new offset, identity).
+
+    If the file was rotated (identity changed or file shrunk), reading restarts
+    at 0. A trailing partial line is left for the next call.
+    """
+    current = file_identity(path)
+    if current is None:
+        return [], 0, None
+    size = path.stat().st_size
+    if ident is not None and ident[1]:
+        if current[0] != ident[0] or not current[1].startswith(ident[1]) or size < offset:
+            offset = 0
+    elif size < offset:
+        offset = 0
+    if size == offset:
+        return [], offset, current
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    complete = data.rfind(b"\n") + 1
+    lines = data[:complete].decode("utf-8", errors="ignore").splitlines()
+    return lines, offset + complete, current
+
+
+def parse_line(line: str) -> Dict[str, Any]:
+    """JSON entry for a log line; plain-text lines are wrapped as {"event": line}."""
+    try:
+        entry = json.loads(line)
+        if isinstance(entry, dict):
+            return entry
+    except ValueError:
+        pass
+    return {"event": line}
@@ -0,0 +1,494 @@
+"""Dashboard ``email_logs`` store: schema migrations, bulk loading and backfill.
+
+Migrations are numbered and tracked in ``PRAGMA user_version``, so
+``migrate()`` is cheap to call on every start and only runs what is missing.
+Migration 2 adds a typed timestamp (``ts``, epoch seconds) with indexes for
+the dashboard's time-ordered and escalation queries, and ``run_id`` with a
+unique index so loading the same run twice is a no-op. Migration 3 adds the
+escalation work queue (see escalations.py), migration 4 the live event relay
+for job worker processes (see live_events.py).
+
+    python -m app.services.email_logs migrate
+    python -m app.services.email_logs backfill          # runs/*.state.json + cold storage
+    python -m app.services.email_logs bench --rows 1000000
+"""
+
+import atexit
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DB_PATH = os.getenv("EMAIL_LOGS_DB", "data/sqlite.db3")
+
+BULK_BATCH = 50000
+FLUSH_ROWS = 200
+FLUSH_SECONDS = 2.0
+
+INSERT_COLUMNS = (
+    "original_sender", "subject", "email_content", "draft_reply", "final_reply",
+    "validation_is_valid", "validation_reason", "timestamp", "ts", "run_id", "email_id",
+    "prompt_tokens", "completion_tokens",
+)
+
+_row_values = itemgetter(*INSERT_COLUMNS)
+
+DEFAULT_SETTINGS = {
+    "llm_provider": "OpenAI GPT-4o",
+    "vector_db": "ChromaDB",
+    "polling_interval": "60",  # Stored as text, converted to int in UI
+    "notifications": "True",   # Boolean as text
+    "auto_reply": "False",     # Boolean as text
+}
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _iso_to_epoch(value: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value).timestamp() if value else None
+    except ValueError:
+        return None
+
+
+def _m1_base_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS email_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            original_sender TEXT,
+            subject TEXT,
+            email_content TEXT,
+            draft_reply TEXT,
+            final_reply TEXT,
+            validation_is_valid BOOLEAN,
+            validation_reason TEXT,
+            timestamp TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT OR IGNORE INTO app_settings (key, value) VALUES (?, ?)", DEFAULT_SETTINGS.items()
+    )
+
+
+def _m2_typed_timestamps_and_indexes(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(email_logs)")}
+    for column, decl in (("ts", "REAL"), ("run_id", "TEXT"), ("email_id", "TEXT")):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE email_logs ADD COLUMN {column} {decl}")
+    # Parse in Python: timestamps are local-time ISO strings, SQLite would read them as UTC
+    rows = conn.execute("SELECT id, timestamp FROM email_logs WHERE ts IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE email_logs SET ts = ? WHERE id = ?",
+        ((_iso_to_epoch(row[1]) or 0.0, row[0]) for row in rows),
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_email_logs_ts ON email_logs (ts)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_email_logs_valid_ts ON email_logs (validation_is_valid, ts)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_email_logs_run ON email_logs (run_id) WHERE run_id IS NOT NULL"
+    )
+
+
+def _m3_escalation_queue(conn: sqlite3.Connection) -> None:
+    from app.services import escalations
+
+    escalations.create_schema(conn)
+    escalations.enqueue_escalated_logs(conn)
+
+
+def _m4_live_event_relay(conn: sqlite3.Connection) -> None:
+    from app.services import live_events
+
+    live_events.create_relay_schema(conn)
+
+
+def _m5_app_settings_version(conn: sqlite3.Connection) -> None:
+    # Bumped by triggers on every app_settings write, from any process, so the
+    # config watcher can poll one row instead of the DB file's mtime
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_settings_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO app_settings_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS app_settings_after_{event.lower()}
+            AFTER {event} ON app_settings
+            BEGIN
+                UPDATE app_settings_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+
+def app_settings_version(conn: sqlite3.Connection) -> Optional[int]:
+    """Counter bumped on every app_settings change; None before migration 5."""
+    try:
+        row = conn.execute("SELECT version FROM app_settings_version WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _m6_token_usage(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(email_logs)")}
+    for column in ("prompt_tokens", "completion_tokens"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE email_logs ADD COLUMN {column} INTEGER")
+
+
+# (version, description, step); append only, never edit a released step
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "email_logs and app_settings tables", _m1_base_tables),
+    (2, "typed ts column, run_id/email_id, indexes", _m2_typed_timestamps_and_indexes),
+    (3, "escalation queue", _m3_escalation_queue),
+    (4, "live event relay", _m4_live_event_relay),
+    (5, "app_settings version counter", _m5_app_settings_version),
+    (6, "per-run prompt/completion token counts", _m6_token_usage),
+]
+
+_migrated: Dict[str, int] = {}
+_migrate_lock = threading.Lock()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path: Optional[str] = None) -> int:
+    """Apply pending migrations, each in its own transaction; returns the schema version."""
+    path = path or DB_PATH
+    with _migrate_lock:
+        if path in _migrated:
+            return _migrated[path]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for version, description, step in MIGRATIONS:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Re-check inside the write lock: another process may have migrated
+                    if schema_version(conn) >= version:
+                        conn.execute("ROLLBACK")
+                        continue
+                    step(conn)
+                    conn.execute(f"PRAGMA user_version = {version}")
+                    conn.execute("COMMIT")
+                    print(f" email_logs schema -> v{version}: {description}")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            _migrated[path] = schema_version(conn)
+            return _migrated[path]
+        finally:
+            conn.close()
+
+
+def seed_sample_data(path: Optional[str] = None) -> int:
+    """Insert the demo rows, only into an empty table."""
+    conn = connect(path)
+    try:
+        if conn.execute("SELECT 1 FROM email_logs LIMIT 1").fetchone():
+            return 0
+    finally:
+        conn.close()
+    now = datetime.now()
+    samples = [
+        ("john@example.com", "Project Update", "Hi, can you provide an update on the project status?", "Thanks for reaching out. The project is on track and we expect completion by Friday.", 1, "Valid response", now - timedelta(days=2)),
+        ("sarah@company.com", "Meeting Request", "Would you be available for a meeting next week?", "I'm available Tuesday and Wednesday next week. Please let me know what works best.", 1, "Valid response", now - timedelta(days=1)),
+        ("client@business.com", "Invoice Question", "I have questions about the recent invoice.", "This requires detailed financial information that I cannot provide.", 0, "Escalated - financial inquiry", now),
+        ("support@vendor.com", "Technical Issue", "We're experiencing issues with the API integration.", "Let me connect you with our technical team for assistance.", 0, "Escalated - technical issue", now),
+        ("mary@client.com", "Thank You", "Thank you for the quick response on our request!", "You're welcome! Please don't hesitate to reach out if you need anything else.", 1, "Valid response", now - timedelta(hours=6)),
+    ]
+    rows = [
+        {
+            "original_sender": sender, "subject": subject, "email_content": content,
+            "draft_reply": reply, "final_reply": reply, "validation_is_valid": valid,
+            "validation_reason": reason, "timestamp": when.isoformat(), "ts": when.timestamp(),
+        }
+        for sender, subject, content, reply, valid, reason, when in samples
+    ]
+    added = bulk_insert(rows, path=path)
+    print(f"Added {added} sample email logs")
+    return added
+
+
+# sent -> answered, ignored -> neither answered nor awaiting review, else escalated
+_VALID_BY_STATUS = {"sent": 1, "ignored": None}
+
+
+def state_to_log_row(state: Dict[str, Any]) -> Dict[str, Any]:
+    """email_logs row for a finished agent run state."""
+    stamps = [entry.get("timestamp", 0) for entry in state.get("log", []) if entry.get("timestamp")]
+    ts = max(stamps) if stamps else time.time()
+    validation = state.get("validation_result") or {}
+    usage = state.get("token_usage") or {}
+    return {
+        "original_sender": state.get("sender") or state.get("from") or "",
+        "subject": state.get("subject") or "",
+        "email_content": state.get("email_content") or "",
+        "draft_reply": state.get("draft_reply") or "",
+        "final_reply": state.get("final_reply") or state.get("draft_reply") or "",
+        "validation_is_valid": _VALID_BY_STATUS.get(state.get("status"), 0),
+        "validation_reason": validation.get("reason") or state.get("status") or "",
+        "timestamp": datetime.fromtimestamp(ts).isoformat(),
+        "ts": ts,
+        "run_id": state.get("run_id"),
+        "email_id": state.get("email_id"),
+        "prompt_tokens": usage.get("prompt"),
+        "completion_tokens": usage.get("completion"),
+    }
+
+
+def thread_run_id(account_id: str, thread_id: str, message_ids: Iterable[str]) -> str:
+    """Stable run_id of a Gmail thread run, so a retried job maps to the same row."""
+    return f"gmail:{account_id}:{thread_id}:{','.join(sorted(message_ids))}"
+
+
+def thread_to_log_row(
+    result: Dict[str, Any], account_id: str, sender: str, subject: str, content: str, reply: str = ""
+) -> Dict[str, Any]:
+    """email_logs row for a Gmail thread handled by gmail_utils.process_thread."""
+    ts = time.time()
+    status = result["status"]
+    usage = result.get("token_usage") or {}
+    return {
+        "original_sender": sender,
+        "subject": subject,
+        "email_content": content,
+        "draft_reply": reply,
+        "final_reply": reply,
+        "validation_is_valid": _VALID_BY_STATUS.get(status, 0),
+        "validation_reason": result.get("reason") or status,
+        "timestamp": datetime.fromtimestamp(ts).isoformat(),
+        "ts": ts,
+        "run_id": thread_run_id(account_id, result["thread_id"], result["message_ids"]),
+        "email_id": result["message_ids"][-1],
+        "prompt_tokens": usage.get("prompt"),
+        "completion_tokens": usage.get("completion"),
+    }
+
+
+def _values(row: Dict[str, Any]) -> Tuple[Any, ...]:
+    try:
+        return _row_values(row)  # C-level fast path for complete rows
+    except KeyError:
+        return tuple(row.get(column) for column in INSERT_COLUMNS)
+
+
+def bulk_insert(
+    rows: Iterable[Dict[str, Any]], batch_size: int = BULK_BATCH, path: Optional[str] = None
+) -> int:
+    """Insert rows with executemany, ``batch_size`` rows per transaction.
+
+    Rows whose run_id is already present are skipped, so re-loading is
+    idempotent. Returns the number of rows actually inserted.
+    """
+    migrate(path)
+    sql = (
+        f"INSERT OR IGNORE INTO email_logs ({', '.join(INSERT_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})"
+    )
+    conn = sqlite3.connect(path or DB_PATH, timeout=30, isolation_level=None)
+    inserted = 0
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable at checkpoints, no fsync per transaction
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MiB for index pages during large loads
+        batch: List[Tuple[Any, ...]] = []
+
+        from app.services import escalations, live_events
+
+        live = (path or DB_PATH) == DB_PATH
+
+        def flush() -> int:
+            conn.execute("BEGIN")
+            try:
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM email_logs").fetchone()[0]
+                before = conn.total_changes
+                conn.executemany(sql, batch)
+                added = conn.total_changes - before
+                # Escalated rows enter the work queue in the same transaction
+                escalations.enqueue_escalated_logs(conn, last_id)
+                # New rows only (rowid range), for the live dashboard totals
+                groups = conn.execute(
+                    "SELECT substr(timestamp, 1, 10), validation_is_valid, COUNT(*) "
+                    "FROM email_logs WHERE id > ? GROUP BY 1, 2",
+                    (last_id,),
+                ).fetchall() if added and live else []
+                # Worker processes hand the delta to the API process atomically with the rows
+                live_events.relay_rows(conn, groups)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            batch.clear()
+            live_events.counters.add_rows(groups)
+            return added
+
+        for row in rows:
+            batch.append(_values(row))
+            if len(batch) >= batch_size:
+                inserted += flush()
+        if batch:
+            inserted += flush()
+    finally:
+        conn.close()
+    return inserted
+
+
+def _iter_run_states(runs_dir: str, include_cold: bool) -> Iterator[Dict[str, Any]]:
+    for file_path in glob.glob(os.path.join(runs_dir, "*.state.json")):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            continue
+    if include_cold:
+        from app.services import retention
+
+        for key in retention.item_keys("state"):
+            state = retention.get_item("state", key)
+            if state is not None:
+                yield state
+
+
+def backfill_from_runs(runs_dir: Optional[str] = None, include_cold: bool = True) -> Dict[str, int]:
+    """Load every finished run into email_logs; safe to re-run (keyed on run_id)."""
+    from app.services import persistence
+    from app.services.run_archive import TERMINAL_STATUSES
+
+    seen = 0
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        nonlocal seen
+        for state in _iter_run_states(runs_dir or persistence.RUNS_DIR, include_cold):
+            if state.get("status") in TERMINAL_STATUSES and state.get("run_id"):
+                seen += 1
+                yield state_to_log_row(state)
+
+    inserted = bulk_insert(rows())
+    return {"runs": seen, "inserted": inserted, "skipped": seen - inserted}
+
+
+class _BufferedWriter:
+    """Collects finished runs and writes them in one transaction per flush."""
+
+    def __init__(self, max_rows: int = FLUSH_ROWS, max_delay: float = FLUSH_SECONDS):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_rows
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        try:
+            return bulk_insert(rows)
+        except sqlite3.Error as e:
+            print(f" email_logs write failed ({len(rows)} rows): {e}")
+            return 0
+
+
+_writer = _BufferedWriter()
+atexit.register(_writer.flush)
+
+
+def record_run(state: Dict[str, Any]) -> None:
+    """Queue a finished run for the next batched write to email_logs."""
+    _writer.add(state_to_log_row(state))
+
+
+def record_thread(
+    result: Dict[str, Any], account_id: str, sender: str, subject: str, content: str, reply: str = ""
+) -> None:
+    """Queue a handled Gmail thread (sent / escalated / ignored) for the next batched write."""
+    _writer.add(thread_to_log_row(result, account_id, sender, subject, content, reply))
+
+
+def flush() -> int:
+    return _writer.flush()
+
+
+def _synthetic_rows(n: int) -> Iterator[Dict[str, Any]]:
+    start = time.time() - n
+    for i in range(n):
+        ts = start + i
+        yield {
+            "original_sender": f"user{i % 5000}@example.com",
+            "subject": f"Question {i}",
+            "email_content": "Hello, I would like to know the baggage allowance for my flight. " * 3,
+            "draft_reply": "Economy passengers may check one bag up to 23 kg.",
+            "final_reply": "Economy passengers may check one bag up to 23 kg.",
+            "validation_is_valid": int(i % 7 != 0),
+            "validation_reason": "ok" if i % 7 else "escalated",
+            "timestamp": datetime.fromtimestamp(ts).isoformat(),
+            "ts": ts,
+            "run_id": f"bench-{i}",
+            "email_id": f"msg-{i}",
+            "prompt_tokens": 900,
+            "completion_tokens": 60,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="email_logs schema and bulk loading")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("migrate")
+    b = sub.add_parser("backfill")
+    b.add_argument("--runs-dir", default=None)
+    b.add_argument("--no-cold", action="store_true", help="skip runs in cold storage")
+    bench = sub.add_parser("bench")
+    bench.add_argument("--rows", type=int, default=1_000_000)
+    bench.add_argument("--db", default="data/bench_email_logs.db3")
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        print(f" email_logs schema at v{migrate()}")
+    elif args.cmd == "backfill":
+        print(json.dumps(backfill_from_runs(args.runs_dir, not args.no_cold)))
+    else:
+        if os.path.exists(args.db):
+            os.remove(args.db)
+        t0 = time.perf_counter()
+        n = bulk_insert(_synthetic_rows(args.rows), path=args.db)
+        elapsed = time.perf_counter() - t0
+        print(json.dumps({"rows": n, "seconds": round(elapsed, 2), "rows_per_sec": int(n / elapsed)}))
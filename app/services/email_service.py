@@ -1,4 +1,24 @@
-from app.gmail.gmail_utils import process_unread_emails, send_email
+import time
+from typing import Any, Dict, List
+
+from app.gmail.auth_gmail import authenticate_gmail
+from app.gmail.accounts import DEFAULT_ACCOUNT
+from app.gmail.gmail_utils import (
+    group_by_thread,
+    list_unread_messages,
+    process_thread,
+    process_unread_emails,
+    send_email,
+)
+from app.services import email_logs, escalations, job_queue, live_events, retention
+from app.services.thread_runs import get_thread_runs
+from app.services.action_log import log_action
+from app.config import get_config, get_config_service
+
+PROCESS_MESSAGE_JOB = "process_message"
+
+_pool = None
+
 
 def fetch_and_reply_emails(max_results: int = 5):
     """Reusable service for fetching unread emails and replying"""
@@ -7,3 +27,153 @@ def fetch_and_reply_emails(max_results: int = 5):
 def send_manual_email(to: str, subject: str, body: str):
     """Reusable service for sending manual emails"""
     return send_email(to, subject, body)
+
+
+def _handle_process_message(payload: Dict[str, Any], job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: process the unread messages of one Gmail thread.
+
+    If a run for the thread is already in flight in this process, the job's
+    messages are handed to it and the job waits for that run instead of
+    drafting a second reply. Transient LLM errors (timeouts, rate limits, 5xx)
+    are retried before falling back; any other error falls back at once, since
+    a retry would fail the same way.
+    """
+    account_id = payload.get("account_id", DEFAULT_ACCOUNT)
+    msg_ids = payload.get("message_ids") or [payload["message_id"]]
+    thread_id = payload.get("thread_id") or msg_ids[0]
+
+    runs = get_thread_runs()
+    run, is_owner = runs.begin((account_id, thread_id), msg_ids, job["id"])
+    if not is_owner:
+        # The job's lease is kept alive meanwhile; a retry skips messages already read.
+        # Wait at most one visibility timeout so a stuck owner cannot hold this
+        # worker forever: TimeoutError is transient, so the job is requeued
+        wait = get_config().job_visibility_timeout
+        if not run.done.wait(wait):
+            raise TimeoutError(f"Thread run of job {run.owner} still in flight after {wait:g}s")
+        if run.error is not None:
+            raise run.error
+        return {"thread_id": thread_id, "message_ids": msg_ids, "status": "absorbed", "owner_job": run.owner}
+
+    service = authenticate_gmail(account_id)
+    last_attempt = job["attempts"] >= job["max_attempts"]
+
+    def fallback_on_error(e: Exception) -> bool:
+        return last_attempt or not job_queue.is_transient(e)
+
+    results = []
+    run_event = {"run_id": f"gmail:{account_id}:{thread_id}", "thread_id": thread_id, "email_id": msg_ids[-1]}
+    live_events.publish("run_started", {**run_event, "timestamp": time.time()})
+    try:
+        batch = runs.drain(run)
+        while batch:
+            results.append(process_thread(
+                service,
+                thread_id,
+                batch,
+                fallback_on_error=fallback_on_error,
+                account_id=account_id,
+                absorb=lambda: runs.drain(run),
+            ))
+            # Arrivals after the draft was sent get one more pass
+            batch = runs.drain_or_finish(run)
+    except Exception as e:
+        runs.finish(run, e)
+        live_events.publish("run_finished", {
+            **run_event, "status": "failed", "reason": f"{type(e).__name__}: {e}", "timestamp": time.time(),
+        })
+        log_action("thread_failed", account_id=account_id, thread_id=thread_id,
+                   job_id=job["id"], attempt=job["attempts"], error=f"{type(e).__name__}: {e}")
+        raise
+    for result in results:
+        log_action(f"thread_{result['status']}", account_id=account_id, job_id=job["id"], **result)
+        live_events.publish("run_finished", {
+            **run_event,
+            "email_id": result["message_ids"][-1],
+            "status": result["status"],
+            "reason": result.get("reason"),
+            "timestamp": time.time(),
+        })
+        if result["status"] == "escalated":
+            # Left unread in Gmail; the queue makes sure an operator picks it up
+            # (same key as its email_logs row, which links to the item when written)
+            ids = result.get("message_ids") or msg_ids
+            run_id = email_logs.thread_run_id(account_id, result["thread_id"], ids)
+            escalations.enqueue(
+                f"run:{run_id}",
+                reason=result.get("reason", ""),
+                run_id=run_id,
+                email_id=ids[-1],
+            )
+    return results[0] if len(results) == 1 else {"thread_id": thread_id, "runs": results}
+
+
+job_queue.register_handler(PROCESS_MESSAGE_JOB, _handle_process_message)
+
+
+def ensure_workers() -> None:
+    """Start the in-process worker pool once (no-op if already running)"""
+    global _pool
+    if _pool is None or not _pool.running:
+        cfg = get_config()
+        _pool = job_queue.WorkerPool(cfg.job_workers, cfg.job_visibility_timeout).start()
+        # Retention runs beside the workers and yields to them when jobs are waiting
+        retention.start_compactor()
+
+
+def _reconfigure_workers(new, old) -> None:
+    """Apply worker count / lease changes to the running pool without a restart"""
+    if _pool is None or not _pool.running:
+        return
+    if new.changed(old, "job_visibility_timeout"):
+        _pool.visibility_timeout = new.settings.job_visibility_timeout
+    if new.changed(old, "job_workers"):
+        _pool.resize(new.settings.job_workers)
+        print(f" Worker pool resized to {new.settings.job_workers} (config v{new.version})")
+
+
+get_config_service().subscribe(_reconfigure_workers)
+
+
+def enqueue_thread(
+    thread_id: str, message_ids: List[str], account_id: str = DEFAULT_ACCOUNT
+) -> Dict[str, Any]:
+    """Enqueue one job for the unread messages of a thread; idempotent on (account, message ids)"""
+    key = ",".join(sorted(message_ids))
+    return job_queue.enqueue(
+        PROCESS_MESSAGE_JOB,
+        {"thread_id": thread_id, "message_ids": list(message_ids), "account_id": account_id},
+        idempotency_key=f"gmail:{account_id}:{key}",
+        max_attempts=get_config().job_max_attempts,
+    )
+
+
+def enqueue_message(
+    message_id: str, thread_id: str = None, account_id: str = DEFAULT_ACCOUNT
+) -> Dict[str, Any]:
+    """Enqueue one Gmail message; idempotent on (account, message id)"""
+    return enqueue_thread(thread_id or message_id, [message_id], account_id)
+
+
+def enqueue_messages(messages: List[Dict[str, Any]], account_id: str = DEFAULT_ACCOUNT) -> List[Dict[str, Any]]:
+    """Enqueue [{'id', 'threadId'}] as one job per thread; returns job summaries"""
+    jobs = []
+    for thread_id, msg_ids in group_by_thread(messages).items():
+        job = enqueue_thread(thread_id, msg_ids, account_id)
+        jobs.append({
+            "job_id": job["id"],
+            "thread_id": thread_id,
+            "message_ids": msg_ids,
+            "status": job["status"],
+        })
+    return jobs
+
+
+def enqueue_unread_emails(
+    max_results: int = 5, account_id: str = DEFAULT_ACCOUNT, start_workers: bool = True
+) -> List[Dict[str, Any]]:
+    """List unread messages and enqueue one job per thread; returns job summaries"""
+    if start_workers:
+        ensure_workers()
+    service = authenticate_gmail(account_id)
+    return enqueue_messages(list_unread_messages(service, max_results), account_id)
@@ -0,0 +1,369 @@
+"""Escalation work queue in the dashboard DB (table created by email_logs migration 3).
+
+Items are ordered by SLA deadline, then age: ``idx_escalations_queue`` on
+(status, sla_due_at, created_at) makes enqueue, claim and each page an index
+seek (O(log n)) however large the backlog. Operators claim an item with a
+lease; expired leases return the item to ``open``, so a crashed or absent
+operator never holds it forever, and two operators never hold the same one.
+
+Every escalated email_logs row is enqueued in the same transaction that
+inserts it (see email_logs.bulk_insert); Gmail-thread escalations without a
+log row are enqueued by the job handler.
+"""
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services import email_logs, live_events
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_LEASE_SECONDS = float(os.getenv("ESCALATION_LEASE_SECONDS", "900"))
+
+
+def _sla_hours() -> Dict[str, float]:
+    """ESCALATION_SLA_HOURS="high=1,normal=4,low=24" -> hours per priority."""
+    hours = {"high": 1.0, "normal": 4.0, "low": 24.0}
+    for part in os.getenv("ESCALATION_SLA_HOURS", "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in hours and value.strip():
+            hours[name.strip()] = float(value)
+    return hours
+
+
+SLA_HOURS = _sla_hours()
+
+_COLUMNS = (
+    "id, source_key, log_id, run_id, email_id, reason, priority, created_at, sla_due_at, "
+    "status, claimed_by, lease_expires_at, resolved_at, resolved_by, resolution"
+)
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS escalations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_key TEXT NOT NULL UNIQUE,
+            log_id INTEGER,
+            run_id TEXT,
+            email_id TEXT,
+            reason TEXT,
+            priority INTEGER NOT NULL DEFAULT 1,
+            created_at REAL NOT NULL,
+            sla_due_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'open',
+            claimed_by TEXT,
+            lease_expires_at REAL,
+            resolved_at REAL,
+            resolved_by TEXT,
+            resolution TEXT
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_escalations_queue ON escalations (status, sla_due_at, created_at)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_escalations_lease ON escalations (status, lease_expires_at)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_escalations_log ON escalations (log_id)")
+
+
+def enqueue_escalated_logs(conn: sqlite3.Connection, after_id: int = 0) -> int:
+    """Enqueue escalated email_logs rows with id > ``after_id`` (idempotent per row).
+
+    An item already enqueued under the row's ``run:<run_id>`` key (e.g. by the
+    Gmail job handler, before the batched log write) is linked to the row.
+    """
+    before = conn.total_changes
+    conn.execute(
+        """
+        INSERT INTO escalations
+            (source_key, log_id, run_id, email_id, reason, priority, created_at, sla_due_at)
+        SELECT COALESCE('run:' || run_id, 'log:' || id), id, run_id, email_id, validation_reason,
+               ?, COALESCE(ts, ?), COALESCE(ts, ?) + ?
+        FROM email_logs
+        WHERE id > ? AND validation_is_valid = 0
+        ON CONFLICT (source_key) DO UPDATE SET log_id = excluded.log_id
+        WHERE escalations.log_id IS NULL
+        """,
+        (PRIORITIES["normal"], time.time(), time.time(), SLA_HOURS["normal"] * 3600, after_id),
+    )
+    return conn.total_changes - before
+
+
+def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    item = dict(row)
+    item["priority"] = next((k for k, v in PRIORITIES.items() if v == item["priority"]), item["priority"])
+    return item
+
+
+def _connect() -> sqlite3.Connection:
+    email_logs.migrate()
+    conn = sqlite3.connect(email_logs.DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def enqueue(
+    source_key: str,
+    reason: str = "",
+    priority: str = "normal",
+    log_id: Optional[int] = None,
+    run_id: Optional[str] = None,
+    email_id: Optional[str] = None,
+    sla_seconds: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Add an item (or return the existing one for ``source_key``)."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    now = time.time()
+    sla = SLA_HOURS[priority] * 3600 if sla_seconds is None else sla_seconds
+    conn = _connect()
+    try:
+        added = conn.execute(
+            """
+            INSERT OR IGNORE INTO escalations
+                (source_key, log_id, run_id, email_id, reason, priority, created_at, sla_due_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (source_key, log_id, run_id, email_id, reason, PRIORITIES[priority], now, now + sla),
+        ).rowcount
+        item = _row(conn.execute(
+            f"SELECT {_COLUMNS} FROM escalations WHERE source_key = ?", (source_key,)
+        ).fetchone())
+    finally:
+        conn.close()
+    if added:
+        _publish(item["id"], "open")
+    return item
+
+
+def _publish(item_id: int, status: str, operator: Optional[str] = None) -> None:
+    live_events.publish("escalation", {"id": item_id, "status": status, "operator": operator})
+
+
+def _expire_leases(conn: sqlite3.Connection, now: float) -> None:
+    conn.execute(
+        "UPDATE escalations SET status = 'open', claimed_by = NULL, lease_expires_at = NULL "
+        "WHERE status = 'claimed' AND lease_expires_at < ?",
+        (now,),
+    )
+
+
+def claim(operator: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """Atomically lease the most urgent open item (earliest SLA, then oldest) to ``operator``."""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _expire_leases(conn, now)
+            row = conn.execute(
+                "SELECT id FROM escalations WHERE status = 'open' "
+                "ORDER BY sla_due_at, created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE escalations SET status = 'claimed', claimed_by = ?, lease_expires_at = ? WHERE id = ?",
+                (operator, now + lease_seconds, row["id"]),
+            )
+            item = conn.execute(f"SELECT {_COLUMNS} FROM escalations WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    _publish(item["id"], "claimed", operator)
+    return _row(item)
+
+
+def _holder_update(sql: str, params: Tuple[Any, ...], item_id: int, operator: str) -> bool:
+    """Run an update that only applies while ``operator`` holds a live lease."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            sql + " WHERE id = ? AND status = 'claimed' AND claimed_by = ? AND lease_expires_at >= ?",
+            params + (item_id, operator, time.time()),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def renew(item_id: int, operator: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+    return _holder_update(
+        "UPDATE escalations SET lease_expires_at = ?", (time.time() + lease_seconds,), item_id, operator
+    )
+
+
+def release(item_id: int, operator: str) -> bool:
+    """Give the item back to the queue unresolved."""
+    released = _holder_update(
+        "UPDATE escalations SET status = 'open', claimed_by = NULL, lease_expires_at = NULL",
+        (), item_id, operator,
+    )
+    if released:
+        _publish(item_id, "open", operator)
+    return released
+
+
+def resolve(item_id: int, operator: str, resolution: str = "Manually resolved") -> bool:
+    """Close an item. Open items can be resolved directly; claimed ones only by their holder.
+
+    The linked email_logs row is marked valid in the same transaction.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                """
+                UPDATE escalations
+                SET status = 'resolved', resolved_at = ?, resolved_by = ?, resolution = ?,
+                    claimed_by = NULL, lease_expires_at = NULL
+                WHERE id = ? AND (
+                    status = 'open'
+                    OR (status = 'claimed' AND (claimed_by = ? OR lease_expires_at < ?))
+                )
+                """,
+                (now, operator, resolution, item_id, operator, now),
+            )
+            resolved = cur.rowcount == 1
+            flipped = 0
+            if resolved:
+                flipped = conn.execute(
+                    "UPDATE email_logs SET validation_is_valid = 1, validation_reason = ? "
+                    "WHERE id = (SELECT log_id FROM escalations WHERE id = ?) AND validation_is_valid = 0",
+                    (resolution, item_id),
+                ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    if resolved:
+        _publish(item_id, "resolved", operator)
+    if flipped:
+        live_events.counters.resolved()
+    return resolved
+
+
+def resolve_log(log_id: int, operator: str, resolution: str) -> Optional[bool]:
+    """Resolve the queue item of an email_logs row (legacy resolve-by-log endpoints).
+
+    None if the row has no unresolved item, False if another operator holds it.
+    """
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT id FROM escalations WHERE log_id = ? AND status != 'resolved'", (log_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return resolve(row["id"], operator, resolution) if row else None
+
+
+def detach_logs(conn: sqlite3.Connection, log_ids: List[int], cutoff: float) -> List[int]:
+    """Unlink items from email_logs rows about to be deleted (run inside the caller's transaction).
+
+    Unresolved items are resolved by ``retention``, since their email is gone;
+    resolved items older than ``cutoff`` are deleted. Returns the ids resolved
+    here, for announce().
+    """
+    now = time.time()
+    marks = ", ".join("?" * len(log_ids))
+    expired = [
+        row[0] for row in conn.execute(
+            f"SELECT id FROM escalations WHERE log_id IN ({marks}) AND status != 'resolved'", log_ids
+        )
+    ] if log_ids else []
+    if log_ids:
+        conn.execute(
+            f"""
+            UPDATE escalations
+            SET status = 'resolved', resolved_at = ?, resolved_by = 'retention',
+                resolution = 'Email log pruned by retention', claimed_by = NULL, lease_expires_at = NULL
+            WHERE log_id IN ({marks}) AND status != 'resolved'
+            """,
+            [now] + log_ids,
+        )
+        conn.execute(f"UPDATE escalations SET log_id = NULL WHERE log_id IN ({marks})", log_ids)
+    conn.execute("DELETE FROM escalations WHERE status = 'resolved' AND resolved_at < ?", (cutoff,))
+    return expired
+
+
+def announce(item_ids: List[int], status: str, operator: Optional[str] = None) -> None:
+    """Publish status changes made outside this module (e.g. by retention)."""
+    for item_id in item_ids:
+        _publish(item_id, status, operator)
+
+
+def get(item_id: int) -> Optional[Dict[str, Any]]:
+    conn = _connect()
+    try:
+        return _row(conn.execute(f"SELECT {_COLUMNS} FROM escalations WHERE id = ?", (item_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def encode_cursor(item: Dict[str, Any]) -> str:
+    return f"{item['sla_due_at']!r}:{item['created_at']!r}:{item['id']}"
+
+
+def list_items(status: str = "open", limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One page in queue order; pass ``next_cursor`` back for the next page (keyset pagination)."""
+    params: List[Any] = [status]
+    sql = f"SELECT {_COLUMNS} FROM escalations WHERE status = ?"
+    if cursor:
+        try:
+            sla, created, last_id = cursor.split(":")
+            after = (float(sla), float(created), int(last_id))
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        sql += " AND (sla_due_at, created_at, id) > (?, ?, ?)"
+        params.extend(after)
+    sql += " ORDER BY sla_due_at, created_at, id LIMIT ?"
+    params.append(limit + 1)
+    conn = _connect()
+    try:
+        if status in ("open", "claimed"):
+            _expire_leases(conn, time.time())
+        rows = [_row(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+    page = rows[:limit]
+    return {
+        "items": page,
+        "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None,
+    }
+
+
+def stats() -> Dict[str, Any]:
+    now = time.time()
+    conn = _connect()
+    try:
+        counts = {
+            row["status"]: row["n"]
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM escalations GROUP BY status")
+        }
+        overdue = conn.execute(
+            "SELECT COUNT(*) FROM escalations WHERE status IN ('open', 'claimed') AND sla_due_at < ?", (now,)
+        ).fetchone()[0]
+        oldest = conn.execute(
+            "SELECT MIN(sla_due_at) FROM escalations WHERE status = 'open'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "counts": counts,
+        "overdue": overdue,
+        "next_due_in_seconds": round(oldest - now, 1) if oldest is not None else None,
+    }
@@ -0,0 +1,417 @@
+"""Durable SQLite-backed job queue with a worker pool.
+
+- enqueue(kind, payload, idempotency_key) is idempotent on the key (e.g. Gmail
+  message id): re-enqueueing returns the existing job.
+- Workers claim jobs under a visibility timeout (lease). A job whose lease
+  expires (worker crashed/hung) becomes claimable again.
+- Transient failures (Groq/Gmail rate limits, 5xx, network) are retried with
+  exponential backoff and jitter up to max_attempts; anything else fails the job.
+
+Run standalone workers with: python -m app.services.job_queue --workers 4
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/jobs.db3")
+
+_BACKOFF_BASE_SECONDS = 2.0
+_BACKOFF_MAX_SECONDS = 300.0
+
+Handler = Callable[[Dict[str, Any], Dict[str, Any]], Any]
+_HANDLERS: Dict[str, Handler] = {}
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(JOBS_DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_queue() -> None:
+    """Create the jobs table and indexes if missing."""
+    global _initialized
+    if _initialized:
+        return
+    conn = _connect()
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                lease_expires_at REAL,
+                worker_id TEXT,
+                last_error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, run_after)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, lease_expires_at)"
+        )
+        _initialized = True
+    finally:
+        conn.close()
+
+
+def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def enqueue(
+    kind: str,
+    payload: Dict[str, Any],
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = 5,
+) -> Dict[str, Any]:
+    """Add a job; returns the existing job if ``idempotency_key`` was seen before."""
+    init_queue()
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO jobs
+                (id, kind, payload, idempotency_key, status, attempts, max_attempts,
+                 run_after, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 'queued', 0, ?, ?, ?, ?)
+            """,
+            (uuid.uuid4().hex, kind, json.dumps(payload), idempotency_key,
+             max_attempts, now, now, now),
+        )
+        if idempotency_key is not None:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE rowid = last_insert_rowid()"
+            ).fetchone()
+        return _row_to_job(row)
+    finally:
+        conn.close()
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    init_queue()
+    conn = _connect()
+    try:
+        return _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def ready_count() -> int:
+    """Jobs waiting for a worker right now (queued and due); uses idx_jobs_ready."""
+    init_queue()
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND run_after <= ?", (time.time(),)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def claim(worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+    """Atomically lease the next ready job (or one whose lease expired)."""
+    init_queue()
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # Jobs whose worker died on the last allowed attempt are not retried
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'failed', last_error = 'lease expired',
+                lease_expires_at = NULL, updated_at = ?
+            WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts
+            """,
+            (now, now),
+        )
+        row = conn.execute(
+            """
+            SELECT id FROM jobs
+            WHERE (status = 'queued' AND run_after <= ?)
+               OR (status = 'running' AND lease_expires_at < ?)
+            ORDER BY run_after
+            LIMIT 1
+            """,
+            (now, now),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, worker_id = ?,
+                lease_expires_at = ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (worker_id, now + visibility_timeout, now, row["id"]),
+        )
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        conn.execute("COMMIT")
+        return _row_to_job(job)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def heartbeat(job_id: str, worker_id: str, visibility_timeout: float) -> bool:
+    """Extend the lease of a job this worker still owns."""
+    now = time.time()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+            WHERE id = ? AND worker_id = ? AND status = 'running'
+            """,
+            (now + visibility_timeout, now, job_id, worker_id),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def complete(job_id: str, worker_id: str, result: Any = None) -> None:
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'succeeded', result = ?, lease_expires_at = NULL,
+                last_error = NULL, updated_at = ?
+            WHERE id = ? AND worker_id = ?
+            """,
+            (json.dumps(result, default=str), now, job_id, worker_id),
+        )
+    finally:
+        conn.close()
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given attempt number (1-based)."""
+    cap = min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return random.uniform(cap / 2, cap)
+
+
+def fail(job_id: str, worker_id: str, error: str, transient: bool) -> str:
+    """Record a failure; requeue with backoff if transient and attempts remain.
+
+    Returns the new status ("queued" or "failed").
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ?",
+            (job_id, worker_id),
+        ).fetchone()
+        if row is None:
+            # Lease was lost to another worker; it owns the job now
+            conn.execute("COMMIT")
+            return "running"
+        if transient and row["attempts"] < row["max_attempts"]:
+            status, run_after = "queued", now + backoff_delay(row["attempts"])
+        else:
+            status, run_after = "failed", now
+        conn.execute(
+            """
+            UPDATE jobs SET status = ?, run_after = ?, last_error = ?,
+                lease_expires_at = NULL, updated_at = ?
+            WHERE id = ?
+            """,
+            (status, run_after, error[:2000], now, job_id),
+        )
+        conn.execute("COMMIT")
+        return status
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Classify errors worth retrying: rate limits, 5xx, timeouts, connection drops."""
+    if isinstance(exc, (ConnectionError, TimeoutError, socket.timeout)):
+        return True
+    try:
+        from googleapiclient.errors import HttpError
+
+        if isinstance(exc, HttpError):
+            return getattr(exc.resp, "status", 0) in (429, 500, 502, 503, 504)
+    except ImportError:  # pragma: no cover
+        pass
+    try:
+        import groq
+
+        transient_groq = (
+            groq.APIConnectionError,
+            groq.APITimeoutError,
+            groq.RateLimitError,
+            groq.InternalServerError,
+        )
+        if isinstance(exc, transient_groq):
+            return True
+    except (ImportError, AttributeError):  # pragma: no cover
+        pass
+    return False
+
+
+def register_handler(kind: str, handler: Handler) -> None:
+    """Register ``handler(payload, job)`` for jobs of ``kind``."""
+    _HANDLERS[kind] = handler
+
+
+def run_job(job: Dict[str, Any], worker_id: str, visibility_timeout: float) -> str:
+    """Execute one claimed job, keeping its lease alive while the handler runs."""
+    handler = _HANDLERS.get(job["kind"])
+    if handler is None:
+        return fail(job["id"], worker_id, f"No handler for kind={job['kind']}", transient=False)
+
+    stop = threading.Event()
+
+    def _keep_alive():
+        while not stop.wait(visibility_timeout / 3):
+            heartbeat(job["id"], worker_id, visibility_timeout)
+
+    beat = threading.Thread(target=_keep_alive, daemon=True)
+    beat.start()
+    try:
+        result = handler(job["payload"], job)
+    except Exception as e:
+        return fail(job["id"], worker_id, f"{type(e).__name__}: {e}", is_transient(e))
+    finally:
+        stop.set()
+    complete(job["id"], worker_id, result)
+    return "succeeded"
+
+
+class WorkerPool:
+    """Pool of worker threads polling the queue; resizable while running."""
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        visibility_timeout: float = 120.0,
+        poll_interval: float = 1.0,
+    ):
+        self.num_workers = num_workers
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self._workers: List[Tuple[threading.Thread, threading.Event]] = []
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def _worker(self, worker_id: str, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                job = claim(worker_id, self.visibility_timeout)
+            except sqlite3.OperationalError as e:
+                print(f" Job claim failed ({worker_id}): {e}")
+                job = None
+            if job is None:
+                stop.wait(self.poll_interval)
+                continue
+            # A worker asked to stop finishes its current job first
+            status = run_job(job, worker_id, self.visibility_timeout)
+            print(f" Job {job['id']} ({job['kind']}) -> {status}")
+
+    def _spawn(self) -> None:
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        stop = threading.Event()
+        t = threading.Thread(
+            target=self._worker, args=(f"{prefix}-{self._seq}", stop), daemon=True
+        )
+        self._seq += 1
+        t.start()
+        self._workers.append((t, stop))
+
+    def start(self) -> "WorkerPool":
+        init_queue()
+        with self._lock:
+            for _ in range(self.num_workers):
+                self._spawn()
+        return self
+
+    def resize(self, num_workers: int) -> None:
+        """Grow or shrink the pool; removed workers exit after their current job."""
+        with self._lock:
+            self._workers = [(t, stop) for t, stop in self._workers if t.is_alive()]
+            while len(self._workers) < num_workers:
+                self._spawn()
+            while len(self._workers) > num_workers:
+                _, stop = self._workers.pop()
+                stop.set()
+            self.num_workers = num_workers
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _, stop in workers:
+            stop.set()
+        for t, _ in workers:
+            t.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t, _ in self._workers)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.config import get_config
+    # Importing the email service registers its job handlers
+    import app.services.email_service  # noqa: F401
+
+    cfg = get_config()
+    parser = argparse.ArgumentParser(description="Run job queue workers")
+    parser.add_argument("--workers", type=int, default=cfg.job_workers)
+    parser.add_argument("--visibility-timeout", type=float, default=cfg.job_visibility_timeout)
+    args = parser.parse_args()
+
+    # No dashboard viewers in this process: hand live events to the API process
+    from app.services import live_events
+    live_events.enable_relay()
+
+    pool = WorkerPool(args.workers, args.visibility_timeout).start()
+    print(f" {args.workers} workers polling {JOBS_DB_PATH}")
+    try:
+        while pool.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
@@ -0,0 +1,406 @@
+"""In-process broadcaster for live dashboard updates (served as SSE at ``GET /events``).
+
+Writers publish small events -- ``run_started``, ``run_finished``,
+``counters`` (deltas of the dashboard totals) and ``escalation`` -- and every
+connected dashboard receives them from one fan-out. Each event is serialized
+once, not once per viewer, and the dashboard totals are kept in memory:
+loaded from email_logs once, updated by deltas, and reconciled at most every
+LIVE_RESYNC_SECONDS. Database load is therefore proportional to writes, not to
+the number of open dashboards; ``/status`` and ``/analytics`` read the same
+in-memory totals.
+
+A viewer that falls MAX_QUEUE events behind has its backlog replaced by a
+fresh ``snapshot``; a reconnecting viewer (``Last-Event-ID``) is replayed the
+events it missed, or sent a snapshot if they are no longer buffered.
+
+Job worker processes (``python -m app.services.job_queue``) have no viewers
+and cannot reach this broadcaster, so they call enable_relay(): their events
+go to the ``live_events_relay`` table instead (counter deltas in the same
+transaction as the email_logs rows), and the API process re-publishes them
+from a tailer thread every LIVE_RELAY_POLL_SECONDS. Several uvicorn workers
+each have their own broadcaster; a viewer sees its worker's events and the
+relayed ones, the rest arrive with the next resync.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+MAX_QUEUE = int(os.getenv("LIVE_MAX_QUEUE", "256"))
+REPLAY_EVENTS = 1024
+HEARTBEAT_SECONDS = 15.0
+RESYNC_SECONDS = float(os.getenv("LIVE_RESYNC_SECONDS", "300"))
+RELAY_POLL_SECONDS = float(os.getenv("LIVE_RELAY_POLL_SECONDS", "0.5"))
+RELAY_KEEP_SECONDS = 3600.0
+RELAY_BATCH = 500
+
+# (event id, SSE frame)
+Event = Tuple[int, bytes]
+
+
+def _frame(event_id: int, event_type: str, data: Dict[str, Any]) -> bytes:
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscription:
+    """One viewer's bounded queue, owned by the event loop serving it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(MAX_QUEUE)
+        self.lagged = False
+        # Events up to this id are already reflected in the last snapshot sent
+        self.floor = 0
+
+    def offer(self, event: Event) -> None:
+        """Runs on ``self.loop``; never blocks the publisher."""
+        if self.lagged or event[0] <= self.floor:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow viewer: drop its backlog; it resyncs from a snapshot on its next read
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.lagged = True
+
+    def snapshot(self) -> Event:
+        event = broadcaster.snapshot_event()
+        self.floor = max(self.floor, event[0])
+        return event
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """The next SSE frame, or None after ``timeout`` seconds (send a heartbeat)."""
+        if self.lagged:
+            self.lagged = False
+            return self.snapshot()[1]
+        try:
+            _, frame = await asyncio.wait_for(self.queue.get(), timeout)
+            return frame
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._recent: Deque[Event] = deque(maxlen=REPLAY_EVENTS)
+        self._last_id = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Fan an event out to every viewer; safe to call from any thread."""
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, _frame(self._last_id, event_type, data))
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(sub)
+
+    def last_id(self) -> int:
+        with self._lock:
+            return self._last_id
+
+    def snapshot_event(self) -> Event:
+        last_id, totals = counters.snapshot_with_id()
+        return last_id, _frame(last_id, "snapshot", totals)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a viewer (call from its event loop): replay or snapshot first.
+
+        The snapshot may load the totals from SQLite on first use; callers on
+        an event loop should warm ``counters.snapshot()`` in a thread first.
+        """
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            backlog: Optional[List[Event]] = None
+            if last_event_id and last_event_id.isdigit() and self._recent:
+                after = int(last_event_id)
+                if after >= self._recent[0][0] - 1:
+                    backlog = [event for event in self._recent if event[0] > after]
+            self._subscribers.add(sub)
+        if backlog is None or len(backlog) > MAX_QUEUE:
+            sub.queue.put_nowait(sub.snapshot())
+        else:
+            for event in backlog:
+                sub.queue.put_nowait(event)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def viewers(self) -> int:
+        return len(self._subscribers)
+
+
+class DashboardCounters:
+    """email_logs totals kept in memory and updated by deltas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._total = 0
+        self._answered = 0
+        self._pending = 0  # validation_is_valid = 0, awaiting review
+        self._ignored = 0  # validation_is_valid IS NULL: no reply needed
+        self._per_day: Dict[str, int] = {}
+        # Relayed deltas up to this id are already in the totals
+        self._relay_floor = 0
+
+    def _query(self) -> Tuple[Tuple[int, int, int, int, Dict[str, int]], int]:
+        """Totals, and the last relayed event they already include (one read snapshot)."""
+        from app.services import email_logs
+
+        email_logs.migrate()
+        conn = email_logs.connect()
+        try:
+            conn.execute("BEGIN")
+            relay_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM live_events_relay").fetchone()[0]
+            total = answered = pending = ignored = 0
+            per_day: Dict[str, int] = {}
+            for day, valid, count in conn.execute(
+                "SELECT substr(timestamp, 1, 10), validation_is_valid, COUNT(*) "
+                "FROM email_logs GROUP BY 1, 2"
+            ):
+                total += count
+                answered += count if valid == 1 else 0
+                pending += count if valid == 0 else 0
+                ignored += count if valid is None else 0
+                per_day[day] = per_day.get(day, 0) + count
+            return (total, answered, pending, ignored, dict(sorted(per_day.items()))), relay_id
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def reload(self) -> None:
+        """Re-read the totals; broadcasts a snapshot if they drifted (other writers, pruning)."""
+        fresh, relay_id = self._query()
+        with self._lock:
+            changed = self._loaded_at is not None and fresh != (
+                self._total, self._answered, self._pending, self._ignored, self._per_day
+            )
+            self._total, self._answered, self._pending, self._ignored, self._per_day = fresh
+            self._relay_floor = relay_id
+            self._loaded_at = time.time()
+            if changed:
+                broadcaster.publish("snapshot", self._totals())
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def maybe_resync(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.time() - loaded_at >= RESYNC_SECONDS:
+            self.reload()
+
+    def _totals(self) -> Dict[str, Any]:
+        return {
+            "total": self._total,
+            "answered": self._answered,
+            "escalated": self._total - self._answered - self._ignored,
+            "pending": self._pending,
+            "ignored": self._ignored,
+            "processed_per_day": dict(self._per_day),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals in the /analytics shape, plus ``pending`` for /status."""
+        if self._loaded_at is None:
+            self.reload()
+        with self._lock:
+            return self._totals()
+
+    def snapshot_with_id(self) -> Tuple[int, Dict[str, Any]]:
+        """Totals and the id of the last event they include.
+
+        apply() updates and publishes under the same lock, so every delta
+        with a higher id is not yet in the totals and vice versa.
+        """
+        if self._loaded_at is None:
+            self.reload()
+        with self._lock:
+            return broadcaster.last_id(), self._totals()
+
+    def apply(self, total: int = 0, answered: int = 0, pending: int = 0, ignored: int = 0,
+              per_day: Optional[Dict[str, int]] = None, relay_id: Optional[int] = None) -> None:
+        """Record a change already committed to email_logs and broadcast it.
+
+        ``relay_id`` is set for deltas relayed from a worker process; those
+        already counted by the last reload are skipped.
+        """
+        per_day = per_day or {}
+        if _relay:
+            publish("counters", {"total": total, "answered": answered, "pending": pending,
+                                 "ignored": ignored, "per_day": per_day})
+            return
+        with self._lock:
+            if relay_id is not None and relay_id <= self._relay_floor:
+                return
+            if self._loaded_at is not None:
+                self._total += total
+                self._answered += answered
+                self._pending += pending
+                self._ignored += ignored
+                for day, count in per_day.items():
+                    self._per_day[day] = self._per_day.get(day, 0) + count
+                self._per_day = dict(sorted(self._per_day.items()))
+            broadcaster.publish("counters", {
+                "total": total,
+                "answered": answered,
+                "escalated": total - answered - ignored,
+                "pending": pending,
+                "ignored": ignored,
+                "processed_per_day": per_day,
+            })
+
+    def add_rows(self, groups: List[Tuple[str, Optional[int], int]]) -> None:
+        """Inserted rows as (day, validation_is_valid, count) groups (see relay_rows)."""
+        if groups and not _relay:
+            self.apply(**_group_delta(groups))
+
+    def resolved(self) -> None:
+        """One escalated row was marked valid."""
+        self.apply(answered=1, pending=-1)
+
+
+def _group_delta(groups: List[Tuple[str, Optional[int], int]]) -> Dict[str, Any]:
+    per_day: Dict[str, int] = {}
+    for day, _, count in groups:
+        per_day[day] = per_day.get(day, 0) + count
+    return {
+        "total": sum(count for _, _, count in groups),
+        "answered": sum(count for _, valid, count in groups if valid == 1),
+        "pending": sum(count for _, valid, count in groups if valid == 0),
+        "ignored": sum(count for _, valid, count in groups if valid is None),
+        "per_day": per_day,
+    }
+
+
+broadcaster = Broadcaster()
+counters = DashboardCounters()
+
+_relay = False
+
+
+def enable_relay() -> None:
+    """Send this process's events through SQLite to the API process (job worker processes)."""
+    global _relay
+    _relay = True
+
+
+def create_relay_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS live_events_relay (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            type TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_live_events_relay_ts ON live_events_relay (ts)")
+
+
+def _relay_write(conn: sqlite3.Connection, event_type: str, data: Dict[str, Any]) -> None:
+    conn.execute(
+        "INSERT INTO live_events_relay (ts, type, data) VALUES (?, ?, ?)",
+        (time.time(), event_type, json.dumps(data, separators=(",", ":"), default=str)),
+    )
+
+
+def relay_rows(conn: sqlite3.Connection, groups: List[Tuple[str, Optional[int], int]]) -> None:
+    """Inside the transaction inserting the rows: relay their counter delta (relay mode only).
+
+    Committing both together lets the API process tell whether a reload
+    already counted them.
+    """
+    if _relay and groups:
+        _relay_write(conn, "counters", _group_delta(groups))
+
+
+def publish(event_type: str, data: Dict[str, Any]) -> None:
+    if not _relay:
+        broadcaster.publish(event_type, data)
+        return
+    from app.services import email_logs
+
+    email_logs.migrate()
+    conn = email_logs.connect()
+    try:
+        with conn:
+            _relay_write(conn, event_type, data)
+    except sqlite3.Error as e:
+        print(f" Live event relay failed ({event_type}): {e}")
+    finally:
+        conn.close()
+
+
+class RelayTailer:
+    """API side of the relay: re-publishes events written by worker processes."""
+
+    def __init__(self, poll_seconds: float = RELAY_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._last_id: Optional[int] = None
+        self._pruned_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> int:
+        """Publish relayed events newer than the last one seen; returns how many."""
+        from app.services import email_logs
+
+        email_logs.migrate()
+        conn = email_logs.connect()
+        try:
+            if self._last_id is None:
+                # Older events are covered by the totals loaded from SQLite
+                self._last_id = conn.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM live_events_relay"
+                ).fetchone()[0]
+            rows = conn.execute(
+                "SELECT id, type, data FROM live_events_relay WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, RELAY_BATCH),
+            ).fetchall()
+            if time.time() - self._pruned_at >= 60:
+                with conn:
+                    conn.execute("DELETE FROM live_events_relay WHERE ts < ?", (time.time() - RELAY_KEEP_SECONDS,))
+                self._pruned_at = time.time()
+        finally:
+            conn.close()
+        for event_id, event_type, data in rows:
+            payload = json.loads(data)
+            if event_type == "counters":
+                counters.apply(relay_id=event_id, **payload)
+            else:
+                broadcaster.publish(event_type, payload)
+            self._last_id = event_id
+        return len(rows)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if self.poll() < RELAY_BATCH:
+                    time.sleep(self.poll_seconds)
+            except sqlite3.Error as e:
+                print(f" Live event relay poll failed: {e}")
+                time.sleep(self.poll_seconds)
+
+    def start(self) -> "RelayTailer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="live-events-relay", daemon=True)
+            self._thread.start()
+        return self
+
+
+relay_tailer = RelayTailer()
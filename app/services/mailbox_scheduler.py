@@ -0,0 +1,113 @@
+"""Poll many support mailboxes fairly and shard them across worker processes.
+
+Each process owns a stable shard of the account list. Within a shard, a poll
+round visits every mailbox in rotating round-robin order and takes at most
+``per_poll_quota`` unread messages from each, so a noisy inbox cannot starve
+the others: its backlog simply drains over several rounds.
+
+Polling only enqueues jobs, one per thread (see email_service.enqueue_messages);
+drafting and sending happen in the job queue workers.
+
+CLI: python -m app.services.mailbox_scheduler --processes 4
+"""
+
+import multiprocessing
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.gmail.accounts import get_registry
+from app.gmail.gmail_utils import list_unread_messages
+from app.services.email_service import enqueue_messages
+
+
+def shard_accounts(account_ids: Sequence[str], num_shards: int) -> List[List[str]]:
+    """Split accounts into ``num_shards`` balanced, deterministic shards."""
+    shards: List[List[str]] = [[] for _ in range(max(1, num_shards))]
+    for i, account_id in enumerate(sorted(account_ids)):
+        shards[i % len(shards)].append(account_id)
+    return shards
+
+
+class MailboxScheduler:
+    """Round-robin poller over a set of mailboxes."""
+
+    def __init__(
+        self,
+        account_ids: Sequence[str],
+        poll_interval: float = 60.0,
+        per_poll_quota: int = 5,
+    ):
+        self.account_ids = list(account_ids)
+        self.poll_interval = poll_interval
+        self.per_poll_quota = per_poll_quota
+        self._offset = 0
+
+    def poll_round(self) -> Dict[str, int]:
+        """Visit each mailbox once; returns messages enqueued per account."""
+        registry = get_registry()
+        registry.refresh_all()
+        n = len(self.account_ids)
+        # Rotate the starting mailbox so no account is always served first
+        order = [self.account_ids[(self._offset + i) % n] for i in range(n)]
+        self._offset = (self._offset + 1) % max(1, n)
+
+        enqueued: Dict[str, int] = {}
+        for account_id in order:
+            try:
+                service = registry.get_service(account_id)
+                messages = list_unread_messages(service, self.per_poll_quota)
+            except Exception as e:
+                print(f" Poll failed for {account_id}: {e}")
+                enqueued[account_id] = 0
+                continue
+            enqueue_messages(messages, account_id)
+            enqueued[account_id] = len(messages)
+        return enqueued
+
+    def run_forever(self, stop_after: Optional[int] = None) -> None:
+        rounds = 0
+        while stop_after is None or rounds < stop_after:
+            started = time.time()
+            counts = self.poll_round()
+            print(f" Poll round {rounds}: {counts}")
+            rounds += 1
+            time.sleep(max(0.0, self.poll_interval - (time.time() - started)))
+
+
+def _run_shard(account_ids: List[str], poll_interval: float, per_poll_quota: int) -> None:
+    MailboxScheduler(account_ids, poll_interval, per_poll_quota).run_forever()
+
+
+def run_sharded(
+    num_processes: int, poll_interval: float = 60.0, per_poll_quota: int = 5
+) -> List[multiprocessing.Process]:
+    """Start one polling process per shard of the registered accounts."""
+    shards = shard_accounts(get_registry().account_ids(), num_processes)
+    procs = []
+    for shard in shards:
+        if not shard:
+            continue
+        p = multiprocessing.Process(
+            target=_run_shard, args=(shard, poll_interval, per_poll_quota), daemon=True
+        )
+        p.start()
+        procs.append(p)
+    return procs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Poll registered mailboxes")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=60.0)
+    parser.add_argument("--quota", type=int, default=5, help="max messages per mailbox per round")
+    args = parser.parse_args()
+
+    procs = run_sharded(args.processes, args.interval, args.quota)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
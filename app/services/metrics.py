@@ -1,4 +1,6 @@
-from typing import Dict
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
 
 
 _COUNTERS: Dict[str, int] = {
@@ -7,6 +9,13 @@ _COUNTERS: Dict[str, int] = {
     "runs_escalated": 0,
     "validation_failures": 0,
     "rewrite_attempts": 0,
+    "runs_ignored": 0,
+    "triage_skips": 0,
+    "llm_calls_saved": 0,
+    "tokens_saved": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "prompt_prefix_reused": 0,
 }
 
 
@@ -14,6 +23,10 @@ def _inc(key: str) -> None:
     _COUNTERS[key] = _COUNTERS.get(key, 0) + 1
 
 
+def _add(key: str, amount: int) -> None:
+    _COUNTERS[key] = _COUNTERS.get(key, 0) + amount
+
+
 def increment_runs_started() -> None:
     _inc("runs_started")
 
@@ -34,6 +47,167 @@ def increment_rewrite_attempts() -> None:
     _inc("rewrite_attempts")
 
 
+def increment_runs_ignored() -> None:
+    _inc("runs_ignored")
+
+
+def increment_triage_skips() -> None:
+    _inc("triage_skips")
+
+
+def add_llm_calls_saved(count: int) -> None:
+    _add("llm_calls_saved", count)
+
+
+def add_tokens_saved(tokens: int) -> None:
+    _add("tokens_saved", tokens)
+
+
+def add_prompt_tokens(tokens: int) -> None:
+    _add("prompt_tokens", tokens)
+
+
+def add_completion_tokens(tokens: int) -> None:
+    _add("completion_tokens", tokens)
+
+
+def increment_prompt_prefix_reused() -> None:
+    _inc("prompt_prefix_reused")
+
+
+# Drafting phase cost per mode ("sequential" loop vs "speculative" candidates)
+_DRAFT_MODES: Dict[str, Dict[str, float]] = {}
+_draft_lock = threading.Lock()
+
+
+def _draft_mode(mode: str) -> Dict[str, float]:
+    return _DRAFT_MODES.setdefault(
+        mode, {"runs": 0, "valid": 0, "latency_total": 0.0, "tokens_total": 0}
+    )
+
+
+def record_drafting(mode: str, latency: float, tokens: int, is_valid: bool) -> None:
+    with _draft_lock:
+        stats = _draft_mode(mode)
+        stats["runs"] += 1
+        stats["valid"] += int(is_valid)
+        stats["latency_total"] += latency
+        stats["tokens_total"] += tokens
+
+
+def add_draft_mode_tokens(mode: str, tokens: int) -> None:
+    """Tokens spent after the run finished drafting (abandoned speculative calls)."""
+    with _draft_lock:
+        _draft_mode(mode)["tokens_total"] += tokens
+
+
+def draft_mode_stats() -> Dict[str, Dict[str, Any]]:
+    """Average drafting latency (ms) and token cost per run, by mode."""
+    with _draft_lock:
+        out = {}
+        for mode, stats in _DRAFT_MODES.items():
+            runs = stats["runs"] or 1
+            out[mode] = {
+                "runs": stats["runs"],
+                "valid_rate": round(stats["valid"] / runs, 3),
+                "avg_latency_ms": round(1000 * stats["latency_total"] / runs, 1),
+                "avg_tokens": round(stats["tokens_total"] / runs, 1),
+            }
+        return out
+
+
+# LLM calls per model tier ("fast" / "large", see app.agent.model_router)
+_TIER_LATENCY_WINDOW = 1000
+_TIERS: Dict[str, Dict[str, Any]] = {}
+_ROUTES: Dict[str, int] = {}
+_tier_lock = threading.Lock()
+
+
+def _tier(tier: str) -> Dict[str, Any]:
+    return _TIERS.setdefault(tier, {
+        "calls": 0, "latency_total": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+        "validated": 0, "valid": 0, "fallbacks": 0,
+        "latencies": deque(maxlen=_TIER_LATENCY_WINDOW),
+    })
+
+
+def record_route(tier: str, reason: str) -> None:
+    with _tier_lock:
+        key = f"{tier}:{reason}"
+        _ROUTES[key] = _ROUTES.get(key, 0) + 1
+
+
+def record_model_call(tier: str, latency: float, prompt_tokens: int, completion_tokens: int) -> None:
+    with _tier_lock:
+        stats = _tier(tier)
+        stats["calls"] += 1
+        stats["latency_total"] += latency
+        stats["latencies"].append(latency)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+
+
+def record_tier_validation(tier: str, is_valid: bool) -> None:
+    with _tier_lock:
+        stats = _tier(tier)
+        stats["validated"] += 1
+        stats["valid"] += int(is_valid)
+
+
+def increment_tier_fallbacks(tier: str) -> None:
+    """A ``tier`` reply failed and the request was redone on the large tier."""
+    with _tier_lock:
+        _tier(tier)["fallbacks"] += 1
+
+
+def model_tier_stats() -> Dict[str, Any]:
+    """Per tier: calls, latency (ms, mean and p50/p95 of recent calls), tokens, validation pass rate."""
+    with _tier_lock:
+        tiers = {}
+        for tier, stats in _TIERS.items():
+            calls = stats["calls"] or 1
+            recent = sorted(stats["latencies"])
+            tiers[tier] = {
+                "calls": stats["calls"],
+                "avg_latency_ms": round(1000 * stats["latency_total"] / calls, 1),
+                "p50_latency_ms": round(1000 * recent[len(recent) // 2], 1) if recent else None,
+                "p95_latency_ms": round(1000 * recent[int(len(recent) * 0.95)], 1) if recent else None,
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / calls, 1),
+                "avg_completion_tokens": round(stats["completion_tokens"] / calls, 1),
+                "valid_rate": round(stats["valid"] / stats["validated"], 3) if stats["validated"] else None,
+                "fallbacks": stats["fallbacks"],
+            }
+        return {"tiers": tiers, "routes": dict(_ROUTES)}
+
+
+# FAQ fast path (app.rag.faq_index): top similarity per lookup, in 0.05 buckets
+_FAQ = {"hits": 0, "misses": 0, "no_index": 0}
+_FAQ_SCORES: Dict[str, int] = {}
+_faq_lock = threading.Lock()
+
+
+def record_faq_lookup(score: Optional[float], hit: bool) -> None:
+    with _faq_lock:
+        if score is None:
+            _FAQ["no_index"] += 1
+            return
+        _FAQ["hits" if hit else "misses"] += 1
+        low = min(19, max(0, int(score * 20))) / 20
+        bucket = f"{low:.2f}-{low + 0.05:.2f}"
+        _FAQ_SCORES[bucket] = _FAQ_SCORES.get(bucket, 0) + 1
+
+
+def faq_stats() -> Dict[str, Any]:
+    """Hits, misses, hit rate and the histogram of top scores (for tuning FAQ_MATCH_THRESHOLD)."""
+    with _faq_lock:
+        lookups = _FAQ["hits"] + _FAQ["misses"]
+        return {
+            **_FAQ,
+            "hit_rate": round(_FAQ["hits"] / lookups, 3) if lookups else None,
+            "score_histogram": dict(sorted(_FAQ_SCORES.items())),
+        }
+
+
 def snapshot() -> Dict[str, int]:
     return dict(_COUNTERS)
 
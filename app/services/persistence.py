@@ -1,7 +1,7 @@
 import json
 import os
 import glob
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -19,21 +19,83 @@ def _path(run_id: str) -> str:
 def save_state(run_id: str, state: Dict[str, Any]) -> str:
     _ensure_dir()
     path = _path(run_id)
-    with open(path, "w", encoding="utf-8") as f:
+    # Write-then-rename so a crash mid-write never leaves a truncated checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(state, f, indent=2)
+    os.replace(tmp, path)
     return path
 
 
 def load_state(run_id: str) -> Dict[str, Any]:
     path = _path(run_id)
     if not os.path.exists(path):
-        raise FileNotFoundError(f"No state found for run_id={run_id}")
+        # Older runs live compressed in cold storage (see retention.py)
+        from app.services import retention
+
+        state = retention.load_cold_state(run_id)
+        if state is None:
+            raise FileNotFoundError(f"No state found for run_id={run_id}")
+        return state
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def _sent_path(email_id: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(email_id))
+    return os.path.join(RUNS_DIR, "sent", f"{safe}.json")
+
+
+def get_sent_record(email_id: str) -> Optional[Dict[str, Any]]:
+    """Return the recorded reply for a Gmail message id, if one was already sent."""
+    path = _sent_path(email_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_sent(email_id: str, msg_id: Any, run_id: Optional[str], body: str) -> str:
+    """Durably mark a Gmail message as replied to (write-then-rename)."""
+    path = _sent_path(email_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {"email_id": email_id, "msg_id": msg_id, "run_id": run_id,
+             "body": body, "sent_at": datetime.now().timestamp()},
+            f,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def list_run_ids(status: Optional[str] = None, older_than: float = 0.0) -> List[str]:
+    """List persisted run ids, optionally filtered by status and minimum idle time."""
+    _ensure_dir()
+    now = datetime.now().timestamp()
+    run_ids = []
+    for file_path in glob.glob(os.path.join(RUNS_DIR, "*.state.json")):
+        if older_than and now - os.path.getmtime(file_path) < older_than:
+            continue
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            continue
+        if status is None or state.get("status") == status:
+            run_ids.append(state.get("run_id") or os.path.basename(file_path)[: -len(".state.json")])
+    return run_ids
+
+
 def get_all_email_history() -> List[Dict[str, Any]]:
-    """Get all processed email history from state files"""
+    """Get processed email history: runs still in runs/ plus the Parquet archive.
+
+    Finished runs are moved to the archive by run_archive.compact_runs, so the
+    glob below only covers recent and in-flight runs.
+    """
     _ensure_dir()
     history = []
     
@@ -62,13 +124,16 @@ def get_all_email_history() -> List[Dict[str, Any]]:
             # Skip corrupted or missing files
             continue
     
+    from app.services import run_archive
+
+    history.extend(run_archive.history())
     # Sort by timestamp, newest first
     history.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
     return history
 
 
 def get_escalated_emails() -> List[Dict[str, Any]]:
-    """Get all escalated emails from state files"""
+    """Get escalated emails from runs/ plus the Parquet archive"""
     _ensure_dir()
     escalations = []
     
@@ -98,6 +163,11 @@ def get_escalated_emails() -> List[Dict[str, Any]]:
             # Skip corrupted or missing files
             continue
     
+    from app.services import run_archive
+
+    for item in run_archive.history(status="escalated"):
+        item["escalation_reason"] = item["validation_result"].get("reason") or "Unknown reason"
+        escalations.append(item)
     # Sort by timestamp, newest first
     escalations.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
     return escalations
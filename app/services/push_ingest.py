@@ -0,0 +1,313 @@
+"""Gmail push (Pub/Sub) ingestion: enqueue only the messages that changed.
+
+Flow: Gmail ``users.watch`` publishes ``{"emailAddress", "historyId"}`` to a
+Pub/Sub topic whose push subscription POSTs to ``/email/push``. Notifications
+are coalesced per mailbox for ``debounce_seconds`` (bursts collapse into one
+sync), then ``history.list`` from the stored cursor yields the added INBOX
+messages, which are enqueued as jobs.
+
+The webhook only accepts requests carrying a Pub/Sub OIDC token for
+PUSH_OIDC_AUDIENCE (optionally from PUSH_OIDC_SERVICE_ACCOUNT) or the shared
+secret PUSH_VERIFICATION_TOKEN as a ``?token=`` query parameter, and only
+notifications for a configured mailbox address.
+
+LocalPushPublisher builds Pub/Sub-style envelopes in-process so the whole
+path can be exercised without Google Cloud.
+"""
+
+import base64
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import get_config, get_config_service
+from app.gmail.accounts import get_registry
+from app.services import job_queue
+from app.services.email_service import enqueue_messages, enqueue_unread_emails, ensure_workers
+
+PUSH_OIDC_AUDIENCE = os.getenv("PUSH_OIDC_AUDIENCE", "")
+PUSH_OIDC_SERVICE_ACCOUNT = os.getenv("PUSH_OIDC_SERVICE_ACCOUNT", "")
+PUSH_VERIFICATION_TOKEN = os.getenv("PUSH_VERIFICATION_TOKEN", "")
+
+_google_request = None
+
+
+# --------- History cursor per mailbox ----------
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(job_queue.JOBS_DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(job_queue.JOBS_DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS mailbox_cursors (
+            account_id TEXT PRIMARY KEY,
+            history_id INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    return conn
+
+
+def get_cursor(account_id: str) -> Optional[int]:
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT history_id FROM mailbox_cursors WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def set_cursor(account_id: str, history_id: int) -> None:
+    """Advance the cursor (never moves backwards)."""
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            INSERT INTO mailbox_cursors (account_id, history_id, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(account_id) DO UPDATE SET
+                history_id = MAX(history_id, excluded.history_id),
+                updated_at = excluded.updated_at
+            """,
+            (account_id, int(history_id), time.time()),
+        )
+    finally:
+        conn.close()
+
+
+# --------- Request authentication ----------
+
+def _verify_oidc(bearer: str) -> None:
+    global _google_request
+    from google.auth.transport.requests import Request
+    from google.oauth2 import id_token
+
+    if _google_request is None:
+        _google_request = Request()
+    try:
+        claims = id_token.verify_oauth2_token(bearer, _google_request, audience=PUSH_OIDC_AUDIENCE)
+    except ValueError as e:
+        raise PermissionError(f"Invalid push OIDC token: {e}") from None
+    if PUSH_OIDC_SERVICE_ACCOUNT and not (
+        claims.get("email") == PUSH_OIDC_SERVICE_ACCOUNT and claims.get("email_verified")
+    ):
+        raise PermissionError("Push OIDC token is not from the configured service account")
+
+
+def verify_push_request(authorization: Optional[str], token: Optional[str]) -> None:
+    """Raise PermissionError unless the push request is authenticated.
+
+    Accepts a valid OIDC bearer token (PUSH_OIDC_AUDIENCE) or the shared
+    PUSH_VERIFICATION_TOKEN; with neither configured every request is refused.
+    """
+    if not (PUSH_OIDC_AUDIENCE or PUSH_VERIFICATION_TOKEN):
+        raise PermissionError("Push authentication is not configured "
+                              "(set PUSH_OIDC_AUDIENCE or PUSH_VERIFICATION_TOKEN)")
+    scheme, _, bearer = (authorization or "").partition(" ")
+    if PUSH_OIDC_AUDIENCE and scheme.lower() == "bearer" and bearer:
+        _verify_oidc(bearer)
+        return
+    if PUSH_VERIFICATION_TOKEN and token and hmac.compare_digest(token, PUSH_VERIFICATION_TOKEN):
+        return
+    raise PermissionError("Push request is not authenticated")
+
+
+# --------- Notification parsing ----------
+
+def parse_push_notification(envelope: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode a Pub/Sub push envelope into {"email_address", "history_id"}."""
+    message = envelope.get("message") or {}
+    data = message.get("data")
+    if not data:
+        raise ValueError("Push envelope has no message.data")
+    payload = json.loads(base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)))
+    return {
+        "email_address": payload["emailAddress"],
+        "history_id": int(payload["historyId"]),
+    }
+
+
+# --------- History sync ----------
+
+def _added_inbox_messages(service, start_history_id: int) -> Dict[str, Any]:
+    """Collect messages added to INBOX since ``start_history_id`` (all pages)."""
+    messages: Dict[str, Dict[str, Any]] = {}
+    latest = start_history_id
+    page_token = None
+    while True:
+        resp = service.users().history().list(
+            userId='me',
+            startHistoryId=start_history_id,
+            historyTypes=['messageAdded'],
+            labelId='INBOX',
+            pageToken=page_token,
+        ).execute()
+        latest = max(latest, int(resp.get("historyId", latest)))
+        for record in resp.get("history", []):
+            for added in record.get("messagesAdded", []):
+                msg = added["message"]
+                if "UNREAD" in msg.get("labelIds", ["UNREAD"]):
+                    messages[msg["id"]] = msg
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return {"messages": list(messages.values()), "history_id": latest}
+
+
+def sync_mailbox(account_id: str, notified_history_id: int) -> List[str]:
+    """Enqueue messages added since the stored cursor; returns enqueued message ids.
+
+    Without a cursor (first notification) or when Gmail reports the cursor as
+    too old (HTTP 404), falls back to a one-off unread scan.
+    """
+    start = get_cursor(account_id)
+    if start is None:
+        jobs = enqueue_unread_emails(account_id=account_id, start_workers=False)
+        set_cursor(account_id, notified_history_id)
+        return [m for j in jobs for m in j["message_ids"]]
+
+    service = get_registry().get_service(account_id)
+    try:
+        result = _added_inbox_messages(service, start)
+    except Exception as e:
+        if getattr(getattr(e, "resp", None), "status", None) == 404:
+            jobs = enqueue_unread_emails(account_id=account_id, start_workers=False)
+            set_cursor(account_id, notified_history_id)
+            return [m for j in jobs for m in j["message_ids"]]
+        raise
+
+    enqueue_messages(result["messages"], account_id)
+    set_cursor(account_id, max(result["history_id"], notified_history_id))
+    return [m["id"] for m in result["messages"]]
+
+
+# --------- Debounce / coalesce ----------
+
+class PushCoalescer:
+    """Collapse bursts of notifications per mailbox into one sync.
+
+    The first notification for a mailbox arms a timer; later ones within the
+    window only raise the pending historyId. When the timer fires, one sync
+    runs for the highest historyId seen.
+    """
+
+    def __init__(
+        self,
+        sync: Callable[[str, int], Any] = sync_mailbox,
+        debounce_seconds: float = 2.0,
+    ):
+        self.sync = sync
+        self.debounce_seconds = debounce_seconds
+        self._pending: Dict[str, int] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self.notifications = 0
+        self.syncs = 0
+
+    def notify(self, account_id: str, history_id: int) -> None:
+        with self._lock:
+            self.notifications += 1
+            self._pending[account_id] = max(history_id, self._pending.get(account_id, 0))
+            if account_id in self._timers:
+                return
+            timer = threading.Timer(self.debounce_seconds, self._fire, args=(account_id,))
+            timer.daemon = True
+            self._timers[account_id] = timer
+            timer.start()
+
+    def _fire(self, account_id: str) -> None:
+        with self._lock:
+            history_id = self._pending.pop(account_id, None)
+            self._timers.pop(account_id, None)
+            self.syncs += 1
+        if history_id is None:
+            return
+        try:
+            self.sync(account_id, history_id)
+        except Exception as e:
+            print(f" Push sync failed for {account_id}: {e}")
+
+    def flush(self) -> None:
+        """Run all pending syncs now (used on shutdown and in tests)."""
+        with self._lock:
+            timers = dict(self._timers)
+        for account_id, timer in timers.items():
+            timer.cancel()
+            self._fire(account_id)
+
+
+_coalescer: Optional[PushCoalescer] = None
+
+
+def get_coalescer() -> PushCoalescer:
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = PushCoalescer(debounce_seconds=get_config().push_debounce_seconds)
+    return _coalescer
+
+
+def _on_config(new, old):
+    # Applies from the next armed timer; pending ones keep their delay
+    if _coalescer is not None and new.changed(old, "push_debounce_seconds"):
+        _coalescer.debounce_seconds = new.settings.push_debounce_seconds
+
+
+get_config_service().subscribe(_on_config)
+
+
+def handle_push(envelope: Dict[str, Any], coalescer: Optional[PushCoalescer] = None) -> Dict[str, Any]:
+    """Entry point for the webhook: parse, map to an account and debounce.
+
+    Raises ValueError for an address that no configured account has.
+    """
+    note = parse_push_notification(envelope)
+    account_id = get_registry().account_for_email(note["email_address"])
+    if account_id is None:
+        raise ValueError(f"No account for mailbox {note['email_address']}")
+    if coalescer is None:
+        ensure_workers()
+        coalescer = get_coalescer()
+    coalescer.notify(account_id, note["history_id"])
+    return {"account_id": account_id, "history_id": note["history_id"]}
+
+
+def watch_mailbox(account_id: str, topic_name: str) -> Dict[str, Any]:
+    """Register Gmail push notifications for INBOX and seed the history cursor.
+
+    ``topic_name`` is the full Pub/Sub topic, e.g. projects/<project>/topics/<topic>.
+    Gmail watches expire after 7 days; call this daily.
+    """
+    service = get_registry().get_service(account_id)
+    resp = service.users().watch(
+        userId='me',
+        body={"topicName": topic_name, "labelIds": ["INBOX"], "labelFilterBehavior": "INCLUDE"},
+    ).execute()
+    if get_cursor(account_id) is None:
+        set_cursor(account_id, int(resp["historyId"]))
+    return resp
+
+
+class LocalPushPublisher:
+    """In-process stand-in for Pub/Sub push delivery (tests and local dev)."""
+
+    def __init__(self, deliver: Callable[[Dict[str, Any]], Any] = handle_push):
+        self.deliver = deliver
+        self._seq = 0
+
+    def envelope(self, email_address: str, history_id: int) -> Dict[str, Any]:
+        self._seq += 1
+        data = json.dumps({"emailAddress": email_address, "historyId": history_id})
+        return {
+            "message": {
+                "data": base64.urlsafe_b64encode(data.encode()).decode(),
+                "messageId": str(self._seq),
+                "publishTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            "subscription": "projects/local/subscriptions/gmail-push",
+        }
+
+    def publish(self, email_address: str, history_id: int) -> Any:
+        return self.deliver(self.envelope(email_address, history_id))
@@ -0,0 +1,563 @@
+"""Tiered retention: hot files -> compressed cold storage -> deletion.
+
+- hot: ``runs/*.state.json`` and explainability exports (``runs/<run_id>.json``)
+  idle for less than ``RETENTION_HOT_HOURS``
+- cold: older finished runs are archived to the Parquet run archive (analytics)
+  and their full state moved to ``RETENTION_COLD_DIR`` (only with pyarrow
+  installed; otherwise they stay hot); strings of at least
+  ``RETENTION_BLOB_MIN_BYTES`` (prompts, retrieved policy chunks, email
+  bodies) are stored once as content-addressed blobs (sha256) shared by all
+  runs, and everything is zstd-compressed (gzip if ``zstandard`` is missing)
+- expired: cold items, ``email_logs`` rows and rotated action logs older than
+  ``RETENTION_COLD_DAYS`` are deleted (0 keeps them); blobs go when no item
+  references them
+
+persistence.load_state() falls back to cold storage, so callers don't see the tier.
+
+The background compactor works in small batches, pauses while the job queue
+has ready work, and throttles its writes to ``RETENTION_MAX_MB_PER_SEC``.
+
+    python -m app.services.retention once    # one compaction pass
+    python -m app.services.retention stats   # items, blobs, dedup and compression ratios
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    # POSIX only: one compaction pass at a time across processes
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+    _HAS_FCNTL = False
+
+try:
+    # Soft dependency: falls back to gzip
+    import zstandard
+    _HAS_ZSTD = True
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+    _HAS_ZSTD = False
+
+from app.services import persistence
+
+COLD_DIR = os.getenv("RETENTION_COLD_DIR", os.path.join("data", "cold"))
+HOT_HOURS = float(os.getenv("RETENTION_HOT_HOURS", "24"))
+COLD_DAYS = float(os.getenv("RETENTION_COLD_DAYS", "90"))
+BLOB_MIN_BYTES = int(os.getenv("RETENTION_BLOB_MIN_BYTES", "256"))
+INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+MAX_BYTES_PER_SEC = float(os.getenv("RETENTION_MAX_MB_PER_SEC", "2")) * 1024 * 1024
+BATCH_SIZE = 50
+
+_BLOB_KEY = "__blob__"
+_ZSTD_LEVEL = 10
+
+
+# --- codec ---
+
+def _suffix() -> str:
+    return ".zst" if _HAS_ZSTD else ".gz"
+
+
+def _compress(data: bytes) -> bytes:
+    if _HAS_ZSTD:
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(path: str) -> bytes:
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".zst"):
+        if not _HAS_ZSTD:
+            raise ImportError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _write_file(path: str, data: bytes) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+# --- cold store index ---
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(COLD_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(COLD_DIR, "index.db3"), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            path TEXT NOT NULL,
+            blobs TEXT NOT NULL,
+            archived_at REAL NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            stored_bytes INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_archived ON items (archived_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            refs INTEGER NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            stored_bytes INTEGER NOT NULL
+        )
+    """)
+    return conn
+
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(COLD_DIR, "blobs", digest[:2], digest + _suffix())
+
+
+def _item_path(kind: str, key: str) -> str:
+    shard = hashlib.sha256(key.encode("utf-8")).hexdigest()[:2]
+    return os.path.join(COLD_DIR, kind, shard, key + ".json" + _suffix())
+
+
+def _put_blob(conn: sqlite3.Connection, text: str) -> Tuple[str, int]:
+    """Store ``text`` once; returns (sha256, bytes written)."""
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    row = conn.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+    if row is not None and os.path.exists(row["path"]):
+        conn.execute("UPDATE blobs SET refs = refs + 1 WHERE hash = ?", (digest,))
+        return digest, 0
+    path = _blob_path(digest)
+    stored = _write_file(path, _compress(data))
+    conn.execute(
+        "INSERT OR REPLACE INTO blobs (hash, path, refs, raw_bytes, stored_bytes) "
+        "VALUES (?, ?, COALESCE((SELECT refs FROM blobs WHERE hash = ?), 0) + 1, ?, ?)",
+        (digest, path, digest, len(data), stored),
+    )
+    return digest, stored
+
+
+def _externalize(obj: Any, conn: sqlite3.Connection, refs: List[str], written: List[int]) -> Any:
+    """Replace large strings with blob references."""
+    if isinstance(obj, str):
+        if len(obj) >= BLOB_MIN_BYTES:
+            digest, stored = _put_blob(conn, obj)
+            refs.append(digest)
+            written.append(stored)
+            return {_BLOB_KEY: digest}
+        return obj
+    if isinstance(obj, dict):
+        return {k: _externalize(v, conn, refs, written) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_externalize(v, conn, refs, written) for v in obj]
+    return obj
+
+
+def _internalize(obj: Any, conn: sqlite3.Connection, cache: Dict[str, str]) -> Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and _BLOB_KEY in obj:
+            digest = obj[_BLOB_KEY]
+            if digest not in cache:
+                row = conn.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+                if row is None:
+                    raise FileNotFoundError(f"Missing cold blob {digest}")
+                cache[digest] = _decompress(row["path"]).decode("utf-8")
+            return cache[digest]
+        return {k: _internalize(v, conn, cache) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_internalize(v, conn, cache) for v in obj]
+    return obj
+
+
+def _release(conn: sqlite3.Connection, blob_refs: List[str]) -> None:
+    """Drop one reference per entry; delete blobs nobody references."""
+    for digest in blob_refs:
+        conn.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (digest,))
+    for digest in set(blob_refs):
+        row = conn.execute("SELECT path, refs FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is not None and row["refs"] <= 0:
+            conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            if os.path.exists(row["path"]):
+                os.remove(row["path"])
+
+
+def put_item(kind: str, key: str, obj: Any) -> int:
+    """Store a JSON object in cold storage (replacing any previous copy); returns bytes written."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old = conn.execute(
+                "SELECT blobs FROM items WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            refs: List[str] = []
+            written: List[int] = []
+            manifest = _externalize(obj, conn, refs, written)
+            raw = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+            path = _item_path(kind, key)
+            stored = _write_file(path, _compress(json.dumps(manifest, separators=(",", ":")).encode("utf-8")))
+            conn.execute(
+                "INSERT OR REPLACE INTO items (kind, key, path, blobs, archived_at, raw_bytes, stored_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, path, json.dumps(refs), time.time(), len(raw), stored),
+            )
+            if old is not None:
+                _release(conn, json.loads(old["blobs"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return stored + sum(written)
+    finally:
+        conn.close()
+
+
+def get_item(kind: str, key: str) -> Optional[Any]:
+    if not os.path.exists(os.path.join(COLD_DIR, "index.db3")):
+        return None
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT path FROM items WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        if row is None:
+            return None
+        manifest = json.loads(_decompress(row["path"]))
+        return _internalize(manifest, conn, {})
+    finally:
+        conn.close()
+
+
+def item_keys(kind: str) -> List[str]:
+    if not os.path.exists(os.path.join(COLD_DIR, "index.db3")):
+        return []
+    conn = _connect()
+    try:
+        return [row["key"] for row in conn.execute("SELECT key FROM items WHERE kind = ?", (kind,))]
+    finally:
+        conn.close()
+
+
+def archive_state(run_id: str, path: str) -> int:
+    """Move a run state file into cold storage (usable as run_archive's ``retire`` hook).
+
+    A file that is already gone (moved by an earlier pass) is skipped.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return 0
+    written = put_item("state", run_id, state)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return written
+
+
+def load_cold_state(run_id: str) -> Optional[Dict[str, Any]]:
+    return get_item("state", run_id)
+
+
+def expire_cold(cutoff: float, limit: int = BATCH_SIZE) -> int:
+    """Delete up to ``limit`` cold items archived before ``cutoff`` (and unreferenced blobs)."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT kind, key, path, blobs FROM items WHERE archived_at < ? ORDER BY archived_at LIMIT ?",
+            (cutoff, limit),
+        ).fetchall()
+        for row in rows:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM items WHERE kind = ? AND key = ?", (row["kind"], row["key"]))
+            _release(conn, json.loads(row["blobs"]))
+            conn.execute("COMMIT")
+            if os.path.exists(row["path"]):
+                os.remove(row["path"])
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def prune_email_logs(cutoff: datetime, limit: int = 1000) -> int:
+    """Delete up to ``limit`` dashboard email_logs rows older than ``cutoff``.
+
+    Their escalation queue items are detached in the same transaction (see
+    escalations.detach_logs), so no item points at a deleted row.
+    """
+    from app.services import email_logs, escalations
+
+    if not os.path.exists(email_logs.DB_PATH):
+        return 0
+    email_logs.migrate()
+    conn = email_logs.connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # idx_email_logs_ts keeps this a range scan
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM email_logs WHERE ts < ? LIMIT ?", (cutoff.timestamp(), limit)
+            )]
+            expired = escalations.detach_logs(conn, ids, cutoff.timestamp())
+            if ids:
+                conn.execute(f"DELETE FROM email_logs WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    escalations.announce(expired, "resolved", "retention")
+    if ids:
+        from app.services import live_events
+
+        if live_events.counters.loaded:
+            live_events.counters.reload()
+    return len(ids)
+
+
+def prune_rotated_logs(cutoff: float) -> int:
+    """Delete rotated (gzip) action logs last written before ``cutoff``."""
+    from app.services.action_log import LOG_FILE
+
+    removed = 0
+    for path in LOG_FILE.parent.glob(LOG_FILE.name + ".*.gz"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def stats() -> Dict[str, Any]:
+    conn = _connect()
+    try:
+        items = {
+            row["kind"]: {"count": row["n"], "raw_bytes": row["raw"], "manifest_bytes": row["stored"]}
+            for row in conn.execute(
+                "SELECT kind, COUNT(*) AS n, SUM(raw_bytes) AS raw, SUM(stored_bytes) AS stored "
+                "FROM items GROUP BY kind"
+            )
+        }
+        blobs = conn.execute(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(refs), 0) AS refs, COALESCE(SUM(raw_bytes), 0) AS raw, "
+            "COALESCE(SUM(stored_bytes), 0) AS stored, COALESCE(SUM(raw_bytes * refs), 0) AS logical FROM blobs"
+        ).fetchone()
+    finally:
+        conn.close()
+    raw = sum(i["raw_bytes"] for i in items.values())
+    stored = sum(i["manifest_bytes"] for i in items.values()) + blobs["stored"]
+    return {
+        "codec": "zstd" if _HAS_ZSTD else "gzip",
+        "items": items,
+        "blobs": {"count": blobs["n"], "references": blobs["refs"], "stored_bytes": blobs["stored"]},
+        # Blob bytes as if every reference were stored separately vs stored once
+        "dedup_ratio": round(blobs["logical"] / blobs["raw"], 2) if blobs["raw"] else None,
+        "raw_bytes": raw,
+        "stored_bytes": stored,
+        "compression_ratio": round(raw / stored, 2) if stored else None,
+    }
+
+
+@contextmanager
+def _pass_lock() -> Iterator[bool]:
+    """Non-blocking exclusive lock on the cold store; yields False if another process holds it.
+
+    Every API and job worker process runs a compactor; without the lock they
+    would archive the same runs/ files and merge the same Parquet day files.
+    """
+    if not _HAS_FCNTL:
+        yield True
+        return
+    os.makedirs(COLD_DIR, exist_ok=True)
+    with open(os.path.join(COLD_DIR, "compactor.lock"), "a") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class _Throttle:
+    """Token bucket over bytes written."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.allowance = rate
+        self.last = time.monotonic()
+
+    def wait(self, cost: float) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+        self.last = now
+        self.allowance -= cost
+        if self.allowance < 0:
+            time.sleep(-self.allowance / self.rate)
+
+
+class Compactor:
+    """Background retention pass every ``interval`` seconds, yielding to ingest."""
+
+    def __init__(
+        self,
+        hot_hours: float = HOT_HOURS,
+        cold_days: float = COLD_DAYS,
+        interval: float = INTERVAL_SECONDS,
+        max_bytes_per_sec: float = MAX_BYTES_PER_SEC,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.hot_seconds = hot_hours * 3600
+        self.cold_days = cold_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self._throttle = _Throttle(max_bytes_per_sec)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warned_no_archive = False
+
+    def _yield_to_ingest(self) -> bool:
+        """Wait while the job queue has ready work; False if stopping."""
+        from app.services import job_queue
+
+        while not self._stop.is_set():
+            try:
+                if job_queue.ready_count() == 0:
+                    return True
+            except sqlite3.OperationalError:
+                return True
+            self._stop.wait(5.0)
+        return False
+
+    def _retire(self, run_id: str, path: str) -> None:
+        self._throttle.wait(archive_state(run_id, path))
+
+    def _archive_runs(self) -> int:
+        from app.services import run_archive
+
+        retired = 0
+        while self._yield_to_ingest():
+            try:
+                # Analytics row in the Parquet archive, full state in cold storage
+                n = run_archive.compact_runs(self.hot_seconds, self.batch_size, self._retire)["retired"]
+            except ImportError as e:
+                # History and escalation views read runs/ plus Parquet only: a state
+                # moved to cold storage without its row would vanish from them
+                if not self._warned_no_archive:
+                    print(f" Finished runs stay in runs/: {e}")
+                    self._warned_no_archive = True
+                return retired
+            retired += n
+            if n < self.batch_size:
+                break
+        return retired
+
+    def _archive_exports(self) -> int:
+        """Explainability exports (runs/<run_id>.json) past the hot window."""
+        now = time.time()
+        moved = 0
+        names = os.listdir(persistence.RUNS_DIR) if os.path.isdir(persistence.RUNS_DIR) else []
+        for name in names:
+            if not name.endswith(".json") or name.endswith(".state.json"):
+                continue
+            path = os.path.join(persistence.RUNS_DIR, name)
+            try:
+                if now - os.path.getmtime(path) < self.hot_seconds:
+                    continue
+                if moved % self.batch_size == 0 and not self._yield_to_ingest():
+                    break
+                with open(path, "r", encoding="utf-8") as f:
+                    export = json.load(f)
+                self._throttle.wait(put_item("export", name[: -len(".json")], export))
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            moved += 1
+        return moved
+
+    def run_once(self) -> Dict[str, int]:
+        """One pass; empty result if another process is running one."""
+        with _pass_lock() as acquired:
+            if not acquired:
+                return {}
+            return self._run_pass()
+
+    def _run_pass(self) -> Dict[str, int]:
+        result = {"runs": self._archive_runs(), "exports": self._archive_exports()}
+        if self.cold_days <= 0:
+            return result
+        cutoff = datetime.now() - timedelta(days=self.cold_days)
+        expired = rows = 0
+        while self._yield_to_ingest():
+            n = expire_cold(cutoff.timestamp(), self.batch_size)
+            m = prune_email_logs(cutoff, self.batch_size * 20)
+            expired += n
+            rows += m
+            if n < self.batch_size and m < self.batch_size * 20:
+                break
+        result.update({"expired": expired, "email_logs": rows, "rotated_logs": prune_rotated_logs(cutoff.timestamp())})
+        return result
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                result = self.run_once()
+                if any(result.values()):
+                    print(f" Retention pass: {result}")
+            except Exception as e:
+                print(f" Retention pass failed: {e}")
+
+    def start(self) -> "Compactor":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_compactor: Optional[Compactor] = None
+_compactor_lock = threading.Lock()
+
+
+def start_compactor() -> Optional[Compactor]:
+    """Start the process-wide background compactor once (unless RETENTION_ENABLED=0)."""
+    global _compactor
+    if os.getenv("RETENTION_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _compactor_lock:
+        if _compactor is None:
+            _compactor = Compactor().start()
+        return _compactor
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run-state and log retention")
+    parser.add_argument("command", choices=["once", "stats"])
+    args = parser.parse_args()
+    if args.command == "once":
+        print(json.dumps(Compactor().run_once()))
+    else:
+        print(json.dumps(stats(), indent=2))
@@ -0,0 +1,319 @@
+"""Columnar archive of completed runs (Parquet, partitioned by day).
+
+Finished runs are rolled out of ``runs/*.state.json`` into
+``RUN_ARCHIVE_DIR/day=YYYY-MM-DD/runs.parquet`` (zstd-compressed, one file per
+day); the full state moves to cold storage (retention.py). Columns are typed
+(status, rewrite count, validation reason, per-step durations, token counts,
+...), so analytics read only the columns they need instead of parsing every
+JSON state file.
+
+    python -m app.services.run_archive compact            # archive finished runs
+    python -m app.services.run_archive summary            # per-day counts, latency, tokens
+    python -m app.services.run_archive query --status escalated --columns run_id,validation_reason
+"""
+
+import glob
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    # Soft dependency: only needed to write or query the archive
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except ImportError:  # pragma: no cover
+    pa = pc = ds = pq = None  # type: ignore
+    _HAS_PYARROW = False
+
+from app.services import persistence
+
+ARCHIVE_DIR = os.getenv("RUN_ARCHIVE_DIR", os.path.join("data", "run_archive"))
+# Runs are archived once their state file has been idle this long (seconds)
+MIN_AGE_SECONDS = float(os.getenv("RUN_ARCHIVE_MIN_AGE", "3600"))
+DAY_FILE = "runs.parquet"
+
+TERMINAL_STATUSES = ("sent", "escalated", "ignored")
+
+# Log step -> duration column (time since the previous log entry, summed per column)
+STEP_COLUMNS = {
+    "triage": "triage_ms",
+    "retrieve_context": "retrieve_ms",
+    "draft_reply": "draft_ms",
+    "speculative_draft": "draft_ms",
+    "validate_reply": "validate_ms",
+    "rewrite_reply": "rewrite_ms",
+    "send_email": "deliver_ms",
+    "escalate": "deliver_ms",
+    "ignore": "deliver_ms",
+}
+DURATION_COLUMNS = sorted(set(STEP_COLUMNS.values()))
+
+HISTORY_COLUMNS = [
+    "run_id", "email_id", "email_content", "status", "final_reply",
+    "finished_at", "rewrite_count", "is_valid", "validation_reason",
+]
+ESCALATION_COLUMNS = [
+    "run_id", "email_id", "email_content", "status", "draft_reply",
+    "finished_at", "is_valid", "validation_reason",
+]
+
+
+def schema() -> "pa.Schema":
+    fields = [
+        ("run_id", pa.string()),
+        ("email_id", pa.string()),
+        ("thread_id", pa.string()),
+        ("status", pa.string()),
+        ("draft_mode", pa.string()),
+        ("rewrite_count", pa.int16()),
+        ("is_valid", pa.bool_()),
+        ("validation_reason", pa.string()),
+        ("started_at", pa.timestamp("ms", tz="UTC")),
+        ("finished_at", pa.timestamp("ms", tz="UTC")),
+        ("total_ms", pa.float32()),
+    ]
+    fields += [(name, pa.float32()) for name in DURATION_COLUMNS]
+    fields += [
+        ("prompt_tokens", pa.int32()),
+        ("completion_tokens", pa.int32()),
+        ("llm_calls", pa.int16()),
+        ("email_content", pa.string()),
+        ("draft_reply", pa.string()),
+        ("final_reply", pa.string()),
+    ]
+    return pa.schema(fields)
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def state_to_row(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a finished run state into one archive row."""
+    log = state.get("log", [])
+    stamps = [entry.get("timestamp", 0) for entry in log if entry.get("timestamp")]
+    started = min(stamps) if stamps else 0.0
+    finished = max(stamps) if stamps else 0.0
+
+    durations = {name: 0.0 for name in DURATION_COLUMNS}
+    previous = started
+    for entry in log:
+        ts = entry.get("timestamp") or previous
+        column = STEP_COLUMNS.get(entry.get("Step"))
+        if column:
+            durations[column] += max(0.0, ts - previous) * 1000
+        previous = ts
+
+    validation = state.get("validation_result") or {}
+    usage = state.get("token_usage") or {}
+    row = {
+        "run_id": state.get("run_id"),
+        "email_id": state.get("email_id"),
+        "thread_id": state.get("thread_id"),
+        "status": state.get("status"),
+        "draft_mode": state.get("draft_mode"),
+        "rewrite_count": int(state.get("rewrite_count", 0)),
+        "is_valid": bool(validation.get("is_valid")) if validation else None,
+        "validation_reason": validation.get("reason"),
+        "started_at": datetime.fromtimestamp(started, tz=timezone.utc),
+        "finished_at": datetime.fromtimestamp(finished, tz=timezone.utc),
+        "total_ms": (finished - started) * 1000,
+        "prompt_tokens": int(usage.get("prompt", 0)),
+        "completion_tokens": int(usage.get("completion", 0)),
+        "llm_calls": int(usage.get("calls", 0)),
+        "email_content": state.get("email_content"),
+        "draft_reply": state.get("draft_reply"),
+        "final_reply": state.get("final_reply"),
+    }
+    row.update(durations)
+    return row
+
+
+def _day_dir(day: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"day={day}")
+
+
+def _write_day(day: str, rows: List[Dict[str, Any]]) -> int:
+    """Merge rows into the day's file (one file per day, run_id unique); returns rows added."""
+    day_dir = _day_dir(day)
+    os.makedirs(day_dir, exist_ok=True)
+    path = os.path.join(day_dir, DAY_FILE)
+    new = pa.Table.from_pylist(rows, schema=schema())
+    if os.path.exists(path):
+        existing = pq.read_table(path, schema=schema())
+        known = pc.is_in(new["run_id"], value_set=existing["run_id"])
+        new = new.filter(pc.invert(known))
+        if new.num_rows == 0:
+            return 0
+        table = pa.concat_tables([existing, new])
+    else:
+        table = new
+    # Sorted by finish time so row-group statistics prune time-range queries
+    table = table.sort_by("finished_at")
+    tmp = os.path.join(day_dir, f".{uuid.uuid4().hex}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return new.num_rows
+
+
+def _to_cold_storage(run_id: str, path: str) -> None:
+    from app.services import retention
+
+    retention.archive_state(run_id, path)
+
+
+def compact_runs(
+    min_age: Optional[float] = None,
+    limit: Optional[int] = None,
+    retire: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, Any]:
+    """Roll finished, idle run states into the day-partitioned archive.
+
+    A state file is retired (``retire(run_id, path)``; moved to compressed
+    cold storage by default) only after its row is durably in the archive. Re-running after a crash
+    is safe: runs already archived are not added twice.
+    """
+    if not _HAS_PYARROW:
+        raise ImportError("pyarrow is required to archive runs (pip install pyarrow)")
+    min_age = MIN_AGE_SECONDS if min_age is None else min_age
+    retire = retire or _to_cold_storage
+    now = time.time()
+
+    by_day: Dict[str, List[Dict[str, Any]]] = {}
+    files: Dict[str, List[Tuple[str, str]]] = {}
+    scanned = 0
+    for path in glob.glob(os.path.join(persistence.RUNS_DIR, "*.state.json")):
+        if limit is not None and scanned >= limit:
+            break
+        try:
+            if now - os.path.getmtime(path) < min_age:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if state.get("status") not in TERMINAL_STATUSES:
+            continue
+        row = state_to_row(state)
+        if not row["run_id"]:
+            row["run_id"] = os.path.basename(path)[: -len(".state.json")]
+        day = _day(row["finished_at"].timestamp())
+        by_day.setdefault(day, []).append(row)
+        files.setdefault(day, []).append((row["run_id"], path))
+        scanned += 1
+
+    added = 0
+    for day, rows in sorted(by_day.items()):
+        added += _write_day(day, rows)
+        for run_id, path in files[day]:
+            retire(run_id, path)
+    return {"archived": added, "retired": scanned, "days": sorted(by_day)}
+
+
+def _dataset() -> Optional["ds.Dataset"]:
+    if not _HAS_PYARROW or not glob.glob(os.path.join(ARCHIVE_DIR, "day=*", DAY_FILE)):
+        return None
+    # Keep ``day`` a string so it compares with "YYYY-MM-DD" bounds
+    partitioning = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+    return ds.dataset(ARCHIVE_DIR, format="parquet", partitioning=partitioning)
+
+
+def query_runs(
+    columns: Optional[List[str]] = None,
+    start_day: Optional[str] = None,
+    end_day: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Optional["pa.Table"]:
+    """Archived runs as an Arrow table, reading only ``columns``.
+
+    Day bounds (YYYY-MM-DD, inclusive) prune whole partitions; None when the
+    archive is empty or pyarrow is missing.
+    """
+    dataset = _dataset()
+    if dataset is None:
+        return None
+    expr = None
+    for cond in (
+        (ds.field("day") >= start_day) if start_day else None,
+        (ds.field("day") <= end_day) if end_day else None,
+        (ds.field("status") == status) if status else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def _records(table: Optional["pa.Table"]) -> List[Dict[str, Any]]:
+    if table is None:
+        return []
+    rows = table.to_pylist()
+    for row in rows:
+        if row.get("finished_at") is not None:
+            row["timestamp"] = row.pop("finished_at").timestamp()
+    return rows
+
+
+def history(status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Archived runs in the shape of persistence.get_all_email_history items, newest first."""
+    columns = ESCALATION_COLUMNS if status == "escalated" else HISTORY_COLUMNS
+    table = query_runs(columns, status=status)
+    if table is not None:
+        table = table.sort_by([("finished_at", "descending")])
+        if limit is not None:
+            table = table.slice(0, limit)
+    items = []
+    for row in _records(table):
+        row["validation_result"] = {"is_valid": row.pop("is_valid"), "reason": row.pop("validation_reason")}
+        items.append(row)
+    return items
+
+
+def daily_summary(start_day: Optional[str] = None, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per day and status: run count, mean/max latency, tokens and rewrites."""
+    columns = ["day", "status", "total_ms", "prompt_tokens", "completion_tokens", "rewrite_count"]
+    table = query_runs(columns, start_day, end_day)
+    if table is None:
+        return []
+    grouped = table.group_by(["day", "status"]).aggregate([
+        ("status", "count"),
+        ("total_ms", "mean"),
+        ("total_ms", "max"),
+        ("prompt_tokens", "sum"),
+        ("completion_tokens", "sum"),
+        ("rewrite_count", "mean"),
+    ])
+    return grouped.sort_by([("day", "ascending"), ("status", "ascending")]).to_pylist()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parquet archive of completed runs")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compact")
+    c.add_argument("--min-age", type=float, default=None, help="seconds a run must be idle")
+    s = sub.add_parser("summary")
+    s.add_argument("--start", default=None)
+    s.add_argument("--end", default=None)
+    q = sub.add_parser("query")
+    q.add_argument("--columns", default="run_id,status,finished_at,total_ms")
+    q.add_argument("--status", default=None)
+    q.add_argument("--start", default=None)
+    q.add_argument("--end", default=None)
+    args = parser.parse_args()
+
+    if args.cmd == "compact":
+        print(json.dumps(compact_runs(args.min_age)))
+    elif args.cmd == "summary":
+        for row in daily_summary(args.start, args.end):
+            print(json.dumps(row, default=str))
+    else:
+        table = query_runs(args.columns.split(","), args.start, args.end, args.status)
+        for row in ([] if table is None else table.to_pylist()):
+            print(json.dumps(row, default=str))
@@ -0,0 +1,85 @@
+"""In-flight agent runs per Gmail thread.
+
+Only one run per (account, thread) is active in a process. A job for a thread
+that already has a run in flight hands its message ids to that run (absorbed)
+instead of drafting a second reply, then waits for the owner to finish:
+
+- ids absorbed before the owner drafts are merged into its current reply
+- ids absorbed after that get one more pass once the current reply is sent
+- if the owner fails, absorbed jobs raise the same error so the queue retries them
+- if the owner is still running after one job visibility timeout, absorbed
+  jobs give up with TimeoutError and are requeued
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+RunKey = Tuple[str, str]
+
+
+class ThreadRun:
+    def __init__(self, key: RunKey, owner: str):
+        self.key = key
+        self.owner = owner
+        self.seen = set()
+        self.pending: List[str] = []
+        self.absorbed = 0
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class ThreadRunRegistry:
+    def __init__(self):
+        self._runs: Dict[RunKey, ThreadRun] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: RunKey, msg_ids: Sequence[str], owner: str) -> Tuple[ThreadRun, bool]:
+        """Register ``msg_ids`` for the thread; returns (run, True) if the caller owns it."""
+        with self._lock:
+            run = self._runs.get(key)
+            is_owner = run is None
+            if is_owner:
+                run = self._runs[key] = ThreadRun(key, owner)
+            for msg_id in msg_ids:
+                if msg_id not in run.seen:
+                    run.seen.add(msg_id)
+                    run.pending.append(msg_id)
+                    if not is_owner:
+                        run.absorbed += 1
+            return run, is_owner
+
+    def drain(self, run: ThreadRun) -> List[str]:
+        """Take the message ids not yet handled by the owner."""
+        with self._lock:
+            batch, run.pending = run.pending, []
+            return batch
+
+    def drain_or_finish(self, run: ThreadRun) -> List[str]:
+        """Next batch for the owner, or close the run atomically if nothing is pending."""
+        with self._lock:
+            if run.pending:
+                batch, run.pending = run.pending, []
+                return batch
+            self._close(run, None)
+            return []
+
+    def finish(self, run: ThreadRun, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._close(run, error)
+
+    def _close(self, run: ThreadRun, error: Optional[BaseException]) -> None:
+        run.error = error
+        if self._runs.get(run.key) is run:
+            del self._runs[run.key]
+        run.done.set()
+
+    def in_flight(self) -> List[RunKey]:
+        with self._lock:
+            return list(self._runs)
+
+
+_registry = ThreadRunRegistry()
+
+
+def get_thread_runs() -> ThreadRunRegistry:
+    return _registry
@@ -0,0 +1,122 @@
+"""Startup sweep: pending runs resume after their last completed node and never send twice."""
+
+import threading
+
+import pytest
+
+from app.agent import agent_graph
+from app.services import email_logs, persistence
+
+DOCS = [{"id": "refunds", "content": "Refunds are paid within 15 days."}]
+EMAIL = "Hello, my flight was cancelled yesterday. How long does a refund take to arrive?"
+
+
+class Crash(Exception):
+    pass
+
+
+class Runtime:
+    """run_agent callables that count their calls; ``crash_on_send`` simulates a dying worker."""
+
+    def __init__(self, crash_on_send=False, crash_after_send=False):
+        self.calls = {"retrieve": 0, "llm": 0, "send": 0}
+        self.crash_on_send = crash_on_send
+        self.crash_after_send = crash_after_send
+
+    def rag_retrieve(self, query, top_k=5):
+        self.calls["retrieve"] += 1
+        return DOCS
+
+    def llm_call(self, prompt):
+        self.calls["llm"] += 1
+        return "Your refund will arrive within 15 days."
+
+    def gmail_send(self, email_id, body):
+        if self.crash_on_send:
+            raise Crash("worker died before sending")
+        self.calls["send"] += 1
+        return f"sent-{email_id}"
+
+    def kwargs(self):
+        return {
+            "rag_retrieve": self.rag_retrieve,
+            "llm_call": self.llm_call,
+            "validator": lambda draft, docs: {"is_valid": True, "reason": "ok"},
+            "gmail_send": self.gmail_send,
+            "escalate_handler": lambda state: "ticket",
+            "pii_redactor": lambda text: text,
+            "prompt_template": "Docs: {docs}\nEmail: {email}",
+            "rewrite_prompt_template": "Fix ({reason}): {draft}",
+            "speculative_drafts": 1,
+        }
+
+
+@pytest.fixture(autouse=True)
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence, "RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setattr(email_logs, "record_run", lambda state: None)
+    monkeypatch.setattr(agent_graph, "log_action", lambda *a, **kw: None)
+    monkeypatch.setattr(agent_graph, "_runtime", {})
+
+
+def _start(run_id, runtime):
+    with pytest.raises(Crash):
+        agent_graph.run_agent({"email_id": f"msg-{run_id}", "email_content": EMAIL}, run_id, **runtime.kwargs())
+    state = persistence.load_state(run_id)
+    assert state["status"] == "pending"
+    return state
+
+
+def _resume_kwargs(runtime):
+    kwargs = runtime.kwargs()
+    kwargs.pop("speculative_drafts")
+    return kwargs
+
+
+def test_pending_run_resumes_after_its_last_completed_node():
+    first = Runtime(crash_on_send=True)
+    _start("run-1", first)
+    assert first.calls == {"retrieve": 1, "llm": 1, "send": 0}
+
+    second = Runtime()
+    [state] = agent_graph.resume_pending_runs(**_resume_kwargs(second))
+    assert state["status"] == "sent"
+    assert state["final_reply"] == "Your refund will arrive within 15 days."
+    # Retrieval and drafting were checkpointed; only the send runs again
+    assert second.calls == {"retrieve": 0, "llm": 0, "send": 1}
+    assert persistence.list_run_ids(status="pending") == []
+
+
+def test_run_that_crashed_after_sending_is_not_sent_again(monkeypatch):
+    runtime = Runtime()
+    record_sent = persistence.record_sent
+
+    def crash_after_recording(*args):
+        record_sent(*args)
+        raise Crash("worker died after sending")
+
+    monkeypatch.setattr(persistence, "record_sent", crash_after_recording)
+    _start("run-1", runtime)
+    monkeypatch.setattr(persistence, "record_sent", record_sent)
+    assert runtime.calls["send"] == 1
+
+    [state] = agent_graph.resume_pending_runs(**_resume_kwargs(runtime))
+    assert state["status"] == "sent"
+    assert runtime.calls["send"] == 1
+    assert state["log"][-1]["details"]["deduplicated"] is True
+
+
+def test_startup_sweep_uses_the_default_runtime_with_registered_overrides(monkeypatch):
+    _start("run-1", Runtime(crash_on_send=True))
+    defaults, override = Runtime(), Runtime()
+    monkeypatch.setattr(agent_graph, "default_runtime", lambda: _resume_kwargs(defaults))
+    monkeypatch.setenv("AGENT_RESUME_STALE_SECONDS", "0")
+    agent_graph.register_runtime(gmail_send=override.gmail_send)
+
+    agent_graph.resume_on_startup()
+    for thread in threading.enumerate():
+        if thread.name == "agent-resume":
+            thread.join(timeout=10)
+
+    assert persistence.load_state("run-1")["status"] == "sent"
+    assert (defaults.calls["send"], override.calls["send"]) == (0, 1)
@@ -0,0 +1,97 @@
+"""Router endpoints are reachable on the served app (app.main)."""
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+main = pytest.importorskip("app.main")  # needs the full requirements.txt install
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.api import routes_app, routes_email, routes_rag
+from app.services import job_queue
+
+
+@pytest.fixture
+def client():
+    # No context manager: startup (migrations, relay tailer) is not needed here
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOBS_DB_PATH", str(tmp_path / "jobs.db3"))
+    monkeypatch.setattr(job_queue, "_initialized", False)
+
+
+def test_fetch_enqueues_jobs(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(routes_email, "enqueue_unread_emails",
+                        lambda max_results, account_id: calls.append((max_results, account_id)) or ["j1", "j2"])
+    response = client.post("/email/fetch", params={"max_results": 2, "account_id": "sales"})
+    assert response.status_code == 200
+    assert response.json() == {"status": "queued", "jobs": ["j1", "j2"], "total": 2}
+    assert calls == [(2, "sales")]
+
+
+def test_job_status(client, jobs_db):
+    job = job_queue.enqueue("email_thread", {"message_id": "m1"}, idempotency_key="m1")
+    response = client.get(f"/email/jobs/{job['id']}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "queued"
+    assert response.json()["payload"] == {"message_id": "m1"}
+    assert client.get("/email/jobs/missing").status_code == 404
+
+
+def test_push_is_authenticated_and_accepted(client, monkeypatch):
+    def verify(authorization, token):
+        if token != "secret":
+            raise PermissionError("bad token")
+
+    monkeypatch.setattr(routes_email, "verify_push_request", verify)
+    monkeypatch.setattr(routes_email, "handle_push", lambda envelope: {"account_id": "default", "pending": True})
+    assert client.post("/email/push", params={"token": "wrong"}, json={}).status_code == 403
+    response = client.post("/email/push", params={"token": "secret"}, json={"message": {}})
+    assert response.json() == {"status": "accepted", "account_id": "default", "pending": True}
+
+
+def test_rag_search_passes_filters(client, monkeypatch):
+    calls = []
+
+    def retrieve(query, k, section=None, source=None):
+        calls.append((query, k, section, source))
+        return [{"content": "Bags up to 23 kg.", "section": "Baggage", "source": "baggage"}]
+
+    monkeypatch.setattr(routes_rag, "retrieve_documents", retrieve)
+    response = client.get("/rag/search", params={"query": "bags", "section": "Baggage", "source": "baggage"})
+    assert response.status_code == 200
+    assert response.json()["sources"] == [{"section": "Baggage", "source": "baggage"}]
+    assert calls == [("bags", 3, "Baggage", "baggage")]
+
+
+def test_logs_stream_replays_backlog(client, tmp_path, monkeypatch):
+    log = tmp_path / "actions.log"
+    log.write_text("first\nsecond\n", encoding="utf-8")
+    monkeypatch.setattr(routes_app, "LOG_FILE", log)
+
+    async def disconnected(self):
+        return True  # TestClient never disconnects; end the stream after the backlog
+
+    monkeypatch.setattr(Request, "is_disconnected", disconnected)
+    response = client.get("/logs/stream", params={"backlog": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == "data: first\n\ndata: second\n\n"
+
+
+def test_config_reports_the_snapshot_version(client):
+    response = client.get("/config")
+    assert response.status_code == 200
+    assert set(response.json()) == {"version", "loaded_at", "settings"}
+
+
+def test_dashboard_endpoints_keep_precedence_over_router_duplicates(client):
+    # /email/history is served by app.main (a list), not routes_email (a dict)
+    paths = {route.path: route.endpoint.__module__ for route in main.app.routes if hasattr(route, "endpoint")}
+    assert paths["/email/history"] == "app.main"
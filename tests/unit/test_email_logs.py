@@ -0,0 +1,40 @@
+"""Dashboard email_logs rows: per-run token counts."""
+
+import pytest
+
+from app.services import email_logs
+
+
+@pytest.fixture(autouse=True)
+def dashboard_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(email_logs, "DB_PATH", str(tmp_path / "sqlite.db3"))
+    monkeypatch.setattr(email_logs, "_migrated", {})
+
+
+def _tokens(run_id):
+    conn = email_logs.connect()
+    try:
+        return tuple(conn.execute(
+            "SELECT prompt_tokens, completion_tokens FROM email_logs WHERE run_id = ?", (run_id,)
+        ).fetchone())
+    finally:
+        conn.close()
+
+
+def test_thread_rows_store_token_usage():
+    result = {"thread_id": "t1", "message_ids": ["m1"], "status": "sent",
+              "token_usage": {"prompt": 812, "completion": 64}}
+    row = email_logs.thread_to_log_row(result, "default", "a@example.com", "Refund", "body", "reply")
+    assert email_logs.bulk_insert([row]) == 1
+    assert _tokens(row["run_id"]) == (812, 64)
+
+
+def test_run_rows_store_token_usage_and_tolerate_missing_counts():
+    state = {"run_id": "r1", "status": "sent", "token_usage": {"prompt": 500, "completion": 40, "calls": 1}}
+    ignored = {"thread_id": "t2", "message_ids": ["m2"], "status": "ignored"}
+    email_logs.bulk_insert([
+        email_logs.state_to_log_row(state),
+        email_logs.thread_to_log_row(ignored, "default", "b@example.com", "Hi", "body"),
+    ])
+    assert _tokens("r1") == (500, 40)
+    assert _tokens(email_logs.thread_run_id("default", "t2", ["m2"])) == (None, None)
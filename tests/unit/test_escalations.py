@@ -0,0 +1,137 @@
+"""Escalation work queue: concurrent claims, leases, holder checks and keyset pagination."""
+
+import threading
+import time
+
+import pytest
+
+from app.services import email_logs, escalations
+
+
+@pytest.fixture(autouse=True)
+def dashboard_db(tmp_path, monkeypatch):
+    """A fresh, migrated dashboard DB per test."""
+    path = str(tmp_path / "sqlite.db3")
+    monkeypatch.setattr(email_logs, "DB_PATH", path)
+    monkeypatch.setattr(email_logs, "_migrated", {})
+    email_logs.migrate()
+    return path
+
+
+def _enqueue(n, prefix="item"):
+    return [escalations.enqueue(f"{prefix}:{i}", reason="test") for i in range(n)]
+
+
+def test_concurrent_claims_never_share_an_item():
+    _enqueue(20)
+    claimed = []
+    lock = threading.Lock()
+    start = threading.Barrier(30)
+
+    def operator(i):
+        start.wait()
+        item = escalations.claim(f"op-{i}", lease_seconds=60)
+        with lock:
+            claimed.append(item)
+
+    threads = [threading.Thread(target=operator, args=(i,)) for i in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    items = [item for item in claimed if item is not None]
+    assert len(items) == 20
+    assert len({item["id"] for item in items}) == 20
+    assert claimed.count(None) == 10
+    assert escalations.stats()["counts"] == {"claimed": 20}
+
+
+def test_claim_takes_earliest_sla_first():
+    escalations.enqueue("low", priority="low")
+    high = escalations.enqueue("high", priority="high")
+    assert escalations.claim("op")["id"] == high["id"]
+
+
+def test_expired_lease_returns_item_to_queue():
+    item = _enqueue(1)[0]
+    assert escalations.claim("alice", lease_seconds=0.05)["id"] == item["id"]
+    assert escalations.claim("bob") is None
+
+    time.sleep(0.1)
+    # The lapsed holder can no longer renew; the next claim re-leases the item
+    assert escalations.renew(item["id"], "alice") is False
+    again = escalations.claim("bob", lease_seconds=60)
+    assert again["id"] == item["id"]
+    assert again["claimed_by"] == "bob"
+    assert escalations.release(item["id"], "alice") is False
+
+
+def test_only_the_holder_resolves_a_claimed_item():
+    item = _enqueue(1)[0]
+    escalations.claim("alice", lease_seconds=60)
+
+    assert escalations.resolve(item["id"], "bob") is False
+    assert escalations.get(item["id"])["status"] == "claimed"
+
+    assert escalations.resolve(item["id"], "alice", "Answered by phone") is True
+    resolved = escalations.get(item["id"])
+    assert resolved["status"] == "resolved"
+    assert resolved["resolved_by"] == "alice"
+    assert resolved["resolution"] == "Answered by phone"
+    assert escalations.resolve(item["id"], "alice") is False
+
+
+def test_open_items_resolve_directly_and_flip_their_log_row(dashboard_db):
+    conn = email_logs.connect()
+    conn.execute(
+        "INSERT INTO email_logs (original_sender, validation_is_valid, validation_reason, ts) "
+        "VALUES ('a@example.com', 0, 'ungrounded_facts', ?)",
+        (time.time(),),
+    )
+    escalations.enqueue_escalated_logs(conn)
+    conn.commit()
+    log_id = conn.execute("SELECT id FROM email_logs").fetchone()[0]
+    conn.close()
+
+    assert escalations.resolve_log(log_id, "dashboard", "Manually resolved") is True
+    conn = email_logs.connect()
+    row = conn.execute("SELECT validation_is_valid FROM email_logs WHERE id = ?", (log_id,)).fetchone()
+    conn.close()
+    assert row[0] == 1
+    assert escalations.resolve_log(log_id, "dashboard", "Manually resolved") is None
+
+
+def _all_pages(limit, status="open"):
+    pages, cursor = [], None
+    while True:
+        page = escalations.list_items(status, limit, cursor)
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pagination_with_identical_sla_and_age(monkeypatch):
+    # Same created_at and sla_due_at for every item: only the id breaks ties
+    with monkeypatch.context() as frozen:
+        frozen.setattr(escalations.time, "time", lambda: 1_700_000_000.0)
+        items = _enqueue(7)
+
+    pages = _all_pages(3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [item["id"] for page in pages for item in page] == [item["id"] for item in items]
+
+
+@pytest.mark.parametrize("count, limit, sizes", [(6, 3, [3, 3]), (6, 6, [6]), (6, 5, [5, 1]), (0, 5, [0])])
+def test_pagination_boundaries(count, limit, sizes):
+    _enqueue(count)
+    pages = _all_pages(limit)
+    assert [len(p) for p in pages] == sizes
+    ids = [item["id"] for page in pages for item in page]
+    assert len(ids) == len(set(ids)) == count
+
+
+def test_pagination_rejects_malformed_cursor():
+    with pytest.raises(ValueError):
+        escalations.list_items("open", 10, "not-a-cursor")
@@ -0,0 +1,147 @@
+"""SQLite job queue: dedup, leases, lease expiry and reclaim, retry with backoff."""
+
+import threading
+import time
+
+import pytest
+
+from app.services import job_queue
+
+
+@pytest.fixture(autouse=True)
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOBS_DB_PATH", str(tmp_path / "jobs.db3"))
+    monkeypatch.setattr(job_queue, "_initialized", False)
+    monkeypatch.setattr(job_queue, "_HANDLERS", {})
+
+
+def test_enqueue_is_idempotent_on_the_key():
+    first = job_queue.enqueue("email_thread", {"message_id": "m1"}, idempotency_key="m1")
+    again = job_queue.enqueue("email_thread", {"message_id": "other"}, idempotency_key="m1")
+    assert again["id"] == first["id"]
+    assert again["payload"] == {"message_id": "m1"}
+    # Jobs without a key are never merged
+    assert job_queue.enqueue("x", {})["id"] != job_queue.enqueue("x", {})["id"]
+    assert job_queue.ready_count() == 3
+
+
+def test_claim_leases_each_job_to_one_worker():
+    for i in range(10):
+        job_queue.enqueue("x", {"i": i}, idempotency_key=str(i))
+    claimed, lock = [], threading.Lock()
+    start = threading.Barrier(15)
+
+    def worker(n):
+        start.wait()
+        job = job_queue.claim(f"w{n}", visibility_timeout=60)
+        with lock:
+            claimed.append(job)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(15)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    jobs = [job for job in claimed if job is not None]
+    assert len({job["id"] for job in jobs}) == len(jobs) == 10
+    assert all(job["status"] == "running" and job["attempts"] == 1 for job in jobs)
+    assert job_queue.claim("late", visibility_timeout=60) is None
+
+
+def test_expired_lease_is_reclaimed_and_the_old_worker_is_fenced_off():
+    job = job_queue.enqueue("x", {}, idempotency_key="k")
+    assert job_queue.claim("w1", visibility_timeout=0.05)["id"] == job["id"]
+    assert job_queue.heartbeat(job["id"], "w1", 0.05) is True
+
+    time.sleep(0.1)
+    reclaimed = job_queue.claim("w2", visibility_timeout=60)
+    assert reclaimed["id"] == job["id"]
+    assert reclaimed["worker_id"] == "w2"
+    assert reclaimed["attempts"] == 2
+
+    # The crashed/hung worker can no longer touch the job
+    assert job_queue.heartbeat(job["id"], "w1", 60) is False
+    assert job_queue.fail(job["id"], "w1", "boom", transient=True) == "running"
+    job_queue.complete(job["id"], "w1", "stale")
+    assert job_queue.get_job(job["id"])["status"] == "running"
+
+    job_queue.complete(job["id"], "w2", {"ok": True})
+    done = job_queue.get_job(job["id"])
+    assert (done["status"], done["result"]) == ("succeeded", {"ok": True})
+
+
+def test_expired_lease_on_the_last_attempt_fails_the_job():
+    job = job_queue.enqueue("x", {}, idempotency_key="k", max_attempts=1)
+    job_queue.claim("w1", visibility_timeout=0.05)
+    time.sleep(0.1)
+    assert job_queue.claim("w2", visibility_timeout=60) is None
+    failed = job_queue.get_job(job["id"])
+    assert (failed["status"], failed["last_error"]) == ("failed", "lease expired")
+
+
+def test_transient_failures_retry_with_backoff_until_max_attempts(monkeypatch):
+    monkeypatch.setattr(job_queue, "_BACKOFF_BASE_SECONDS", 0.05)
+    job = job_queue.enqueue("x", {}, idempotency_key="k", max_attempts=2)
+
+    job_queue.claim("w1", visibility_timeout=60)
+    assert job_queue.fail(job["id"], "w1", "rate limited", transient=True) == "queued"
+    queued = job_queue.get_job(job["id"])
+    assert queued["run_after"] > time.time()
+    assert job_queue.claim("w1", visibility_timeout=60) is None  # still backing off
+
+    time.sleep(0.1)
+    assert job_queue.claim("w1", visibility_timeout=60)["attempts"] == 2
+    assert job_queue.fail(job["id"], "w1", "rate limited", transient=True) == "failed"
+    assert job_queue.get_job(job["id"])["last_error"] == "rate limited"
+
+
+def test_permanent_failure_is_not_retried():
+    job = job_queue.enqueue("x", {}, idempotency_key="k")
+    job_queue.claim("w1", visibility_timeout=60)
+    assert job_queue.fail(job["id"], "w1", "bad payload", transient=False) == "failed"
+
+
+@pytest.mark.parametrize("attempts, low, high", [(1, 1.0, 2.0), (3, 4.0, 8.0), (20, 150.0, 300.0)])
+def test_backoff_delay_doubles_with_jitter_and_is_capped(attempts, low, high):
+    for _ in range(50):
+        assert low <= job_queue.backoff_delay(attempts) <= high
+
+
+def test_run_job_classifies_handler_errors():
+    outcomes = iter([ConnectionError("reset"), ValueError("bad"), None])
+
+    def handler(payload, job):
+        error = next(outcomes)
+        if error:
+            raise error
+        return {"sent": payload["message_id"]}
+
+    job_queue.register_handler("email_thread", handler)
+    job = job_queue.enqueue("email_thread", {"message_id": "m1"}, idempotency_key="m1")
+
+    assert job_queue.run_job(job_queue.claim("w1", 60), "w1", 60) == "queued"
+    job_queue.enqueue("email_thread", {"message_id": "m2"}, idempotency_key="m2")
+    second = job_queue.claim("w1", 60)
+    assert second["payload"] == {"message_id": "m2"}
+    assert job_queue.run_job(second, "w1", 60) == "failed"
+    assert job_queue.get_job(second["id"])["last_error"] == "ValueError: bad"
+
+    job_queue.enqueue("email_thread", {"message_id": "m3"}, idempotency_key="m3")
+    third = job_queue.claim("w1", 60)
+    assert job_queue.run_job(third, "w1", 60) == "succeeded"
+    assert job_queue.get_job(third["id"])["result"] == {"sent": "m3"}
+    assert job_queue.get_job(job["id"])["status"] == "queued"
+
+
+def test_job_without_a_handler_fails():
+    job_queue.enqueue("unknown", {}, idempotency_key="k")
+    job = job_queue.claim("w1", 60)
+    assert job_queue.run_job(job, "w1", 60) == "failed"
+    assert job_queue.get_job(job["id"])["last_error"] == "No handler for kind=unknown"
+
+
+@pytest.mark.parametrize("error, transient", [
+    (ConnectionError(), True), (TimeoutError(), True), (ValueError(), False), (KeyError("x"), False)])
+def test_is_transient(error, transient):
+    assert job_queue.is_transient(error) is transient
@@ -0,0 +1,59 @@
+"""ONNX int8 embeddings agree with the HuggingFace MiniLM vectors they replace.
+
+Skipped unless onnxruntime, tokenizers and the HF backend are installed and the
+model has been exported (python -m app.models.onnx_embeddings export).
+"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from app.models import onnx_embeddings  # noqa: E402
+
+MIN_COSINE = 0.98  # same default as `onnx_embeddings parity`
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(os.path.join(onnx_embeddings.ONNX_DIR, onnx_embeddings.MODEL_FILE)),
+    reason="ONNX model not exported; run python -m app.models.onnx_embeddings export",
+)
+
+
+@pytest.fixture(scope="module")
+def onnx_model():
+    return onnx_embeddings.OnnxEmbeddings()
+
+
+@pytest.fixture(scope="module")
+def hf_model():
+    pytest.importorskip("langchain_huggingface")
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=onnx_embeddings.MODEL_NAME)
+
+
+def test_int8_vectors_match_hf_vectors(onnx_model, hf_model):
+    texts = onnx_embeddings.PARITY_TEXTS
+    reference = np.array(hf_model.embed_documents(texts), dtype=np.float32)
+    vectors = np.array(onnx_model.embed_documents(texts), dtype=np.float32)
+    assert vectors.shape == reference.shape
+    cosines = (reference * vectors).sum(axis=1)
+    assert cosines.min() >= MIN_COSINE, dict(zip(texts, cosines.round(4)))
+
+
+def test_query_vector_matches_hf_query_vector(onnx_model, hf_model):
+    text = onnx_embeddings.PARITY_TEXTS[0]
+    cosine = float(np.dot(hf_model.embed_query(text), onnx_model.embed_query(text)))
+    assert cosine >= MIN_COSINE
+
+
+def test_vectors_are_normalised_and_order_independent(onnx_model):
+    texts = onnx_embeddings.PARITY_TEXTS
+    vectors = onnx_model.encode(texts)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    # encode() batches by length; results must come back in input order
+    single = np.array([onnx_model.embed_query(t) for t in texts], dtype=np.float32)
+    assert np.allclose(vectors, single, atol=1e-4)
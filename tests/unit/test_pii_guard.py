@@ -0,0 +1,145 @@
+"""PII detectors, redaction and fact grounding used to validate drafts before sending."""
+
+import pytest
+
+from app.agent import pii_guard
+from app.agent.pii_guard import (
+    customer_pii,
+    detect_pii,
+    find_ungrounded_facts,
+    iban_valid,
+    luhn_valid,
+    quoted_pii,
+    redact_batch,
+    redact_pii,
+    validate_batch,
+    validate_draft,
+)
+
+POLICY = [{"id": "refunds", "content": "Refunds are paid within 15 days. The change fee is $50 (CHF 45). "
+           "Contact support@airline.example or +41 44 123 45 67."}]
+
+
+def _types(text):
+    return [f["type"] for f in detect_pii(text)]
+
+
+@pytest.mark.parametrize("number, valid", [("4111111111111111", True), ("4111111111111112", False),
+                                           ("79927398713", True), ("79927398710", False), ("4111-1111", False)])
+def test_luhn(number, valid):
+    assert luhn_valid(number) is valid
+
+
+@pytest.mark.parametrize("iban, valid", [
+    ("GB82 WEST 1234 5698 7654 32", True),
+    ("DE89370400440532013000", True),
+    ("GB82 WEST 1234 5698 7654 33", False),
+    ("GB82WEST", False),
+])
+def test_iban_mod97(iban, valid):
+    assert iban_valid(iban) is valid
+
+
+def test_card_requires_a_valid_checksum():
+    assert _types("Card 4111 1111 1111 1111 on file") == ["card"]
+    assert "card" not in _types("Card 4111 1111 1111 1112 on file")
+
+
+def test_iban_requires_a_valid_checksum():
+    assert _types("Pay to GB82 WEST 1234 5698 7654 32 today") == ["iban"]
+    assert _types("Pay to GB82 WEST 1234 5698 7654 33 today") == []
+
+
+@pytest.mark.parametrize("text", ["e-ticket 724-1234567890", "ticket number 7241234567890"])
+def test_eticket_numbers(text):
+    assert _types(text) == ["eticket"]
+
+
+def test_other_13_digit_numbers_are_not_etickets():
+    assert "eticket" not in _types("ticket 725-1234567890")
+
+
+def test_phone_numbers():
+    assert _types("Call me on +41 79 123 45 67") == ["phone"]
+    assert _types("Call me on (044) 123-4567") == ["phone"]
+    assert _types("Order 1234567") == []
+
+
+@pytest.mark.parametrize("text", ["Flight on 2024-05-12 10:30", "Departure 12.05.2024 0930", "Back on 12/05/24"])
+def test_dates_and_times_are_not_phone_numbers(text):
+    assert _types(text) == []
+
+
+def test_pnr_requires_a_booking_label():
+    assert _types("My booking reference: ABC123") == ["pnr"]
+    assert _types("PNR XK7QZP please") == ["pnr"]
+    # Flight numbers, fare codes and shouted words are six characters too
+    assert _types("I was on LX1234 to Zurich") == []
+    assert _types("This is URGENT, PLEASE help") == []
+    assert _types("booking reference 123456") == []
+
+
+def test_redaction_uses_typed_placeholders_and_allow_list():
+    text = "Mail jane@example.com or support@airline.example, card 4111111111111111"
+    assert redact_pii(text) == "Mail [REDACTED_EMAIL] or [REDACTED_EMAIL], card [REDACTED_CARD]"
+    assert redact_pii(text, allow=["support@airline.example"]) == (
+        "Mail [REDACTED_EMAIL] or support@airline.example, card [REDACTED_CARD]"
+    )
+
+
+def test_contacts_quoted_from_policy_are_not_customer_pii():
+    draft = "Write to support@airline.example or call +41 44 123 45 67. We emailed jane@example.com."
+    assert [f["value"] for f in customer_pii(draft, POLICY)] == ["jane@example.com"]
+    assert quoted_pii(draft, POLICY) == ["support@airline.example", "+41 44 123 45 67"]
+    assert redact_pii(draft, allow=quoted_pii(draft, POLICY)) == (
+        "Write to support@airline.example or call +41 44 123 45 67. We emailed [REDACTED_EMAIL]."
+    )
+
+
+def test_grounded_facts_pass():
+    draft = "Your refund arrives within 15 days; the fee is $50 (45 CHF)."
+    assert find_ungrounded_facts(draft, POLICY) == []
+    assert validate_draft(draft, POLICY)["is_valid"] is True
+
+
+@pytest.mark.parametrize("draft, fact", [
+    ("Your refund arrives within 5 days.", "5 days"),
+    ("The fee is only $5.", "$5"),
+    ("The fee is $500.", "$500"),
+    ("We will pay 20% back.", "20%"),
+])
+def test_facts_that_only_occur_inside_larger_ones_are_ungrounded(draft, fact):
+    assert find_ungrounded_facts(draft, POLICY) == [fact]
+    result = validate_draft(draft, POLICY)
+    assert result["is_valid"] is False
+    assert result["reason"] == f"ungrounded_facts: {fact}"
+
+
+def test_no_doc_text_means_nothing_to_ground_against():
+    assert find_ungrounded_facts("Refund in 5 days", [{"id": "x"}]) == []
+
+
+def test_validate_draft_reports_pii_and_blocks_only_when_asked():
+    draft = "We refunded card 4111 1111 1111 1111 within 15 days."
+    assert validate_draft(draft, POLICY)["is_valid"] is True
+    assert [p["type"] for p in validate_draft(draft, POLICY)["pii"]] == ["card"]
+    blocked = validate_draft(draft, POLICY, block_pii=True)
+    assert blocked == {**blocked, "is_valid": False, "reason": "pii_detected: card"}
+    assert validate_draft("  ", POLICY)["reason"] == "empty_draft"
+
+
+def test_batch_mode_matches_single_calls_and_indexes_each_doc_set_once(monkeypatch):
+    other = [{"id": "baggage", "content": "Checked bags up to 23 kg."}]
+    items = [("Refund within 15 days.", POLICY), ("Refund within 5 days.", POLICY),
+             ("Bags up to 23 kg.", other), ("Bags up to 32 kg.", other)]
+    built = []
+    index = pii_guard._doc_index
+    monkeypatch.setattr(pii_guard, "_doc_index", lambda docs: built.append(docs) or index(docs))
+
+    results = validate_batch(items)
+    assert [r["is_valid"] for r in results] == [True, False, True, False]
+    assert len(built) == 2
+    assert results == [validate_draft(d, docs) for d, docs in items]
+
+    assert redact_batch(["jane@example.com", "support@airline.example"], allow=["support@airline.example"]) == [
+        "[REDACTED_EMAIL]", "support@airline.example"]
@@ -0,0 +1,190 @@
+"""Gmail push ingestion: envelope decoding, historyId coalescing, duplicate suppression."""
+
+import threading
+
+import pytest
+
+push_ingest = pytest.importorskip("app.services.push_ingest")
+from app.services import job_queue  # noqa: E402
+
+ACCOUNTS = {"support@example.com": "support", "sales@example.com": "sales"}
+
+
+class FakeRegistry:
+    def __init__(self, service=None):
+        self.service = service
+
+    def account_for_email(self, email_address):
+        return ACCOUNTS.get((email_address or "").lower())
+
+    def get_service(self, account_id):
+        return self.service
+
+
+class FakeGmail:
+    """users().history().list(...).execute() over canned pages keyed by pageToken."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def users(self):
+        return self
+
+    def history(self):
+        return self
+
+    def list(self, **kwargs):
+        self.requests.append(kwargs)
+        self._page = self.pages[kwargs.get("pageToken")]
+        return self
+
+    def execute(self):
+        return self._page
+
+
+def _added(msg_id, thread_id, labels=("INBOX", "UNREAD")):
+    return {"messagesAdded": [{"message": {"id": msg_id, "threadId": thread_id, "labelIds": list(labels)}}]}
+
+
+class Recorder:
+    """Coalescer stand-in that records notify() calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def notify(self, account_id, history_id):
+        self.calls.append((account_id, history_id))
+
+
+@pytest.fixture(autouse=True)
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOBS_DB_PATH", str(tmp_path / "jobs.db3"))
+    monkeypatch.setattr(job_queue, "_initialized", False)
+    monkeypatch.setattr(push_ingest, "get_registry", lambda: FakeRegistry())
+
+
+# --------- Envelope decoding ----------
+
+def test_local_envelope_round_trips():
+    envelope = push_ingest.LocalPushPublisher().envelope("support@example.com", 1234)
+    assert envelope["message"]["messageId"] == "1"
+    assert push_ingest.parse_push_notification(envelope) == {
+        "email_address": "support@example.com",
+        "history_id": 1234,
+    }
+
+
+def test_unpadded_data_and_string_history_id_decode():
+    # Pub/Sub may drop base64 padding; Gmail sends historyId as a string
+    envelope = push_ingest.LocalPushPublisher().envelope("support@example.com", "77")
+    envelope["message"]["data"] = envelope["message"]["data"].rstrip("=")
+    assert push_ingest.parse_push_notification(envelope)["history_id"] == 77
+
+
+@pytest.mark.parametrize("envelope", [{}, {"message": {}}, {"message": {"data": ""}}])
+def test_envelope_without_data_is_rejected(envelope):
+    with pytest.raises(ValueError):
+        push_ingest.parse_push_notification(envelope)
+
+
+def test_handle_push_maps_mailbox_to_account():
+    recorder = Recorder()
+    publisher = push_ingest.LocalPushPublisher(lambda env: push_ingest.handle_push(env, recorder))
+    assert publisher.publish("Support@Example.com", 10) == {"account_id": "support", "history_id": 10}
+    assert recorder.calls == [("support", 10)]
+    with pytest.raises(ValueError, match="No account"):
+        publisher.publish("stranger@example.com", 11)
+    assert recorder.calls == [("support", 10)]
+
+
+# --------- Coalescing ----------
+
+def test_burst_collapses_into_one_sync_for_highest_history_id():
+    synced = []
+    coalescer = push_ingest.PushCoalescer(lambda a, h: synced.append((a, h)), debounce_seconds=60)
+    for history_id in (5, 9, 7):
+        coalescer.notify("support", history_id)
+    coalescer.notify("sales", 3)
+    coalescer.flush()
+    assert sorted(synced) == [("sales", 3), ("support", 9)]
+    assert (coalescer.notifications, coalescer.syncs) == (4, 2)
+    # A later notification arms a new window
+    coalescer.notify("support", 12)
+    coalescer.flush()
+    assert synced[-1] == ("support", 12)
+
+
+def test_timer_fires_after_debounce():
+    fired = threading.Event()
+    synced = []
+
+    def sync(account_id, history_id):
+        synced.append((account_id, history_id))
+        fired.set()
+
+    coalescer = push_ingest.PushCoalescer(sync, debounce_seconds=0.05)
+    coalescer.notify("support", 1)
+    coalescer.notify("support", 2)
+    assert fired.wait(2)
+    assert synced == [("support", 2)]
+
+
+def test_failed_sync_does_not_block_the_next_window():
+    calls = []
+
+    def sync(account_id, history_id):
+        calls.append(history_id)
+        if len(calls) == 1:
+            raise RuntimeError("gmail down")
+
+    coalescer = push_ingest.PushCoalescer(sync, debounce_seconds=60)
+    coalescer.notify("support", 1)
+    coalescer.flush()
+    coalescer.notify("support", 2)
+    coalescer.flush()
+    assert calls == [1, 2]
+
+
+# --------- History sync and duplicate suppression ----------
+
+def test_sync_enqueues_each_added_unread_message_once(monkeypatch):
+    gmail = FakeGmail({
+        None: {"historyId": "105", "nextPageToken": "p2", "history": [
+            _added("m1", "t1"), _added("m2", "t1"), _added("read", "t2", labels=("INBOX",)),
+        ]},
+        # The same message can appear in several history records
+        "p2": {"historyId": "110", "history": [_added("m1", "t1"), _added("m3", "t3")]},
+    })
+    monkeypatch.setattr(push_ingest, "get_registry", lambda: FakeRegistry(gmail))
+    push_ingest.set_cursor("support", 100)
+
+    assert sorted(push_ingest.sync_mailbox("support", 108)) == ["m1", "m2", "m3"]
+    assert [r["startHistoryId"] for r in gmail.requests] == [100, 100]
+    assert push_ingest.get_cursor("support") == 110
+    assert job_queue.ready_count() == 2  # one job per thread
+
+    # Redelivered notification over the same history: no new jobs
+    push_ingest.set_cursor("support", 100)
+    push_ingest.sync_mailbox("support", 108)
+    assert job_queue.ready_count() == 2
+
+
+def test_cursor_never_moves_backwards():
+    push_ingest.set_cursor("support", 50)
+    push_ingest.set_cursor("support", 40)
+    assert push_ingest.get_cursor("support") == 50
+    assert push_ingest.get_cursor("sales") is None
+
+
+def test_first_notification_falls_back_to_unread_scan(monkeypatch):
+    scans = []
+
+    def scan(account_id, start_workers):
+        scans.append(account_id)
+        return [{"message_ids": ["m1", "m2"]}]
+
+    monkeypatch.setattr(push_ingest, "enqueue_unread_emails", scan)
+    assert push_ingest.sync_mailbox("sales", 20) == ["m1", "m2"]
+    assert scans == ["sales"]
+    assert push_ingest.get_cursor("sales") == 20
@@ -0,0 +1,89 @@
+"""Cold storage: content-addressed blobs are shared by reference count and deleted at zero."""
+
+import os
+import time
+
+import pytest
+
+from app.services import retention
+
+POLICY = "Refunds are processed within 7 days. " * 20  # above RETENTION_BLOB_MIN_BYTES
+EMAIL = "Dear support, I would like to change my booking. " * 10
+
+
+@pytest.fixture(autouse=True)
+def cold_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, "COLD_DIR", str(tmp_path / "cold"))
+    monkeypatch.setattr(retention, "BLOB_MIN_BYTES", 256)
+    return tmp_path / "cold"
+
+
+def _blobs():
+    conn = retention._connect()
+    try:
+        return {row["hash"]: (row["refs"], row["path"]) for row in conn.execute("SELECT hash, refs, path FROM blobs")}
+    finally:
+        conn.close()
+
+
+def _state(email, policy=POLICY):
+    return {"email_content": email, "retrieved_docs": [{"content": policy}], "status": "sent"}
+
+
+def test_shared_strings_are_stored_once():
+    retention.put_item("state", "run-1", _state(EMAIL))
+    retention.put_item("state", "run-2", _state(EMAIL + "Thanks."))
+
+    refs = sorted(refs for refs, _ in _blobs().values())
+    # The policy chunk is shared; each email body is its own blob
+    assert refs == [1, 1, 2]
+    assert retention.get_item("state", "run-1") == _state(EMAIL)
+    assert retention.get_item("state", "run-2") == _state(EMAIL + "Thanks.")
+
+
+def test_repeated_string_in_one_item_counts_each_reference():
+    retention.put_item("state", "run-1", {"a": POLICY, "b": [POLICY, POLICY]})
+    assert [refs for refs, _ in _blobs().values()] == [3]
+    assert retention.get_item("state", "run-1") == {"a": POLICY, "b": [POLICY, POLICY]}
+
+
+def test_replacing_an_item_releases_its_old_blobs():
+    retention.put_item("state", "run-1", _state(EMAIL))
+    retention.put_item("state", "run-1", _state(EMAIL))
+    assert sorted(refs for refs, _ in _blobs().values()) == [1, 1]
+
+    old = {path for _, path in _blobs().values()}
+    retention.put_item("state", "run-1", _state("short email", policy="Another policy. " * 30))
+    blobs = _blobs()
+    assert [refs for refs, _ in blobs.values()] == [1]
+    assert all(not os.path.exists(path) for path in old)
+
+
+def test_expiry_deletes_blobs_only_at_zero_references():
+    retention.put_item("state", "run-1", _state(EMAIL))
+    time.sleep(0.01)
+    cutoff = time.time()
+    time.sleep(0.01)
+    retention.put_item("state", "run-2", _state("other email " * 30))
+
+    assert retention.expire_cold(cutoff) == 1
+    blobs = _blobs()
+    # run-1's email blob is gone; the shared policy blob is still used by run-2
+    assert sorted(refs for refs, _ in blobs.values()) == [1, 1]
+    assert all(os.path.exists(path) for _, path in blobs.values())
+    assert retention.get_item("state", "run-1") is None
+    assert retention.get_item("state", "run-2") == _state("other email " * 30)
+
+    assert retention.expire_cold(time.time() + 1) == 1
+    assert _blobs() == {}
+    assert not any(files for _, _, files in os.walk(os.path.join(retention.COLD_DIR, "blobs")))
+
+
+def test_missing_blob_file_is_rewritten_on_next_reference():
+    retention.put_item("state", "run-1", _state(EMAIL))
+    for _, path in _blobs().values():
+        os.remove(path)
+    retention.put_item("state", "run-2", _state(EMAIL))
+
+    assert sorted(refs for refs, _ in _blobs().values()) == [2, 2]
+    assert retention.get_item("state", "run-1") == _state(EMAIL)
@@ -0,0 +1,93 @@
+"""Speculative drafting: hedged candidates, and no LLM call for those never started."""
+
+import threading
+import time
+
+import pytest
+
+from app.agent import agent_graph
+
+DOCS = [{"id": "refunds", "content": "Refunds are paid within 15 days."}]
+PROMPT = "Email: {email}\nDocs: {docs}\nReply:"
+
+
+def _state():
+    return {"email_content": "How long does a refund take?", "retrieved_docs": DOCS}
+
+
+class Llm:
+    """Counts calls; ``delays`` and ``drafts`` are picked by call order."""
+
+    def __init__(self, delays=(0.0,), drafts=("Refunds are paid within 15 days.",)):
+        self.delays, self.drafts = delays, drafts
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self.lock:
+            n = self.calls
+            self.calls += 1
+        time.sleep(self.delays[min(n, len(self.delays) - 1)])
+        return self.drafts[min(n, len(self.drafts) - 1)]
+
+
+def _validator(draft, docs):
+    valid = "15 days" in draft
+    return {"is_valid": valid, "reason": "ok" if valid else "ungrounded"}
+
+
+def _details(state):
+    return [e for e in state["log"] if e["Step"] == "speculative_draft"][-1]["details"]
+
+
+def test_fast_valid_first_candidate_skips_the_rest():
+    llm = Llm()
+    state = agent_graph.speculative_draft(_state(), llm, PROMPT, _validator, 3, stagger=5.0)
+    assert llm.calls == 1
+    assert state["validation_result"]["is_valid"]
+    details = _details(state)
+    assert details["winner"] == 0
+    assert (details["started"], details["not_started"], details["abandoned"]) == (1, 2, 0)
+
+
+def test_invalid_candidate_starts_the_next_immediately():
+    llm = Llm(drafts=("It takes a while.", "Refunds are paid within 15 days."))
+    start = time.perf_counter()
+    state = agent_graph.speculative_draft(_state(), llm, PROMPT, _validator, 3, stagger=5.0)
+    assert time.perf_counter() - start < 2.0
+    assert llm.calls == 2
+    assert _details(state)["winner"] == 1
+    assert _details(state)["not_started"] == 1
+
+
+def test_slow_candidate_is_hedged_after_the_stagger():
+    llm = Llm(delays=(0.5, 0.0))
+    state = agent_graph.speculative_draft(_state(), llm, PROMPT, _validator, 3, stagger=0.05)
+    assert llm.calls == 2
+    details = _details(state)
+    assert details["winner"] == 1
+    assert (details["started"], details["not_started"], details["abandoned"]) == (2, 1, 1)
+
+
+def test_zero_stagger_starts_every_candidate():
+    llm = Llm(delays=(0.0, 0.2))
+    state = agent_graph.speculative_draft(_state(), llm, PROMPT, _validator, 3, stagger=0)
+    assert _details(state)["started"] == 3
+    time.sleep(0.3)
+    assert llm.calls == 3
+
+
+def test_no_valid_candidate_keeps_first_failure():
+    llm = Llm(drafts=("It takes a while.",))
+    state = agent_graph.speculative_draft(_state(), llm, PROMPT, _validator, 3, stagger=5.0)
+    assert llm.calls == 3
+    assert not state["validation_result"]["is_valid"]
+    assert _details(state)["winner"] is None
+
+
+def test_every_candidate_raising_surfaces_the_error():
+    def llm(prompt):
+        raise RuntimeError("groq down")
+
+    with pytest.raises(RuntimeError, match="groq down"):
+        agent_graph.speculative_draft(_state(), llm, PROMPT, _validator, 2, stagger=5.0)
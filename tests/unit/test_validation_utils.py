@@ -0,0 +1,41 @@
+"""Quoted-history and signature stripping on raw email bodies."""
+
+import pytest
+
+from app.agent.prompt_budget import compress_email
+from app.agent.validation_utils import ensure_minimum_content, strip_signature
+
+
+def test_question_after_a_sign_off_is_kept():
+    body = "Hi team,\nThanks!\nMy flight AB123 was cancelled, can I get a refund?"
+    assert strip_signature(body) == body
+    assert ensure_minimum_content(compress_email(body))
+
+
+def test_text_after_a_sign_off_is_kept():
+    body = "Hello,\nThank you\nMy flight was cancelled yesterday and I would like a full refund"
+    assert strip_signature(body) == body
+
+
+@pytest.mark.parametrize(
+    "signature",
+    [
+        "Best regards,\nJane Doe\nAcme Travel Ltd",
+        "Thanks,\nJane\n+44 20 7946 0958\njane@example.com",
+        "--\nJane Doe | Head of Operations\nhttps://example.com",
+        "Sent from my iPhone",
+        "Cheers!\n\nJane",
+    ],
+)
+def test_trailing_signature_block_is_removed(signature):
+    question = "Hi,\nCould you tell me when my refund for booking 12345 will arrive?"
+    assert strip_signature(f"{question}\n{signature}") == question
+
+
+def test_only_the_trailing_block_is_cut():
+    body = "Hi,\nThanks for the quick reply.\nWhere do I send the receipts?\nRegards,\nJane"
+    assert strip_signature(body) == "Hi,\nThanks for the quick reply.\nWhere do I send the receipts?"
+
+
+def test_sign_off_on_the_first_line_is_not_a_signature():
+    assert strip_signature("Thanks!\nJane") == "Thanks!\nJane"